@@ -0,0 +1,84 @@
+import asyncio
+import os
+import queue
+import threading
+
+
+class AgentRuntime:
+    """One long-lived event loop per process, running on a daemon thread.
+
+    Callers that cannot keep a loop alive themselves (Streamlit reruns the
+    script for every interaction) submit coroutines here instead of calling
+    ``asyncio.run``. Because the loop survives between turns, the OpenAI
+    client created on it keeps its HTTP connection pool warm across turns
+    and sessions.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="agent-runtime", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self._ready.set)
+        self.loop.run_forever()
+
+    def _install_openai_client(self):
+        """Create the shared OpenAI client on this loop so its pool lives here"""
+        if not os.getenv("OPENAI_API_KEY"):
+            return
+        from agents import set_default_openai_client
+        from openai import AsyncOpenAI
+
+        async def install():
+            set_default_openai_client(AsyncOpenAI())
+
+        self.run(install())
+
+    def submit(self, coro):
+        """Schedule a coroutine on the runtime loop; returns a concurrent Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the runtime loop and block for its result"""
+        return self.submit(coro).result(timeout)
+
+    def run_streaming(self, start, on_item, poll_interval=0.02):
+        """Run ``start(emit)`` on the loop, calling ``on_item`` in *this* thread.
+
+        ``start`` receives an ``emit`` callback to pass streamed items (e.g.
+        text deltas) back; they are handed to ``on_item`` on the calling
+        thread, which is where Streamlit expects UI updates to happen.
+        """
+        items = queue.Queue()
+        future = self.submit(start(items.put))
+        while True:
+            try:
+                on_item(items.get(timeout=poll_interval))
+            except queue.Empty:
+                if future.done():
+                    break
+        while not items.empty():
+            on_item(items.get_nowait())
+        return future.result()
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+
+
+_runtime = None
+_runtime_lock = threading.Lock()
+
+
+def get_runtime():
+    """Return the process-wide AgentRuntime, starting it on first use"""
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = AgentRuntime()
+            _runtime._install_openai_client()
+        return _runtime
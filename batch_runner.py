@@ -0,0 +1,286 @@
+"""Headless batch mode: replay a file of conversations through the agent pipeline.
+
+Run with:
+
+    python batch_runner.py requests.jsonl -o results.jsonl --concurrency 16
+
+Input, read lazily:
+    JSONL  one conversation per line: {"id": "c1", "messages": ["...", "..."]}
+           (or a single "message"); id defaults to the line number
+    CSV    "message" column, optional "id" column; consecutive rows with
+           the same id are the turns of one conversation
+
+A row that can't be read (bad JSON, no message) is recorded as an error
+for its conversation, with the line number, and the batch goes on.
+
+Each conversation runs through run_turn with its own ConversationMemory,
+at most --concurrency at a time. Results are appended to the output JSONL
+as they complete, one line per conversation, so nothing accumulates in
+memory. The output doubles as the checkpoint: rerunning with the same
+output file skips every id already recorded as "ok" (failed ones are
+retried and recorded again; readers should keep the last line per id).
+
+After each turn the runner waits until the emails it queued are
+delivered or have failed. A conversation is only "ok" once all of them
+went out. Each delivered email's send key (conversation id, turn, position
+in the turn) is appended to <output>.sent at once. A retried conversation
+replays from its first turn, and sends whose key is listed there are
+skipped, so a resume never delivers the same email twice.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import time
+
+from conversation_memory import ConversationMemory
+from outbox import SendScope, send_scope
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            conversation_id = f"line-{number}"
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield conversation_id, None, f"Line {number}: not valid JSON"
+                continue
+            if not isinstance(row, dict):
+                yield conversation_id, None, f"Line {number}: not a JSON object"
+                continue
+            conversation_id = str(row.get("id", conversation_id))
+            messages = row.get("messages") or row.get("message")
+            if isinstance(messages, str):
+                messages = [messages]
+            if not isinstance(messages, list) or not messages:
+                yield conversation_id, None, f"Line {number}: no \"messages\" or \"message\""
+                continue
+            yield conversation_id, [str(m) for m in messages], None
+
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        current_id, messages, error = None, [], None
+        number = 1
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                break
+            except csv.Error:
+                # The reader carries on with the next line; this row's conversation is lost
+                row = {"id": current_id, "message": None}
+                bad_line = f"Line {reader.line_num}: not valid CSV"
+            else:
+                bad_line = None
+            number += 1
+            conversation_id = row.get("id") or f"line-{number}"
+            if conversation_id != current_id and (messages or error):
+                yield current_id, None if error else messages, error
+                messages, error = [], None
+            current_id = conversation_id
+            if bad_line or not row.get("message"):
+                error = error or bad_line or f"Line {reader.line_num}: no \"message\""
+            else:
+                messages.append(row["message"])
+        if messages or error:
+            yield current_id, None if error else messages, error
+
+
+def read_conversations(path):
+    """Yield (conversation id, [user messages], error) from a JSONL or CSV file
+
+    A row that can't be read yields its id (or line-N), None and an error
+    naming the line, so one bad row never stops the batch.
+    """
+    return read_csv(path) if path.lower().endswith(".csv") else read_jsonl(path)
+
+
+def load_checkpoint(path):
+    """Ids already completed in an earlier run's output
+
+    A line cut short by a crash is dropped from the file so that appending
+    starts on a clean line.
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "rb+") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            f.truncate(end)
+    for line in data[:end].splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if record.get("status") == "ok":
+            done.add(record["id"])
+    return done
+
+
+def load_sent(path):
+    """Send keys of emails delivered by earlier runs"""
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+async def wait_for_delivery(scope, sent_log, poll_interval=0.05):
+    """Wait for the emails queued in ``scope``, log the delivered ones and return the failed ones"""
+    pending, failed = list(scope.tickets), []
+    scope.tickets.clear()
+    while pending:
+        still_pending = []
+        for key, ticket in pending:
+            if not ticket.done:
+                still_pending.append((key, ticket))
+            elif ticket.status == "sent":
+                sent_log.write(key + "\n")
+                sent_log.flush()
+                scope.delivered.add(key)
+            else:
+                failed.append(ticket)
+        pending = still_pending
+        if pending:
+            await asyncio.sleep(poll_interval)
+    return failed
+
+
+async def run_conversation(conversation_id, messages, sent_log, delivered=None):
+    """Run every turn of one conversation and describe the outcome"""
+    from main2 import run_turn
+
+    memory = ConversationMemory.from_env()
+    scope = SendScope(conversation_id, delivered)
+    token = send_scope.set(scope)
+    turns = []
+    start = time.perf_counter()
+    try:
+        for number, message in enumerate(messages, 1):
+            turn_start = time.perf_counter()
+            scope.start_turn(number)
+            agent_input = memory.build_input(message)
+            result = await run_turn(message, agent_input, context=memory)
+            memory.record(agent_input, result)
+            failed = await wait_for_delivery(scope, sent_log)
+            turns.append({
+                "user": message,
+                "reply": str(result.final_output),
+                "agent": result.last_agent.name,
+                "seconds": round(time.perf_counter() - turn_start, 3),
+            })
+            if failed:
+                errors = "; ".join(f"{t.recipient}: {t.error}" for t in failed)
+                return {"id": conversation_id, "status": "error", "error": f"Email not delivered ({errors})", "turns": turns}
+    except Exception as e:
+        # Emails queued before the failure still count as sent (or not) for the rerun
+        await wait_for_delivery(scope, sent_log)
+        return {"id": conversation_id, "status": "error", "error": f"{type(e).__name__}: {e}", "turns": turns}
+    finally:
+        send_scope.reset(token)
+    return {
+        "id": conversation_id,
+        "status": "ok",
+        "turns": turns,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+class BatchStats:
+    def __init__(self):
+        self.completed = 0
+        self.failed = 0
+        self.skipped = 0
+        self.turns = 0
+        self.started = time.perf_counter()
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        return (
+            f"📦 Batch: {self.completed} completed, {self.failed} failed, {self.skipped} skipped "
+            f"(checkpoint), {self.turns} turns in {elapsed:.1f}s "
+            f"({self.turns / elapsed if elapsed else 0.0:.1f} turns/s)"
+        )
+
+
+async def run_batch(input_path, output_path, concurrency=8, progress_every=100):
+    """Run a conversations file with bounded concurrency, appending results as they finish"""
+    done = load_checkpoint(output_path)
+    delivered = load_sent(output_path + ".sent")
+    stats = BatchStats()
+    # A small buffer between the reader and the workers keeps memory flat
+    pending = asyncio.Queue(maxsize=concurrency * 2)
+
+    with open(output_path, "a", encoding="utf-8") as out, open(output_path + ".sent", "a", encoding="utf-8") as sent_log:
+        async def worker():
+            while True:
+                item = await pending.get()
+                if item is None:
+                    return
+                conversation_id, messages = item
+                record = await run_conversation(conversation_id, messages, sent_log, delivered)
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                stats.turns += len(record["turns"])
+                if record["status"] == "ok":
+                    stats.completed += 1
+                else:
+                    stats.failed += 1
+                if (stats.completed + stats.failed) % progress_every == 0:
+                    print(stats.summary(), file=sys.stderr)
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        try:
+            for conversation_id, messages, error in read_conversations(input_path):
+                if conversation_id in done:
+                    stats.skipped += 1
+                    continue
+                if error is not None:
+                    record = {"id": conversation_id, "status": "error", "error": error, "turns": []}
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+                    stats.failed += 1
+                    continue
+                await pending.put((conversation_id, messages))
+            for _ in workers:
+                await pending.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+    return stats
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="JSONL or CSV file of conversations")
+    parser.add_argument("-o", "--output", help="results JSONL, also the resume checkpoint (default: <input>.results.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("BATCH_CONCURRENCY", "8")))
+    parser.add_argument("--progress-every", type=int, default=100, help="print progress every N conversations")
+    args = parser.parse_args()
+
+    from main2 import agent_usage, email_queue, warm_up
+
+    warm_up()
+    output = args.output or os.path.splitext(args.input)[0] + ".results.jsonl"
+    stats = await run_batch(args.input, output, args.concurrency, args.progress_every)
+    print(stats.summary())
+    print(agent_usage.summary())
+
+    # Let queued emails finish before exiting
+    if email_queue.pending:
+        print(f"📨 Waiting for {email_queue.pending} queued email(s)...")
+        await asyncio.to_thread(email_queue.shutdown)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
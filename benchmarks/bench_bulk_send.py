@@ -0,0 +1,96 @@
+"""Throughput of a queued bulk send vs one connect-and-login send per recipient.
+
+The bulk side is the path bulk_send_email_tool takes: render every
+message, outbox.queue_bulk, then the email queue's workers deliver them
+over the shared SMTP pool. The SMTP sends/min limit is off by default so
+the pipeline itself is measured; pass --smtp-per-minute to apply one.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_bulk_send --recipients 1000 --login-delay 0.02
+"""
+import argparse
+import os
+import smtplib
+import time
+from email.mime.text import MIMEText
+
+from benchmarks.fake_smtp import FakeSMTPServer
+from bulk_send import render_messages
+
+SENDER = "bench@example.com"
+SUBJECT = "Your {plan} plan, {name}"
+BODY = "Hi {name},\n\nThanks for being a {plan} customer since {since}.\n\nBest regards"
+
+
+def make_recipients(n):
+    return [
+        {"email": f"user{i}@example.com", "name": f"User {i}", "plan": "pro", "since": "2021"}
+        for i in range(n)
+    ]
+
+
+def per_recipient(host, port, recipients):
+    """Baseline: render + connect + login + send for every recipient"""
+    for recipient, subject, body in render_messages(recipients, SUBJECT, BODY):
+        msg = MIMEText(body)
+        msg["Subject"] = subject
+        msg["From"] = SENDER
+        msg["To"] = recipient
+        with smtplib.SMTP(host, port) as server:
+            server.login(SENDER, "secret")
+            server.sendmail(SENDER, [recipient], msg.as_string())
+
+
+def queued(recipients):
+    """What bulk_send_email_tool does, timed until the last email is delivered"""
+    from outbox import email_queue, queue_bulk
+
+    batch = queue_bulk(render_messages(recipients, SUBJECT, BODY))
+    while not batch.done:
+        time.sleep(0.005)
+    email_queue.shutdown()
+    return batch
+
+
+def report(label, count, elapsed):
+    print(f"{label:<14} {count} msgs in {elapsed:.2f}s  →  {count / elapsed:,.0f} msg/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recipients", type=int, default=500)
+    parser.add_argument("--login-delay", type=float, default=0.02,
+                        help="simulated TLS handshake + login cost in seconds")
+    parser.add_argument("--smtp-per-minute", type=float, default=0,
+                        help="SMTP sends/min limit for the queued send (0 = unlimited)")
+    args = parser.parse_args()
+
+    recipients = make_recipients(args.recipients)
+    with FakeSMTPServer(login_delay=args.login_delay) as server:
+        start = time.perf_counter()
+        per_recipient(server.host, server.port, recipients)
+        baseline = time.perf_counter() - start
+        report("per-recipient", len(recipients), baseline)
+
+        # outbox reads these when it is first imported
+        os.environ.update({
+            "EMAIL_ADDRESS": SENDER,
+            "EMAIL_PASSWORD": "secret",
+            "SMTP_HOST": server.host,
+            "SMTP_PORT": str(server.port),
+            "SMTP_USE_SSL": "0",
+            "SMTP_REQUESTS_PER_MINUTE": str(args.smtp_per_minute),
+        })
+        logins = server.logins
+        start = time.perf_counter()
+        batch = queued(recipients)
+        bulk = time.perf_counter() - start
+        report("queued bulk", len(batch.tickets), bulk)
+
+        print(f"delivered: {batch.count('sent')}/{len(batch.tickets)}  "
+              f"bulk logins: {server.logins - logins}  speedup: {baseline / bulk:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Offline end-to-end benchmark: synthetic conversations, fake model, fake SMTP.
+
+Runs N concurrent conversations through run_turn (fast router, cache,
+triage handoffs, tools, email queue) with every agent's model swapped for
+the scripted FakeModel and email delivered to the in-process SMTP sink. No
+API key or network access is needed.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_conversations --conversations 200 --concurrency 50 --latency 0.2
+
+Use --json to save the numbers as a regression baseline.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import tracemalloc
+
+from benchmarks.fake_smtp import FakeSMTPServer
+
+SCRIPTS = [
+    [
+        "What is the capital of France?",
+        "Write an email to my manager asking for Friday off",
+        "Send it to manager{n}@example.com",
+    ],
+    [
+        "Explain how a TCP handshake works",
+        "Give me three tips for better sleep",
+        "Thanks, that was helpful",
+    ],
+    [
+        "Draft a follow-up email after yesterday's client meeting",
+        "Make it more formal",
+        "send this to client{n}@example.com",
+    ],
+    [
+        "Send an email to team{n}@example.com saying the build is green",
+    ],
+    [
+        # Mid-flow answer: sticky routing sends it straight back to the send agent
+        "Send an email about the Q3 numbers",
+        "It goes to finance{n}@example.com",
+    ],
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+def configure_environment(smtp_port, cache, speculative=False, fast_router=True, sticky=True, templates=True):
+    """Point the app at the fake SMTP sink before main2 is imported"""
+    os.environ.update({
+        "EMAIL_ADDRESS": "bench@example.com",
+        "EMAIL_PASSWORD": "secret",
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_PORT": str(smtp_port),
+        "SMTP_USE_SSL": "0",
+        "TRACE_FILE": "",
+        "RESPONSE_CACHE": "1" if cache else "0",
+        "SPECULATIVE_DRAFTING": "1" if speculative else "0",
+        "FAST_ROUTER": "1" if fast_router else "0",
+        "STICKY_ROUTING": "1" if sticky else "0",
+        "DRAFT_TEMPLATES": "1" if templates else "0",
+    })
+    # Measure the pipeline, not the production rate limits (override to test them)
+    for name in ("OPENAI_REQUESTS_PER_MINUTE", "OPENAI_MAX_CONCURRENT", "SMTP_REQUESTS_PER_MINUTE"):
+        os.environ.setdefault(name, "0")
+
+
+async def run_conversation(n, script, run_config, latencies):
+    from conversation_memory import ConversationMemory
+    from main2 import run_turn
+
+    memory = ConversationMemory.from_env()
+    for template in script:
+        message = template.format(n=n)
+        agent_input = memory.build_input(message)
+        start = time.perf_counter()
+        result = await run_turn(message, agent_input, run_config=run_config, context=memory)
+        latencies.append(time.perf_counter() - start)
+        memory.record(agent_input, result)
+    return memory
+
+
+async def run_benchmark(conversations, concurrency, run_config):
+    slots = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def bounded(n):
+        async with slots:
+            return await run_conversation(n, SCRIPTS[n % len(SCRIPTS)], run_config, latencies)
+
+    start = time.perf_counter()
+    memories = await asyncio.gather(*(bounded(n) for n in range(conversations)))
+    return memories, latencies, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--conversations", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.1, help="fake model latency per call (s)")
+    parser.add_argument("--per-token-latency", type=float, default=0.0)
+    parser.add_argument("--no-cache", action="store_true", help="disable the response cache")
+    parser.add_argument("--speculative", action="store_true", help="draft speculatively alongside triage")
+    parser.add_argument("--no-fast-router", action="store_true", help="send every turn through triage")
+    parser.add_argument("--no-sticky", action="store_true", help="don't route follow-ups to the active agent")
+    parser.add_argument("--no-templates", action="store_true", help="send every draft to the model")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    with FakeSMTPServer() as smtp:
+        configure_environment(
+            smtp.port, cache=not args.no_cache, speculative=args.speculative,
+            fast_router=not args.no_fast_router, sticky=not args.no_sticky,
+            templates=not args.no_templates,
+        )
+
+        from agents import RunConfig, set_tracing_disabled
+        from benchmarks.fake_model import FakeModelProvider
+        import main2
+
+        set_tracing_disabled(True)
+        provider = FakeModelProvider(args.latency, args.per_token_latency)
+        run_config = RunConfig(model_provider=provider, tracing_disabled=True)
+
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        memories, latencies, elapsed = asyncio.run(
+            run_benchmark(args.conversations, args.concurrency, run_config)
+        )
+        retained = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+
+        main2.email_queue.shutdown(timeout=60)
+        results = {
+            "conversations": args.conversations,
+            "concurrency": args.concurrency,
+            "turns": len(latencies),
+            "elapsed_s": round(elapsed, 3),
+            "turns_per_s": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+            "model_calls": provider.calls,
+            "emails_delivered": smtp.message_count,
+            "memory_per_session_kb": round(retained / len(memories) / 1024, 1),
+            "fast_path_hit_rate": round(main2.fast_router.stats.hit_rate, 3),
+            "sticky_follow_ups": sum(main2.fast_router.stats.sticky.values()),
+            "triage_calls_avoided": main2.fast_router.stats.triage_avoided,
+            "template_hit_rate": round(main2.draft_templates.stats.hit_rate, 3) if main2.draft_templates else None,
+            "cache_hit_rate": round(main2.response_cache.stats.hit_rate, 3) if main2.response_cache else None,
+            "speculation_hit_rate": round(main2.speculative_drafter.stats.hit_rate, 3),
+            "speculation_wasted_tokens": main2.speculative_drafter.stats.wasted_tokens,
+        }
+
+    for key, value in results.items():
+        print(f"{key:<24} {value}")
+    print()
+    print(main2.agent_usage.summary())
+    if main2.draft_templates is not None:
+        print(main2.draft_templates.stats.summary())
+    print(main2.model_limiter.summary())
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Peak memory of sending one email with a large attachment: email.message vs mime_stream.
+
+Each send runs in a fresh process (peak RSS is per process) against the
+in-process fake SMTP sink. The email.message path builds the MIME tree,
+renders it with as_string() and hands it to sendmail; the streaming path
+encodes and writes the attachment 64 KB at a time.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_mime_stream --sizes 1 8 32 64
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.fake_smtp import FakeSMTPServer
+
+SENDER = "bench@example.com"
+RECIPIENT = "reports@example.com"
+
+CHILD = """
+import json, resource, smtplib, sys, time
+mode, path, port = sys.argv[1], sys.argv[2], int(sys.argv[3])
+
+def peak_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+with smtplib.SMTP("127.0.0.1", port) as server:
+    server.login("{sender}", "secret")
+    baseline = peak_mb()
+    start = time.perf_counter()
+    if mode == "stream":
+        from mime_stream import StreamingMessage, send_streaming
+        msg = StreamingMessage("{sender}", "{recipient}", "Report", "See attached.", attachments=[path])
+        send_streaming(server, "{sender}", ["{recipient}"], msg)
+    else:
+        from email.mime.application import MIMEApplication
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
+        msg = MIMEMultipart()
+        msg["Subject"], msg["From"], msg["To"] = "Report", "{sender}", "{recipient}"
+        msg.attach(MIMEText("See attached."))
+        with open(path, "rb") as f:
+            msg.attach(MIMEApplication(f.read(), Name="report.bin"))
+        server.sendmail("{sender}", ["{recipient}"], msg.as_string())
+    seconds = time.perf_counter() - start
+print(json.dumps({{"baseline_mb": baseline, "peak_mb": peak_mb(), "seconds": seconds}}))
+""".format(sender=SENDER, recipient=RECIPIENT)
+
+
+def measure(mode, path, port):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.run(
+        [sys.executable, "-c", CHILD, mode, path, str(port)],
+        cwd=root, capture_output=True, text=True, check=True,
+    )
+    return json.loads(proc.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 8, 32, 64], help="attachment sizes in MB")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    with FakeSMTPServer() as smtp, tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            path = os.path.join(tmp, f"report-{size}mb.bin")
+            with open(path, "wb") as f:
+                for _ in range(size):
+                    f.write(os.urandom(1024 * 1024))
+            for mode in ("email.message", "stream"):
+                m = measure(mode, path, smtp.port)
+                growth = m["peak_mb"] - m["baseline_mb"]
+                results.append({"size_mb": size, "mode": mode, "peak_rss_mb": round(m["peak_mb"], 1),
+                                "growth_mb": round(growth, 1), "seconds": round(m["seconds"], 3)})
+                print(f"{size:>4} MB  {mode:<14} peak RSS {m['peak_mb']:7.1f} MB  "
+                      f"(+{growth:6.1f} MB while sending)  {m['seconds']:.2f}s")
+        print(f"\n{smtp.message_count} messages, {smtp.bytes_received / 1e6:.0f} MB received by the sink")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
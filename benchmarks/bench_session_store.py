@@ -0,0 +1,89 @@
+"""Read/append latency of the session stores at 10k+ sessions.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_session_store --sessions 10000 --turns 4
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from session_store import MemorySessionStore, SQLiteSessionStore
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def report(label, samples):
+    us = [s * 1e6 for s in samples]
+    print(f"{label:<28} n={len(us):<6} p50={percentile(us, 50):7.1f}µs  "
+          f"p99={percentile(us, 99):8.1f}µs  mean={statistics.fmean(us):7.1f}µs")
+
+
+def turn_items(session, turn):
+    return [
+        {"role": "user", "content": f"Session {session} turn {turn}: please draft a follow-up email."},
+        {"role": "assistant", "content": "Subject: Follow-up\n\nHi there, just checking in on our last call. " * 3},
+    ]
+
+
+def fill(store, sessions, turns):
+    appends = []
+    for turn in range(turns):
+        for s in range(sessions):
+            session_id = f"session-{s}"
+            memory = store.load(session_id)
+            memory.add_turn(turn_items(s, turn))
+            start = time.perf_counter()
+            store.save(session_id, memory)
+            appends.append(time.perf_counter() - start)
+    return appends
+
+
+def reads(store, sessions, count):
+    samples = []
+    for _ in range(count):
+        session_id = f"session-{random.randrange(sessions)}"
+        start = time.perf_counter()
+        store.load(session_id)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--reads", type=int, default=5000)
+    parser.add_argument("--cache-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    memory_store = MemorySessionStore(max_sessions=args.sessions)
+    report("memory append", fill(memory_store, args.sessions, args.turns))
+    report("memory read", reads(memory_store, args.sessions, args.reads))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.db")
+        sqlite_store = SQLiteSessionStore(path, cache_size=args.cache_size)
+        report("sqlite append", fill(sqlite_store, args.sessions, args.turns))
+        report(f"sqlite read (LRU {args.cache_size})", reads(sqlite_store, args.sessions, args.reads))
+        # Active conversations: a working set that fits in the cache
+        hot = max(1, args.cache_size // 2)
+        report("sqlite hot read (LRU)", reads(sqlite_store, hot, args.reads))
+        sqlite_store.close()
+
+        # Fresh process view: nothing cached, every read hits disk
+        cold_store = SQLiteSessionStore(path, cache_size=0)
+        report("sqlite read (uncached)", reads(cold_store, args.sessions, args.reads))
+        report("sqlite hot read (uncached)", reads(cold_store, hot, args.reads))
+        print(f"db size: {os.path.getsize(path) / 1e6:.1f} MB for {args.sessions} sessions")
+        cold_store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Compare per-message SMTP logins against the pooled connection manager.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_smtp_pool --messages 500 --login-delay 0.05
+"""
+import argparse
+import smtplib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.mime.text import MIMEText
+
+from benchmarks.fake_smtp import FakeSMTPServer
+from smtp_pool import SMTPConnectionPool
+
+SENDER = "bench@example.com"
+
+
+def build_message(i):
+    msg = MIMEText(f"Benchmark message {i}")
+    msg["Subject"] = f"Benchmark {i}"
+    msg["From"] = SENDER
+    msg["To"] = f"user{i}@example.com"
+    return msg.as_string()
+
+
+def send_unpooled(host, port, i):
+    with smtplib.SMTP(host, port) as server:
+        server.login(SENDER, "secret")
+        server.sendmail(SENDER, [f"user{i}@example.com"], build_message(i))
+
+
+def run(label, fn, messages, workers):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(fn, range(messages)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} {messages} msgs in {elapsed:.2f}s  →  {messages / elapsed:,.0f} msg/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--login-delay", type=float, default=0.02,
+                        help="simulated TLS handshake + login cost in seconds")
+    args = parser.parse_args()
+
+    with FakeSMTPServer(login_delay=args.login_delay) as server:
+        unpooled = run("unpooled", lambda i: send_unpooled(server.host, server.port, i),
+                       args.messages, args.workers)
+        logins_before = server.logins
+
+        pool = SMTPConnectionPool(
+            host=server.host, port=server.port, username=SENDER, password="secret",
+            use_ssl=False, max_connections=args.workers,
+        )
+        pooled = run("pooled", lambda i: pool.sendmail(SENDER, [f"user{i}@example.com"], build_message(i)),
+                     args.messages, args.workers)
+        pool.close()
+
+        print(f"logins: unpooled={logins_before}  pooled={server.logins - logins_before}")
+        print(f"speedup: {unpooled / pooled:.1f}x  pool stats: {pool.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Cold-start cost of the CLI and the Streamlit app, from ``python -X importtime``.
+
+Each measurement runs in a fresh interpreter, so nothing is cached in
+sys.modules (the OS file cache does stay warm; the first run is dropped).
+Reports:
+
+    - import time of main2 (what the CLI, app2.py and chat_server.py pay)
+      and of bot_agents (the Agents SDK half, deferred to first use),
+      with the slowest modules by self time;
+    - CLI wall time from launch to the first prompt and exit;
+    - time to build the agents on first use (get_agents);
+    - per-rerun overhead of app2.py (Streamlit re-executes the whole
+      script on every interaction), if streamlit is installed.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def python(code=None, script=None, importtime=False, stdin=""):
+    """Run a fresh interpreter in the repo root; returns (wall seconds, stdout, stderr, exit code)"""
+    env = dict(os.environ, OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "sk-bench"))
+    command = [sys.executable] + (["-X", "importtime"] if importtime else [])
+    command += [script] if script else ["-c", code]
+    start = time.perf_counter()
+    proc = subprocess.run(command, cwd=ROOT, env=env, input=stdin, capture_output=True, text=True, timeout=120)
+    return time.perf_counter() - start, proc.stdout, proc.stderr, proc.returncode
+
+
+def parse_importtime(stderr):
+    """[(self µs, cumulative µs, depth, module)] from -X importtime output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return rows
+
+
+def profile_import(module, runs, top):
+    """Median cumulative import time of ``module`` and its slowest dependencies"""
+    totals, last_rows = [], []
+    for i in range(runs + 1):
+        _, _, stderr, code = python(f"import {module}", importtime=True)
+        if code != 0:
+            return {"error": stderr.strip().splitlines()[-1]}
+        rows = parse_importtime(stderr)
+        if i == 0:
+            continue  # warms the OS file cache and __pycache__
+        totals.append(next(c for s, c, d, name in rows if name == module and d == 0) / 1000)
+        last_rows = rows
+    slowest = sorted(last_rows, key=lambda r: -r[0])[:top]
+    return {
+        "import_ms": round(statistics.median(totals), 1),
+        "modules": len(last_rows),
+        "slowest_self_ms": {name: round(s / 1000, 1) for s, c, d, name in slowest},
+    }
+
+
+def measure(snippet, runs):
+    """Median of the float a snippet prints, over fresh interpreters"""
+    samples = []
+    for _ in range(runs):
+        _, stdout, stderr, code = python(snippet)
+        if code != 0:
+            return {"error": stderr.strip().splitlines()[-1]}
+        samples.append(float(stdout.strip().splitlines()[-1]))
+    return round(statistics.median(samples), 1)
+
+
+def cli_cold_start(runs):
+    """Launch `python main2.py`, answer the first prompt with `exit`"""
+    samples = []
+    for i in range(runs + 1):
+        seconds, stdout, stderr, code = python(script="main2.py", stdin="exit\n")
+        if code != 0:
+            return {"error": stderr.strip().splitlines()[-1]}
+        if i:
+            samples.append(seconds * 1000)
+    return round(statistics.median(samples), 1)
+
+
+FIRST_AGENTS = """
+import time, main2
+start = time.perf_counter()
+main2.get_agents()
+print((time.perf_counter() - start) * 1000)
+"""
+
+APP_RERUNS = """
+import runpy, statistics, time, warnings
+warnings.filterwarnings("ignore")
+import streamlit
+times = []
+for _ in range({reruns}):
+    start = time.perf_counter()
+    runpy.run_path("app2.py", run_name="__main__")
+    times.append((time.perf_counter() - start) * 1000)
+print(f"{{times[0]}} {{statistics.median(times[1:])}}")
+"""
+
+
+def app_reruns(reruns):
+    """First execution of app2.py and the median of the following reruns (bare mode)"""
+    _, stdout, stderr, code = python(APP_RERUNS.format(reruns=reruns))
+    if code != 0:
+        return {"error": stderr.strip().splitlines()[-1]}
+    first, rerun = (float(v) for v in stdout.strip().splitlines()[-1].split())
+    return {"first_run_ms": round(first, 1), "rerun_ms": round(rerun, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument("--reruns", type=int, default=20, help="app2.py executions in one interpreter")
+    parser.add_argument("--top", type=int, default=8, help="slowest modules to list")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = {
+        "import main2": profile_import("main2", args.runs, args.top),
+        "import bot_agents": profile_import("bot_agents", args.runs, args.top),
+        "cli_to_first_prompt_ms": cli_cold_start(args.runs),
+        "first_get_agents_ms": measure(FIRST_AGENTS, args.runs),
+        "streamlit_app2": app_reruns(args.reruns),
+    }
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
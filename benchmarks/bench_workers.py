@@ -0,0 +1,115 @@
+"""Load test for supervisor.py: throughput of N worker processes with a fake model.
+
+Runs the bench_conversations scripts as independent sessions (random
+session ids, as app2's get_session_id makes them) through a WorkerPool,
+once per worker count. Every worker uses the scripted FakeModel via the
+WORKER_SETUP hook; --cpu-ms adds CPU-bound work per model call, which is
+what a single process can't spread over cores. Email goes to the
+in-process SMTP sink. No API key or network access is needed.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_workers --workers 1 2 4 --sessions 200 --concurrency 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+
+from benchmarks.bench_conversations import SCRIPTS, configure_environment, percentile
+from benchmarks.fake_smtp import FakeSMTPServer
+
+
+async def run_load(pool, sessions, concurrency):
+    from chat_server import ServerBusy
+
+    slots = asyncio.Semaphore(concurrency)
+    latencies = []
+    counts = {"rejected": 0, "errors": 0}
+
+    async def session(n):
+        session_id = str(uuid.uuid4())
+        async with slots:
+            for template in SCRIPTS[n % len(SCRIPTS)]:
+                start = time.perf_counter()
+                while True:
+                    try:
+                        await pool.chat(session_id, template.format(n=n))
+                        break
+                    except ServerBusy:
+                        counts["rejected"] += 1
+                        await asyncio.sleep(0.1)
+                    except Exception:
+                        counts["errors"] += 1
+                        break
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(n) for n in range(sessions)))
+    return latencies, counts, time.perf_counter() - start
+
+
+async def measure(workers, sessions, concurrency):
+    from supervisor import WorkerPool
+
+    pool = WorkerPool(workers, drain_timeout=60)
+    await pool.start()
+    try:
+        latencies, counts, elapsed = await run_load(pool, sessions, concurrency)
+    finally:
+        health = pool.health()
+        await pool.shutdown()
+    return {
+        "workers": workers,
+        "turns": len(latencies),
+        "elapsed_s": round(elapsed, 3),
+        "turns_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "rejected": counts["rejected"],
+        "errors": counts["errors"],
+        "turns_per_worker": [w["completed"] for w in health["workers"]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=64, help="sessions in flight at once")
+    parser.add_argument("--latency", type=float, default=0.1, help="fake model latency per call (s)")
+    parser.add_argument("--cpu-ms", type=float, default=20.0, help="CPU-bound work per model call (ms)")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    with FakeSMTPServer() as smtp:
+        # Workers inherit this environment
+        configure_environment(smtp.port, cache=False)
+        os.environ.update({
+            "WORKER_SETUP": "benchmarks.fake_model:worker_run_config",
+            "FAKE_MODEL_LATENCY": str(args.latency),
+            "FAKE_MODEL_CPU_MS": str(args.cpu_ms),
+            # Queue rather than shed load, so every run does the same work
+            "SERVER_MAX_WAITING_RUNS": str(args.concurrency),
+        })
+        for workers in args.workers:
+            result = asyncio.run(measure(workers, args.sessions, args.concurrency))
+            result["speedup"] = round(result["turns_per_s"] / results[0]["turns_per_s"], 2) if results else 1.0
+            results.append(result)
+            print(
+                f"{workers:>3} workers  {result['turns_per_s']:7.1f} turns/s  (x{result['speedup']:.2f})  "
+                f"p50 {result['p50_ms']:7.1f} ms  p95 {result['p95_ms']:7.1f} ms  "
+                f"{result['rejected']} rejected, {result['errors']} errors  per worker {result['turns_per_worker']}"
+            )
+        print(f"\n{smtp.message_count} emails delivered to the sink")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
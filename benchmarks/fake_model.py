@@ -0,0 +1,215 @@
+"""Deterministic stand-in for the OpenAI model, for offline benchmarks.
+
+Plug it in with ``RunConfig(model_provider=FakeModelProvider(...))``: every
+agent's ``model="gpt-4"`` then resolves to a FakeModel, which scripts the
+same decisions the real agents make (triage handoffs, send_email_tool
+calls, plain replies) after a configurable simulated latency.
+"""
+import asyncio
+import json
+import os
+import re
+import time
+import uuid
+
+from agents.items import ModelResponse
+from agents.models.interface import Model, ModelProvider
+from agents.usage import Usage
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseFunctionToolCall,
+    ResponseOutputMessage,
+    ResponseOutputText,
+    ResponseTextDeltaEvent,
+)
+
+EMAIL_ADDRESS = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+SEND_WORDS = re.compile(r"\b(send|forward|mail it|email it|email this)\b", re.I)
+DRAFT_WORDS = re.compile(r"\b(write|draft|compose|rewrite)\b", re.I)
+
+
+def _text_of(item):
+    content = item.get("content")
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return ""
+
+
+class FakeModel(Model):
+    """Scripted model: decides from the latest user message and available tools"""
+
+    def __init__(self, name, latency=0.05, per_token_latency=0.0, cpu_seconds=0.0):
+        self.name = name
+        self.latency = latency
+        self.per_token_latency = per_token_latency
+        self.cpu_seconds = cpu_seconds  # busy work per call, like parsing a real response
+        self.calls = 0
+
+    # Scripting
+    def _decide(self, input, tools, handoffs, output_schema=None):
+        items = [{"role": "user", "content": input}] if isinstance(input, str) else list(input)
+        items = [i if isinstance(i, dict) else i.model_dump() for i in items]
+        last = items[-1] if items else {}
+        user_text = next((_text_of(i) for i in reversed(items) if i.get("role") == "user"), "")
+
+        # A tool just ran: summarise its output
+        if last.get("type") == "function_call_output":
+            return [self._message(f"Done. {last.get('output', '')}")]
+
+        # Structured send extraction (EmailRequest)
+        if output_schema is not None:
+            return [self._message(json.dumps({
+                "recipients": EMAIL_ADDRESS.findall(user_text),
+                "cc": [],
+                "bcc": [],
+                "draft_id": "",
+                "subject": "Benchmark email",
+                "body": f"Automated benchmark message.\n\n{user_text}",
+                "attachments": [],
+                "bulk": False,
+            }))]
+
+        handoff_by_agent = {h.agent_name: h.tool_name for h in handoffs}
+        if handoff_by_agent:
+            if SEND_WORDS.search(user_text):
+                target = next((n for n in handoff_by_agent if "Send" in n), None)
+                if target:
+                    return [self._call(handoff_by_agent[target], {})]
+            if DRAFT_WORDS.search(user_text):
+                target = next((n for n in handoff_by_agent if "Draft" in n), None)
+                if target:
+                    return [self._call(handoff_by_agent[target], {})]
+
+        tool_names = {t.name for t in tools}
+        address = EMAIL_ADDRESS.search(user_text)
+        if "send_email_tool" in tool_names and address:
+            return [self._call("send_email_tool", {
+                "recipient": address.group(0),
+                "subject": "Benchmark email",
+                "body": f"Automated benchmark message.\n\n{user_text}",
+                "cc": "",
+                "bcc": "",
+                "attachments": "",
+            })]
+
+        # Free-form slot of a template draft (draft_templates.gap_prompt)
+        if "Write only this part of the email" in user_text:
+            return [self._message("I wanted to check whether you had a chance to look at it.")]
+
+        if DRAFT_WORDS.search(user_text):
+            return [self._message(
+                "Subject: Quick follow-up\n\nHi,\n\nJust following up on our last conversation. "
+                "Let me know if you have any questions.\n\nBest regards"
+            )]
+        return [self._message(f"Here is a short answer about: {user_text[:80]}")]
+
+    @staticmethod
+    def _message(text):
+        return ResponseOutputMessage(
+            id=f"msg_{uuid.uuid4().hex[:12]}",
+            content=[ResponseOutputText(text=text, type="output_text", annotations=[])],
+            role="assistant",
+            status="completed",
+            type="message",
+        )
+
+    @staticmethod
+    def _call(name, arguments):
+        return ResponseFunctionToolCall(
+            id=f"fc_{uuid.uuid4().hex[:12]}",
+            call_id=f"call_{uuid.uuid4().hex[:12]}",
+            name=name,
+            arguments=json.dumps(arguments),
+            type="function_call",
+            status="completed",
+        )
+
+    @staticmethod
+    def _usage(input, output):
+        prompt = len(json.dumps(input, default=str)) // 4
+        completion = sum(len(json.dumps(o.model_dump())) for o in output) // 4
+        return Usage(requests=1, input_tokens=prompt, output_tokens=completion, total_tokens=prompt + completion)
+
+    async def _simulate_latency(self, output):
+        tokens = sum(len(json.dumps(o.model_dump())) for o in output) // 4
+        await asyncio.sleep(self.latency + tokens * self.per_token_latency)
+        # Holds the GIL and the event loop, as CPU-bound work does
+        deadline = time.perf_counter() + self.cpu_seconds
+        while time.perf_counter() < deadline:
+            pass
+
+    # Model interface
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema,
+                           handoffs, tracing, *args, **kwargs):
+        self.calls += 1
+        output = self._decide(input, tools, handoffs, output_schema)
+        await self._simulate_latency(output)
+        return ModelResponse(output=output, usage=self._usage(input, output), response_id=None)
+
+    async def stream_response(self, system_instructions, input, model_settings, tools, output_schema,
+                              handoffs, tracing, *args, **kwargs):
+        self.calls += 1
+        output = self._decide(input, tools, handoffs, output_schema)
+        await self._simulate_latency(output)
+        sequence = 0
+        for item in output:
+            if isinstance(item, ResponseOutputMessage):
+                for word in re.findall(r"\S+\s*", item.content[0].text):
+                    yield ResponseTextDeltaEvent(
+                        content_index=0, delta=word, item_id=item.id, output_index=0,
+                        type="response.output_text.delta", sequence_number=sequence, logprobs=[],
+                    )
+                    sequence += 1
+        yield ResponseCompletedEvent(
+            type="response.completed",
+            sequence_number=sequence,
+            response=Response(
+                id=f"resp_{uuid.uuid4().hex[:12]}",
+                created_at=0,
+                model=self.name,
+                object="response",
+                output=output,
+                tool_choice="auto",
+                tools=[],
+                top_p=None,
+                parallel_tool_calls=False,
+            ),
+        )
+
+
+class FakeModelProvider(ModelProvider):
+    """Resolves every model name to a shared FakeModel"""
+
+    def __init__(self, latency=0.05, per_token_latency=0.0, cpu_seconds=0.0):
+        self.models = {}
+        self.latency = latency
+        self.per_token_latency = per_token_latency
+        self.cpu_seconds = cpu_seconds
+
+    def get_model(self, model_name):
+        name = model_name or "fake"
+        if name not in self.models:
+            self.models[name] = FakeModel(name, self.latency, self.per_token_latency, self.cpu_seconds)
+        return self.models[name]
+
+    @property
+    def calls(self):
+        return sum(m.calls for m in self.models.values())
+
+
+def worker_run_config():
+    """WORKER_SETUP hook for supervisor.py: every worker's turns use the fake model
+
+    Reads FAKE_MODEL_LATENCY and FAKE_MODEL_CPU_MS.
+    """
+    from agents import RunConfig, set_tracing_disabled
+
+    set_tracing_disabled(True)
+    provider = FakeModelProvider(
+        float(os.getenv("FAKE_MODEL_LATENCY", "0.05")),
+        cpu_seconds=float(os.getenv("FAKE_MODEL_CPU_MS", "0")) / 1000,
+    )
+    return RunConfig(model_provider=provider, tracing_disabled=True)
@@ -0,0 +1,146 @@
+import asyncio
+import threading
+import time
+
+
+class FakeSMTPServer:
+    """Minimal in-process SMTP sink for benchmarks.
+
+    Speaks just enough ESMTP (EHLO/HELO, AUTH PLAIN/LOGIN, MAIL, RCPT, DATA,
+    RSET, NOOP, QUIT) for ``smtplib`` to deliver to it. Messages are counted
+    and optionally kept in ``messages``. ``login_delay`` simulates the TLS
+    handshake + authentication cost of a real provider.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, login_delay=0.0, keep_messages=False):
+        self.host = host
+        self.port = port
+        self.login_delay = login_delay
+        self.keep_messages = keep_messages
+        self.messages = []
+        self.message_count = 0
+        self.bytes_received = 0
+        self.logins = 0
+        self.sessions = 0
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    # Protocol
+    async def _handle(self, reader, writer):
+        self.sessions += 1
+
+        async def reply(line):
+            writer.write(line.encode() + b"\r\n")
+            await writer.drain()
+
+        await reply("220 fake-smtp ready")
+        mail_from, rcpts = None, []
+        try:
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    break
+                line = raw.decode(errors="replace").rstrip("\r\n")
+                verb = line.split(" ", 1)[0].upper()
+
+                if verb == "EHLO":
+                    writer.write(b"250-fake-smtp\r\n250-8BITMIME\r\n250-SIZE 0\r\n250 AUTH PLAIN LOGIN\r\n")
+                    await writer.drain()
+                elif verb == "HELO":
+                    await reply("250 fake-smtp")
+                elif verb == "AUTH":
+                    parts = line.split()
+                    if parts[1].upper() == "LOGIN":
+                        if len(parts) < 3:
+                            await reply("334 VXNlcm5hbWU6")
+                            await reader.readline()
+                        await reply("334 UGFzc3dvcmQ6")
+                        await reader.readline()
+                    elif len(parts) < 3:
+                        await reply("334 ")
+                        await reader.readline()
+                    if self.login_delay:
+                        await asyncio.sleep(self.login_delay)
+                    self.logins += 1
+                    await reply("235 2.7.0 Authentication successful")
+                elif verb == "MAIL":
+                    mail_from, rcpts = line[10:], []
+                    await reply("250 OK")
+                elif verb == "RCPT":
+                    rcpts.append(line[8:])
+                    await reply("250 OK")
+                elif verb == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    size = 0
+                    chunks = [] if self.keep_messages else None
+                    while True:
+                        data_line = await reader.readline()
+                        if not data_line or data_line == b".\r\n":
+                            break
+                        size += len(data_line)
+                        if chunks is not None:
+                            chunks.append(data_line)
+                    self.message_count += 1
+                    self.bytes_received += size
+                    if chunks is not None:
+                        self.messages.append((mail_from, rcpts, b"".join(chunks)))
+                    await reply("250 OK queued")
+                elif verb in {"RSET", "NOOP"}:
+                    mail_from, rcpts = None, []
+                    await reply("250 OK")
+                elif verb == "QUIT":
+                    await reply("221 Bye")
+                    break
+                else:
+                    await reply("502 Command not implemented")
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    # Lifecycle
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle, self.host, self.port, limit=2 ** 20)
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+        self._server.close()
+        pending = asyncio.all_tasks(self._loop)
+        for task in pending:
+            task.cancel()
+        self._loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        self._loop.run_until_complete(self._server.wait_closed())
+        self._loop.close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="fake-smtp", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    with FakeSMTPServer(port=1025) as server:
+        print(f"Fake SMTP sink listening on {server.host}:{server.port} (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print(f"Received {server.message_count} messages")
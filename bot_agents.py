@@ -0,0 +1,442 @@
+"""Everything that needs the Agents SDK: tools, agents and run hooks.
+
+Importing this pulls in ``agents``, ``openai`` and ``pydantic``, so main2
+only imports it on first use (see main2.get_agents) and keeps the CLI,
+the Streamlit app and the server quick to start.
+"""
+import time
+
+from pydantic import BaseModel, Field
+from agents import Agent, handoff, RunContextWrapper, RunHooks, ModelSettings, function_tool
+from agents.models.interface import Model, ModelProvider
+from agents.models.multi_provider import MultiProvider
+from bulk_send import load_recipients, render_messages, resolve_recipients_file
+from email_extraction import is_valid_address, parse_addresses, resolve_attachments
+from outbox import EMAIL_QUEUED, email_queue, describe_ticket, email_config_error, queue_bulk, queue_email
+from rate_limit import retry_after
+
+
+# Email sending tool with proper decorator
+@function_tool
+def send_email_tool(recipient: str, subject: str, body: str, cc: str, bcc: str, attachments: str) -> str:
+    """Queue an email for delivery via SMTP to the specified recipients.
+
+    The email is sent in the background; use email_status_tool with the
+    returned ticket id to check whether it was delivered.
+
+    Args:
+        recipient: Email address of the recipient (several may be comma-separated)
+        subject: Subject line of the email
+        body: Main content/message of the email
+        cc: Comma-separated addresses to CC (empty string if none)
+        bcc: Comma-separated addresses to BCC (empty string if none)
+        attachments: Comma-separated file names from the attachments folder (empty string if none)
+
+    Returns:
+        Delivery ticket or error message
+    """
+    error = email_config_error()
+    if error:
+        return error
+
+    # Validate every address and file locally before queueing anything
+    to, invalid = parse_addresses(recipient)
+    cc_list, invalid_cc = parse_addresses(cc)
+    bcc_list, invalid_bcc = parse_addresses(bcc)
+    invalid += invalid_cc + invalid_bcc
+    if invalid or not to:
+        return f"❌ Invalid email format: {', '.join(invalid) or recipient}"
+    files, problems = resolve_attachments(attachments)
+    if problems:
+        return f"❌ Invalid attachment: {'; '.join(problems)}"
+
+    return queue_email(to, subject, body, cc_list, bcc_list, files)
+
+@function_tool
+def email_status_tool(ticket_id: str) -> str:
+    """Check the delivery status of a previously queued email or bulk send.
+
+    Args:
+        ticket_id: Ticket id returned by send_email_tool, send_draft_tool or bulk_send_email_tool
+
+    Returns:
+        Current delivery status
+    """
+    ticket = email_queue.status(ticket_id.strip())
+    if ticket is None:
+        return f"❌ Unknown delivery ticket: {ticket_id}"
+    return describe_ticket(ticket)
+
+def session_drafts(ctx):
+    """DraftStore of the conversation the run belongs to (None without a session)"""
+    return getattr(ctx.context, "drafts", None)
+
+@function_tool
+def send_draft_tool(ctx: RunContextWrapper, draft_id: str, recipient: str, cc: str, bcc: str, attachments: str) -> str:
+    """Queue a saved draft for delivery without repeating its text.
+
+    Args:
+        draft_id: Id of the saved draft, e.g. "d1"
+        recipient: Email address of the recipient (several may be comma-separated)
+        cc: Comma-separated addresses to CC (empty string if none)
+        bcc: Comma-separated addresses to BCC (empty string if none)
+        attachments: Comma-separated file names from the attachments folder (empty string if none)
+
+    Returns:
+        Delivery ticket or error message
+    """
+    error = email_config_error()
+    if error:
+        return error
+
+    drafts = session_drafts(ctx)
+    draft = drafts.get(draft_id.strip()) if drafts is not None else None
+    if draft is None:
+        return f"❌ Unknown draft: {draft_id}"
+
+    to, invalid = parse_addresses(recipient)
+    cc_list, invalid_cc = parse_addresses(cc)
+    bcc_list, invalid_bcc = parse_addresses(bcc)
+    invalid += invalid_cc + invalid_bcc
+    if invalid or not to:
+        return f"❌ Invalid email format: {', '.join(invalid) or recipient}"
+    files, problems = resolve_attachments(attachments)
+    if problems:
+        return f"❌ Invalid attachment: {'; '.join(problems)}"
+
+    return queue_email(to, draft["subject"], draft["body"], cc_list, bcc_list, files)
+
+# Bulk sending: one tool call, one queued email per recipient, tracked by a batch ticket
+class TemplateVariable(BaseModel):
+    name: str
+    value: str
+
+class BulkRecipient(BaseModel):
+    email: str
+    variables: list[TemplateVariable]
+
+@function_tool
+def bulk_send_email_tool(
+    recipients: list[BulkRecipient],
+    recipients_file: str,
+    subject_template: str,
+    body_template: str,
+) -> str:
+    """Queue a personalised email to many recipients in one go.
+
+    Templates use {placeholder} syntax, filled per recipient from its
+    variables (or from the CSV/JSONL columns when a file is given). The
+    emails are sent in the background; use email_status_tool with the
+    returned ticket id to follow the batch.
+
+    Args:
+        recipients: Recipients with their template variables (empty list if using a file)
+        recipients_file: Name of a CSV/JSONL file in the recipients folder, with an 'email' column (empty string if not used)
+        subject_template: Subject line template, e.g. "Hello {name}"
+        body_template: Email body template
+
+    Returns:
+        Batch ticket or error message
+    """
+    error = email_config_error()
+    if error:
+        return error
+
+    try:
+        if recipients_file:
+            rows = load_recipients(resolve_recipients_file(recipients_file))
+        else:
+            rows = [{"email": r.email, **{v.name: v.value for v in r.variables}} for r in recipients]
+    except (OSError, ValueError) as e:
+        return f"❌ Could not load recipients: {e}"
+
+    if not rows:
+        return "❌ No recipients given"
+
+    invalid = [r["email"] for r in rows if not is_valid_address(r["email"].strip())]
+    if invalid:
+        return f"❌ Invalid email format: {', '.join(invalid[:10])}"
+
+    batch = queue_bulk(render_messages(rows, subject_template, body_template))
+    queued = f"{EMAIL_QUEUED} for {len(batch.tickets)} recipients (bulk send)\nSubject: {subject_template}\nTicket: {batch.id}"
+    if batch.skipped:
+        queued += f"\n({batch.skipped} already delivered in an earlier run)"
+    return queued
+
+# Rate-limited models: every model call goes through the shared OpenAI limiter
+class RateLimitedModel(Model):
+    """Wraps an Agents SDK Model so every call goes through the shared limiter
+
+    Token cost is estimated from the input size plus max_tokens, then
+    corrected from the response usage. 429s pause the whole limiter for
+    the server's Retry-After and are retried up to ``max_retries`` times
+    (for streams, only before the first event). Anything else the SDK
+    asks of a model (e.g. get_retry_advice in newer releases) is answered
+    by the wrapped one.
+    """
+
+    def __init__(self, model, limiter, estimate_tokens, max_retries=3):
+        self.model = model
+        self.limiter = limiter
+        self.estimate_tokens = estimate_tokens
+        self.max_retries = max_retries
+
+    def __getattr__(self, name):
+        if name == "model":  # not set yet (e.g. while copying): don't recurse
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+    def _estimate(self, system_instructions, input, model_settings):
+        return self.estimate_tokens(system_instructions, input) + (model_settings.max_tokens or 0)
+
+    async def get_response(self, system_instructions, input, model_settings, *args, **kwargs):
+        from openai import RateLimitError
+
+        estimate = self._estimate(system_instructions, input, model_settings)
+        for attempt in range(self.max_retries + 1):
+            async with self.limiter.limit(estimate) as permit:
+                try:
+                    response = await self.model.get_response(system_instructions, input, model_settings, *args, **kwargs)
+                except RateLimitError as e:
+                    if attempt == self.max_retries:
+                        raise
+                    self.limiter.backoff(retry_after(e, attempt))
+                    continue
+                permit.used(response.usage.total_tokens)
+                return response
+
+    async def stream_response(self, system_instructions, input, model_settings, *args, **kwargs):
+        from openai import RateLimitError
+
+        estimate = self._estimate(system_instructions, input, model_settings)
+        for attempt in range(self.max_retries + 1):
+            started = False
+            async with self.limiter.limit(estimate) as permit:
+                try:
+                    async for event in self.model.stream_response(
+                        system_instructions, input, model_settings, *args, **kwargs
+                    ):
+                        started = True
+                        if event.type == "response.completed" and event.response.usage is not None:
+                            permit.used(event.response.usage.total_tokens)
+                        yield event
+                    return
+                except RateLimitError as e:
+                    if started or attempt == self.max_retries:
+                        raise
+                    self.limiter.backoff(retry_after(e, attempt))
+
+
+class RateLimitedModelProvider(ModelProvider):
+    """ModelProvider whose models all share one RateLimiter"""
+
+    def __init__(self, provider, limiter, estimate_tokens):
+        self.provider = provider
+        self.limiter = limiter
+        self.estimate_tokens = estimate_tokens
+
+    def __getattr__(self, name):
+        if name == "provider":
+            raise AttributeError(name)
+        return getattr(self.provider, name)
+
+    def get_model(self, model_name):
+        return RateLimitedModel(self.provider.get_model(model_name), self.limiter, self.estimate_tokens)
+
+
+# Structured output of the send-extraction agent
+class EmailRequest(BaseModel):
+    """Everything needed to send one email, extracted from the conversation"""
+
+    recipients: list[str] = Field(description="Addresses for the To line, exactly as given")
+    cc: list[str] = Field(description="Addresses to CC (empty if none)")
+    bcc: list[str] = Field(description="Addresses to BCC (empty if none)")
+    draft_id: str = Field(description="Id of the saved draft to send (e.g. 'd1'), empty if none")
+    subject: str = Field(description="Subject line, empty if not given or if draft_id is set")
+    body: str = Field(description="Full email body, empty if not given or if draft_id is set")
+    attachments: list[str] = Field(description="File names to attach from the attachments folder (empty if none)")
+    bulk: bool = Field(description="True for personalised sends to a list or a CSV/JSONL file")
+
+
+class BotAgents:
+    """The agent graph plus the rate-limited model provider, built once per process
+
+    Args:
+        model_configs: {agent key: AgentModelConfig} from load_model_config()
+        model_limiter: RateLimiter every model call goes through
+        estimate_tokens: estimate_tokens(system_instructions, input) for the token budget
+    """
+
+    def __init__(self, model_configs, model_limiter, estimate_tokens):
+        # Core Chat Agent
+        self.chat = Agent(
+            name="Core Chat Agent",
+            instructions=(
+                "You are a friendly assistant. Keep answers short, clear, and helpful. "
+                "Answer general questions and provide helpful information."
+            ),
+            model=model_configs["chat"].model,
+            model_settings=ModelSettings(temperature=0.2, **model_configs["chat"].settings()),
+        )
+
+        # Email Drafting Agent
+        self.draft = Agent(
+            name="Email Drafting Agent",
+            instructions=(
+                "You are an assistant that writes email drafts. "
+                "When asked, generate a clear subject line and professional email body. "
+                "Ask for recipient, purpose, and any specific details needed. "
+                "Keep emails polite, professional, and concise. "
+                "Write every draft as 'Subject: <subject>' on the first line followed by the body, with no other commentary. "
+                "Drafts are saved with ids like d1 (shown as 'Saved as draft d1'); when revising one, "
+                "start your reply with its id in brackets, e.g. '[d1]'."
+            ),
+            model=model_configs["draft"].model,
+            model_settings=ModelSettings(temperature=0.3, **model_configs["draft"].settings()),
+        )
+
+        # Email Sending Agent (without Tool wrapper)
+        self.send = Agent(
+            name="Email Sending Agent",
+            instructions=(
+                "You are responsible for sending emails. "
+                "Take the recipient, subject and body from the conversation. "
+                "To send a saved draft (e.g. 'Saved as draft d1'), use send_draft_tool with its id instead of retyping it. "
+                "If anything is missing, ask for all missing details in a single question. "
+                "Once you have all details, use the send_email_tool to send the email right away. "
+                "Files to attach are given by name from the attachments folder. "
+                "Sending is queued: share the ticket id, and use email_status_tool if the user asks whether it went out. "
+                "For many recipients (a list or a CSV/JSONL file) use bulk_send_email_tool once instead of "
+                "calling send_email_tool per recipient."
+            ),
+            tools=[send_email_tool, send_draft_tool, email_status_tool, bulk_send_email_tool],  # Direct function reference
+            model=model_configs["send"].model,
+            model_settings=ModelSettings(temperature=0.2, **model_configs["send"].settings()),
+        )
+
+        # Send-request extraction: one structured call instead of a clarification dialogue
+        self.extract = Agent(
+            name="Email Extraction Agent",
+            instructions=(
+                "Extract the email the user wants to send from the conversation. "
+                "When the user refers to a saved draft ('send it', 'send d2'), set draft_id to its id "
+                "(the most recent 'Saved as draft ...' one unless they name another) and leave subject and body empty. "
+                "If the user states what to say but no subject, write a short subject from it; "
+                "if they give only the gist, write it as a short, polite body. "
+                "Never invent email addresses: leave recipients empty if none were given. "
+                "List files the user asks to attach by name; never invent attachments. "
+                "Set bulk to true only for personalised sends to a list of people or a CSV/JSONL file."
+            ),
+            output_type=EmailRequest,
+            model=model_configs["send"].model,
+            model_settings=ModelSettings(temperature=0.0, **model_configs["send"].settings()),
+        )
+
+        # Main Triage Agent
+        self.triage = Agent(
+            name="Email Bot Triage",
+            instructions=(
+                "You are the main email bot assistant. Direct conversations appropriately:\n\n"
+                "- For general chat and questions → respond normally\n"
+                "- If user wants to write/draft an email → handoff to Email Draft Agent\n"
+                "- If user says 'send' or wants to actually send an email → IMMEDIATELY handoff to Email Send Agent\n"
+                "- Keywords for sending: 'send', 'email to', 'send this', 'send it', 'actually send'\n\n"
+                "When user says 'send this to [email]' or similar - handoff to Email Send Agent right away!\n"
+                "Be friendly and helpful!"
+            ),
+            handoffs=[
+                handoff(agent=self.draft),
+                handoff(agent=self.send),
+            ],
+            model=model_configs["triage"].model,
+            model_settings=ModelSettings(temperature=0.1, **model_configs["triage"].settings()),
+        )
+
+        # Writes the free-form slots of a template-filled draft (draft_templates.py)
+        self.gap_filler = Agent(
+            name="Template Gap Filler",
+            instructions=(
+                "You write one short part of an email that is otherwise already written. "
+                "Reply with only the requested text: no greeting, subject, quotes or sign-off."
+            ),
+            model=model_configs["chat"].model,
+            model_settings=ModelSettings(temperature=0.3, **model_configs["chat"].settings()),
+        )
+
+        self.config_by_name = {
+            self.chat.name: model_configs["chat"],
+            self.draft.name: model_configs["draft"],
+            self.send.name: model_configs["send"],
+            self.triage.name: model_configs["triage"],
+            self.extract.name: model_configs["send"],
+            self.gap_filler.name: model_configs["chat"],
+        }
+        # Fast-router targets
+        self.route_targets = {"chat": self.chat, "draft": self.draft, "send": self.send}
+
+        # Every model call goes through the shared OpenAI limiter
+        self.model_limiter = model_limiter
+        self.estimate_tokens = estimate_tokens
+        self.model_provider = RateLimitedModelProvider(MultiProvider(), model_limiter, estimate_tokens)
+
+    def limit_provider(self, provider):
+        """Wrap a caller-supplied model provider with the shared limiter"""
+        return RateLimitedModelProvider(provider, self.model_limiter, self.estimate_tokens)
+
+# Spans for every agent run, tool call and handoff inside a turn,
+# plus per-agent latency and token usage for the cost report
+class TracingHooks(RunHooks):
+    def __init__(self, tracer, usage_report=None, model=None):
+        self.tracer = tracer
+        self.usage_report = usage_report
+        self.model = model  # RunConfig-level override, if any
+        self.agent_spans = {}
+        self.agent_usage = {}
+        self.tool_spans = {}
+        self.tool_calls = 0
+
+    async def on_agent_start(self, context, agent):
+        model = str(self.model or agent.model)
+        self.agent_spans[agent.name] = self.tracer.start_span(f"agent {agent.name}", model=model)
+        self.agent_usage[agent.name] = (time.perf_counter(), context.usage.input_tokens, context.usage.output_tokens)
+
+    def _end_agent(self, context, agent, **attributes):
+        span = self.agent_spans.pop(agent.name, None)
+        started = self.agent_usage.pop(agent.name, None)
+        if started is not None:
+            input_tokens = context.usage.input_tokens - started[1]
+            output_tokens = context.usage.output_tokens - started[2]
+            attributes.update(input_tokens=input_tokens, output_tokens=output_tokens)
+            if self.usage_report is not None:
+                self.usage_report.record(
+                    agent.name, str(self.model or agent.model), time.perf_counter() - started[0],
+                    input_tokens, output_tokens,
+                )
+        if span is not None:
+            span.set(**attributes)
+            self.tracer.end_span(span)
+
+    async def on_agent_end(self, context, agent, output):
+        self._end_agent(context, agent)
+
+    async def on_handoff(self, context, from_agent, to_agent):
+        self._end_agent(context, from_agent, handoff_to=to_agent.name)
+
+    async def on_tool_start(self, context, agent, tool):
+        self.tool_calls += 1
+        parent = self.agent_spans.get(agent.name)
+        span = self.tracer.start_span(f"tool {tool.name}", parent=parent)
+        self.tool_spans.setdefault((agent.name, tool.name), []).append(span)
+
+    async def on_tool_end(self, context, agent, tool, result):
+        spans = self.tool_spans.get((agent.name, tool.name))
+        if spans:
+            self.tracer.end_span(spans.pop())
+
+    def finish(self, error=None):
+        """Close spans left open by an interrupted run"""
+        for span in list(self.agent_spans.values()) + [s for spans in self.tool_spans.values() for s in spans]:
+            self.tracer.end_span(span, error=error)
+        self.agent_spans.clear()
+        self.agent_usage.clear()
+        self.tool_spans.clear()
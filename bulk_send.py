@@ -0,0 +1,85 @@
+import csv
+import json
+import os
+
+
+class _KeepMissing(dict):
+    """format_map mapping that leaves unknown {placeholders} untouched"""
+
+    def __missing__(self, key):
+        return "{" + key + "}"
+
+
+def render(template, variables):
+    """Fill ``{name}`` style placeholders from a recipient's variables"""
+    try:
+        return template.format_map(_KeepMissing(variables))
+    except (ValueError, IndexError):
+        # Stray braces in free text: fall back to plain replacement
+        for key, value in variables.items():
+            template = template.replace("{" + key + "}", str(value))
+        return template
+
+
+RECIPIENT_FILE_TYPES = (".csv", ".jsonl", ".ndjson")
+
+
+def resolve_recipients_file(name):
+    """Path of a recipients file, which must sit inside RECIPIENTS_DIR (default ./recipients)
+
+    Checked like email_extraction.resolve_attachments, so a model-chosen
+    name can never read .env or anything else on the host.
+    """
+    root = os.path.realpath(os.getenv("RECIPIENTS_DIR", "recipients"))
+    path = os.path.realpath(os.path.join(root, name.strip()))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(f"{name} is outside the recipients folder")
+    if not path.lower().endswith(RECIPIENT_FILE_TYPES):
+        raise ValueError(f"{name} is not a CSV or JSONL file")
+    if not os.path.isfile(path):
+        raise ValueError(f"{name} was not found")
+    return path
+
+
+def load_recipients(path):
+    """Read recipients from a CSV (needs an ``email`` column) or JSONL file.
+
+    Every other column / key becomes a template variable for that recipient.
+    Bad rows are reported by line number only: their contents never end up
+    in an error message (and so never in a tool reply).
+    """
+    recipients = []
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith((".jsonl", ".ndjson")):
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    raise ValueError(f"Line {number} of the recipients file is not valid JSON") from None
+                if not isinstance(row, dict):
+                    raise ValueError(f"Line {number} of the recipients file is not a JSON object")
+                recipients.append((number, row))
+        else:
+            reader = csv.DictReader(f)
+            try:
+                for row in reader:
+                    recipients.append((reader.line_num, row))
+            except csv.Error:
+                raise ValueError(f"Line {reader.line_num} of the recipients file is not valid CSV") from None
+
+    for number, row in recipients:
+        if not isinstance(row.get("email"), str) or not row["email"]:
+            raise ValueError(f"Line {number} of the recipients file has no 'email' field")
+    return [row for _, row in recipients]
+
+
+def render_messages(recipients, subject_template, body_template):
+    """(email, subject, body) for every recipient, rendered from its variables"""
+    messages = []
+    for row in recipients:
+        variables = {k: v for k, v in row.items() if v is not None}
+        messages.append((row["email"], render(subject_template, variables), render(body_template, variables)))
+    return messages
+
@@ -0,0 +1,260 @@
+"""Async HTTP/WebSocket server for the email bot (plain ASGI).
+
+Run with:
+
+    uvicorn chat_server:app --host 0.0.0.0 --port 8000
+
+(or ``python supervisor.py --workers 4`` for the same endpoints served by
+several worker processes)
+
+Endpoints:
+    GET  /health                 scheduler load counters
+    POST /chat                   {"session_id": "...", "message": "..."} → {"session_id", "reply", "agent"}
+    WS   /ws?session_id=...      send {"message": "..."}, receive {"type": "delta"} ... {"type": "done"}
+"""
+import asyncio
+import json
+import os
+import uuid
+from urllib.parse import parse_qs
+
+from dotenv import load_dotenv
+
+from session_store import get_session_store
+from main2 import run_turn, email_queue, describe_run_error, model_limiter, smtp_limiter, warm_up
+
+load_dotenv()
+
+
+class ServerBusy(Exception):
+    """Raised when too many turns are already running or waiting"""
+
+
+class TurnScheduler:
+    """Bounded concurrency toward the model API with load shedding.
+
+    At most ``max_concurrent`` turns run at once; up to ``max_waiting`` more
+    queue for a slot. Beyond that new turns are rejected immediately so the
+    process never builds an unbounded backlog. Turns of the same session are
+    serialised so its history stays consistent.
+    """
+
+    def __init__(self, max_concurrent=8, max_waiting=32):
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._session_locks = {}
+        self.running = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.completed = 0
+
+    async def run(self, session_id, make_coro):
+        if self.running + self.waiting >= self.max_concurrent + self.max_waiting:
+            self.rejected += 1
+            raise ServerBusy("Server is at capacity, please retry shortly")
+
+        # [lock, number of turns holding or waiting for it]
+        entry = self._session_locks.setdefault(session_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        self.waiting += 1
+        waiting = True
+        try:
+            async with entry[0], self._slots:
+                self.waiting -= 1
+                waiting = False
+                self.running += 1
+                try:
+                    return await make_coro()
+                finally:
+                    self.running -= 1
+                    self.completed += 1
+        finally:
+            if waiting:
+                self.waiting -= 1
+            entry[1] -= 1
+            if not entry[1]:
+                del self._session_locks[session_id]
+
+
+scheduler = TurnScheduler(
+    max_concurrent=int(os.getenv("SERVER_MAX_CONCURRENT_RUNS", "8")),
+    max_waiting=int(os.getenv("SERVER_MAX_WAITING_RUNS", "32")),
+)
+sessions = get_session_store()
+
+
+async def chat_turn(session_id, message, on_delta=None, run_config=None):
+    """Run one turn for a session and record it in that session's memory"""
+    async def turn():
+        # Session stores may block on disk (SQLite): keep them off the event loop
+        memory = await asyncio.to_thread(sessions.load, session_id)
+        agent_input = memory.build_input(message)
+        result = await run_turn(message, agent_input, on_delta, run_config=run_config, context=memory)
+        memory.record(agent_input, result)
+        await asyncio.to_thread(sessions.save, session_id, memory)
+        return result
+
+    result = await scheduler.run(session_id, turn)
+    return {"session_id": session_id, "reply": str(result.final_output), "agent": result.last_agent.name}
+
+
+class LocalTurns:
+    """Runs turns in this process (the supervisor's WorkerPool is the multi-process alternative)"""
+
+    chat = staticmethod(chat_turn)
+    describe_error = staticmethod(describe_run_error)
+
+    def health(self):
+        return {
+            "status": "ok",
+            "running": scheduler.running,
+            "waiting": scheduler.waiting,
+            "rejected": scheduler.rejected,
+            "completed": scheduler.completed,
+            "rate_limits": {limiter.name: limiter.snapshot() for limiter in (model_limiter, smtp_limiter)},
+        }
+
+    async def startup(self):
+        # Build the agents off the event loop, ready for the first request
+        warm_up()
+
+    async def shutdown(self):
+        # Let queued emails go out before the process exits
+        await asyncio.to_thread(email_queue.shutdown)
+
+
+# ASGI plumbing
+async def send_json(send, status, payload, headers=()):
+    body = json.dumps(payload).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), *headers],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def handle_http(scope, receive, send, backend):
+    path, method = scope["path"], scope["method"]
+
+    if path == "/health" and method == "GET":
+        await send_json(send, 200, backend.health())
+        return
+
+    if path == "/chat" and method == "POST":
+        try:
+            payload = json.loads(await read_body(receive) or b"{}")
+            message = str(payload["message"]).strip()
+        except (ValueError, KeyError, TypeError):
+            await send_json(send, 400, {"error": "Expected JSON body with a 'message' field"})
+            return
+        if not message:
+            await send_json(send, 400, {"error": "Message must not be empty"})
+            return
+
+        session_id = payload.get("session_id")
+        if session_id is None:
+            session_id = str(uuid.uuid4())
+        elif not isinstance(session_id, str) or not session_id.strip():
+            await send_json(send, 400, {"error": "'session_id' must be a non-empty string"})
+            return
+        try:
+            await send_json(send, 200, await backend.chat(session_id, message))
+        except ServerBusy as e:
+            await send_json(send, 503, {"error": str(e)}, headers=[(b"retry-after", b"2")])
+        except Exception as e:
+            await send_json(send, 500, {"error": backend.describe_error(e)})
+        return
+
+    await send_json(send, 404, {"error": "Not found"})
+
+
+async def handle_websocket(scope, receive, send, backend):
+    if scope["path"] != "/ws":
+        await send({"type": "websocket.close", "code": 4404})
+        return
+
+    query = parse_qs(scope.get("query_string", b"").decode())
+    session_id = query.get("session_id", [None])[0] or str(uuid.uuid4())
+
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+    await send({"type": "websocket.accept"})
+    await send({"type": "websocket.send", "text": json.dumps({"type": "session", "session_id": session_id})})
+
+    while True:
+        message = await receive()
+        if message["type"] == "websocket.disconnect":
+            return
+        try:
+            text = message.get("text") or (message.get("bytes") or b"").decode()
+            user_input = str(json.loads(text)["message"]).strip()
+        except (ValueError, KeyError, TypeError):
+            await send({"type": "websocket.send", "text": json.dumps({"type": "error", "error": "Expected {\"message\": ...}"})})
+            continue
+
+        deltas = asyncio.Queue()
+        forward_task = asyncio.create_task(_forward_deltas(deltas, send))
+        try:
+            reply = await backend.chat(session_id, user_input, deltas.put_nowait)
+            event = {"type": "done", **reply}
+        except ServerBusy as e:
+            event = {"type": "busy", "error": str(e), "retry_after": 2}
+        except Exception as e:
+            event = {"type": "error", "error": backend.describe_error(e)}
+        deltas.put_nowait(None)
+        await forward_task
+        await send({"type": "websocket.send", "text": json.dumps(event)})
+
+
+async def _forward_deltas(deltas, send):
+    """Relay streamed text to the client until the None sentinel arrives"""
+    while True:
+        delta = await deltas.get()
+        if delta is None:
+            return
+        await send({"type": "websocket.send", "text": json.dumps({"type": "delta", "text": delta})})
+
+
+async def handle_lifespan(receive, send, backend):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await backend.startup()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await backend.shutdown()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+def asgi_app(backend):
+    """ASGI entry point serving the endpoints above from ``backend`` (LocalTurns or a WorkerPool)"""
+    async def app(scope, receive, send):
+        if scope["type"] == "http":
+            await handle_http(scope, receive, send, backend)
+        elif scope["type"] == "websocket":
+            await handle_websocket(scope, receive, send, backend)
+        elif scope["type"] == "lifespan":
+            await handle_lifespan(receive, send, backend)
+    return app
+
+
+app = asgi_app(LocalTurns())
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host=os.getenv("SERVER_HOST", "127.0.0.1"), port=int(os.getenv("SERVER_PORT", "8000")))
@@ -0,0 +1,246 @@
+import os
+import re
+import json
+from collections import deque
+
+from drafts import DraftStore
+
+_encoding = False  # not loaded yet; None when tiktoken is unavailable
+
+
+def _get_encoding():
+    """tiktoken's cl100k_base, loaded on first use so imports stay fast"""
+    global _encoding
+    if _encoding is False:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:  # tiktoken is optional
+            _encoding = None
+    return _encoding
+
+
+def count_tokens(text):
+    """Token count with tiktoken when installed, else a ~4 chars/token estimate"""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return max(1, (len(text) + 3) // 4)
+
+
+def truncate_tokens(text, max_tokens):
+    """Cut ``text`` down to roughly ``max_tokens`` tokens"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoding = _get_encoding()
+    if encoding is not None:
+        return encoding.decode(encoding.encode(text)[:max_tokens]) + " …"
+    return text[: max_tokens * 4] + " …"
+
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def item_text(item):
+    """Plain text of an input item (message content, tool output, ...)"""
+    content = item.get("content")
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    if "output" in item:
+        return str(item["output"])
+    return json.dumps(item, default=str)
+
+
+def _first_sentence(text, max_chars=200):
+    text = " ".join(text.split())
+    first = _SENTENCE_END.split(text, 1)[0]
+    if len(first) > max_chars:
+        first = first[:max_chars].rstrip() + "…"
+    return first
+
+
+def extractive_summary(turn_items):
+    """One line per turn: the user's request and the final assistant reply"""
+    messages = [i for i in turn_items if i.get("role") in {"user", "assistant"}]
+    parts = []
+    for role in ("user", "assistant"):
+        texts = [item_text(i) for i in messages if i["role"] == role]
+        if texts:
+            parts.append(f"{role.title()}: {_first_sentence(texts[0] if role == 'user' else texts[-1])}")
+    return " / ".join(parts)
+
+
+class ConversationMemory:
+    """Conversation transcript kept within a token budget.
+
+    History is stored as the Agents SDK's structured input items (messages,
+    tool calls and outputs, handoffs) grouped by turn, so each run receives
+    the real transcript rather than a flattened string. Turns are only ever
+    appended, which keeps the prompt prefix byte-identical from one turn to
+    the next and lets provider prompt caching reuse it.
+
+    When the window exceeds ``token_budget`` the oldest whole turns are
+    evicted down to ``compact_ratio`` of the budget in one go and folded into
+    a running summary (capped at ``summary_budget`` tokens). Compacting in
+    chunks rather than one turn at a time means the cached prefix only
+    changes occasionally.
+
+    ``summarize(turn_items) -> str`` can be swapped for something smarter
+    than the default first-sentence extract.
+    """
+
+    def __init__(self, token_budget=1500, summary_budget=300, max_message_tokens=None,
+                 compact_ratio=0.6, summarize=None):
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.max_message_tokens = max_message_tokens or token_budget // 2
+        self.compact_ratio = compact_ratio
+        self.summarize = summarize or extractive_summary
+
+        self.turns = deque()  # {"index": int, "items": [...], "tokens": int}
+        self.window_tokens = 0
+        self.summary_lines = deque()
+        self.summary_tokens = 0
+        self.summarized_count = 0  # items folded into the summary
+        self.compactions = 0
+        self.turn_count = 0  # turns ever added; the next turn's index
+        self.unsaved = []  # (turn index, item) not yet written to a session store
+        self.drafts = DraftStore()
+        self.active_agent = None  # route target ("draft"/"send") awaiting the user's answer
+        self.sticky_turns = 0  # consecutive follow-ups routed straight to it
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            token_budget=int(os.getenv("MEMORY_TOKEN_BUDGET", "1500")),
+            summary_budget=int(os.getenv("MEMORY_SUMMARY_BUDGET", "300")),
+        )
+
+    def __len__(self):
+        return self.summarized_count + sum(len(t["items"]) for t in self.turns)
+
+    @property
+    def items(self):
+        return [item for turn in self.turns for item in turn["items"]]
+
+    def _prepare(self, item):
+        """Cap oversized message/tool-output text and return (item, tokens)"""
+        if isinstance(item.get("content"), str):
+            item = {**item, "content": truncate_tokens(item["content"], self.max_message_tokens)}
+        elif isinstance(item.get("output"), str):
+            item = {**item, "output": truncate_tokens(item["output"], self.max_message_tokens)}
+        return item, count_tokens(item_text(item))
+
+    def add_turn(self, items):
+        """Append a finished turn (user message plus everything the run produced)"""
+        prepared = [self._prepare(item) for item in items]
+        turn = {"index": self.turn_count, "items": [i for i, _ in prepared], "tokens": sum(t for _, t in prepared)}
+        self.turns.append(turn)
+        self.turn_count += 1
+        self.window_tokens += turn["tokens"]
+        self.unsaved.extend((turn["index"], item) for item in turn["items"])
+        self._compact()
+
+    def append(self, role, content):
+        """Add a plain message; a user message starts a new turn"""
+        if role == "user" or not self.turns:
+            self.add_turn([{"role": role, "content": content}])
+            return
+        item, tokens = self._prepare({"role": role, "content": content})
+        self.turns[-1]["items"].append(item)
+        self.turns[-1]["tokens"] += tokens
+        self.window_tokens += tokens
+        self.unsaved.append((self.turns[-1]["index"], item))
+        self._compact()
+
+    def record(self, agent_input, result):
+        """Store a run's transcript: the new user message and all generated items"""
+        new_items = result.to_input_list()[len(agent_input):]
+        self.add_turn(agent_input[-1:] + new_items)
+
+    def _compact(self):
+        if self.window_tokens <= self.token_budget:
+            return
+        # Evict in one chunk so the cached prefix changes as rarely as possible
+        target = self.token_budget * self.compact_ratio
+        while self.window_tokens > target and len(self.turns) > 1:
+            evicted = self.turns.popleft()
+            self.window_tokens -= evicted["tokens"]
+            self._fold(evicted)
+        self.compactions += 1
+
+    def _fold(self, turn):
+        line = self.summarize(turn["items"])
+        tokens = count_tokens(line)
+        self.summary_lines.append((line, tokens))
+        self.summary_tokens += tokens
+        self.summarized_count += len(turn["items"])
+        while self.summary_tokens > self.summary_budget and len(self.summary_lines) > 1:
+            _, dropped = self.summary_lines.popleft()
+            self.summary_tokens -= dropped
+
+    @property
+    def summary(self):
+        return "\n".join(line for line, _ in self.summary_lines)
+
+    @property
+    def total_tokens(self):
+        return self.window_tokens + self.summary_tokens
+
+    @property
+    def first_turn(self):
+        """Index of the oldest turn still in the window"""
+        return self.turns[0]["index"] if self.turns else self.turn_count
+
+    def clear(self):
+        self.turns.clear()
+        self.window_tokens = 0
+        self.summary_lines.clear()
+        self.summary_tokens = 0
+        self.summarized_count = 0
+        self.unsaved.clear()
+        self.drafts = DraftStore()
+        self.active_agent = None
+        self.sticky_turns = 0
+
+    def snapshot(self):
+        """Summary state a session store needs alongside the turn log"""
+        return {
+            "summary_lines": [list(line) for line in self.summary_lines],
+            "summarized_count": self.summarized_count,
+            "turn_count": self.turn_count,
+            "first_turn": self.first_turn,
+            "drafts": self.drafts.to_dict(),
+            "active_agent": self.active_agent,
+            "sticky_turns": self.sticky_turns,
+        }
+
+    def restore(self, snapshot, turns):
+        """Rebuild from a snapshot plus the items of each turn still in the window"""
+        self.clear()
+        self.summary_lines.extend(tuple(line) for line in snapshot["summary_lines"])
+        self.summary_tokens = sum(tokens for _, tokens in self.summary_lines)
+        self.summarized_count = snapshot["summarized_count"]
+        self.turn_count = snapshot["turn_count"]
+        self.drafts = DraftStore.from_dict(snapshot.get("drafts"))
+        self.active_agent = snapshot.get("active_agent")
+        self.sticky_turns = snapshot.get("sticky_turns", 0)
+        for index, items in turns:
+            tokens = sum(count_tokens(item_text(item)) for item in items)
+            self.turns.append({"index": index, "items": items, "tokens": tokens})
+            self.window_tokens += tokens
+        return self
+
+    def build_input(self, current_message):
+        """Input list for Runner.run: summary, prior transcript, then the new message"""
+        agent_input = []
+        if self.summary_lines:
+            agent_input.append({
+                "role": "system",
+                "content": f"Summary of earlier conversation:\n{self.summary}",
+            })
+        agent_input.extend(self.items)
+        agent_input.append({"role": "user", "content": current_message})
+        return agent_input
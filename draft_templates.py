@@ -0,0 +1,353 @@
+"""Local templates for the common email drafts (follow-ups, meetings, invoices, thanks).
+
+A fresh drafting request that matches a template is filled from typed
+variables pulled out of the request with regexes: no model call, and the
+result is a normal "Subject: ..." draft that is saved and revised like any
+other. Only required free-form slots the request doesn't cover
+(``generate``) are written by the model, one short call per slot.
+
+A template is only used when the request asks for exactly that kind of
+email: its trigger names the intent ("schedule a meeting", not just
+"meeting"), nothing negates it ("cancel", "can't make", "dispute"), and
+every content word is accounted for by the trigger or a variable.
+Anything else goes to the drafting agent.
+
+Templates are compiled once when the registry loads. DRAFT_TEMPLATES_FILE
+may point to a JSON list of extra templates in the same shape as
+TEMPLATES (they take priority); DRAFT_TEMPLATES=0 turns the engine off.
+"""
+import json
+import os
+import re
+import string
+import threading
+from collections import Counter
+
+WEEKDAYS = r"(?:mon|tues|wednes|thurs|fri|satur|sun)day"
+MONTHS = (
+    r"(?:january|february|march|april|may|june|july|august|september|october|november|december"
+    r"|jan|feb|mar|apr|jun|jul|aug|sept|sep|oct|nov|dec)\b\.?"
+)
+DATE = (
+    WEEKDAYS + r"|tomorrow|today|next week|this week|\d{4}-\d{2}-\d{2}|\d{1,2}/\d{1,2}(?:/\d{2,4})?|"
+    + MONTHS + r" \d{1,2}(?:st|nd|rd|th)?"
+)
+TIME = r"\d{1,2}(?::\d{2})? ?(?:am|pm)|\d{1,2}:\d{2}|noon"
+# Requests that turn a template's kind of email around: leave them to the model
+NEGATIONS = re.compile(
+    r"(?i)\b(?:cancel\w*|declin\w*|postpon\w*|reschedul\w*|push(?:ing)? back|disput\w*|contest\w*|"
+    r"refus\w*|reject\w*|complain\w*|apolog\w*|sorry|wrong|incorrect|unable|not|never|"
+    r"can'?t|cannot|won'?t|don'?t|didn'?t|isn'?t|wasn'?t)\b"
+)
+# People addressed by role rather than name; only groups read well after "Hi"
+GROUP_NAMES = {"team", "everyone", "all"}
+ROLE_NAMES = {"manager", "boss", "client", "landlord", "professor", "colleague", "customer", "hr"}
+
+
+def _name(value):
+    lowered = value.lower()
+    if lowered in GROUP_NAMES:
+        return lowered
+    return None if lowered in ROLE_NAMES else value
+
+
+def _date(value):
+    lowered = value.lower()
+    if lowered in {"today", "tomorrow", "next week", "this week"}:
+        return lowered
+    return f"on {value[0].upper()}{value[1:]}" if re.match(WEEKDAYS, lowered) else f"on {value}"
+
+
+def _phrase(value):
+    return value.strip().rstrip(".")
+
+
+def _sentence(value):
+    value = value.strip()
+    return value[0].upper() + value[1:] + ("" if value.endswith((".", "!", "?")) else ".")
+
+
+def _money(value):
+    return value.replace(" ", "")
+
+
+# Request words that carry no content of their own
+FILLER_WORDS = {
+    "a", "an", "the", "to", "my", "our", "me", "for", "please", "can", "could", "you", "i", "we", "need",
+    "want", "write", "draft", "compose", "prepare", "create", "send", "email", "e-mail", "mail", "message",
+    "note", "letter", "quick", "short", "polite", "friendly", "formal", "nice", "up", "in", "and", "of",
+    "with", "them", "him", "her",
+}
+
+
+def _recipient(group=""):
+    """ "to/with <Name>": a capitalised word, unless it's a weekday or a date
+    ("to Friday", "to March 3"; Maria, Mark or June alone are names), or a
+    group/role. Case-sensitive even inside (?i) patterns."""
+    return (
+        r"(?i:to|with) (?:(?i:my|our|the) )?(?!(?i:" + WEEKDAYS + r")\b|(?i:" + MONTHS + r") \d)(?" + (group or ":")
+        + r"(?-i:[A-Z][a-z'-]+)|(?i:" + "|".join(sorted(GROUP_NAMES | ROLE_NAMES)) + r"))\b"
+    )
+
+
+# Variable types: the regex that finds a value (group "v") and how to clean it up
+VARIABLE_TYPES = {
+    "name": (r"\b" + _recipient("P<v>"), _name),
+    "date": (r"(?i)\b(?:(?:on|by|for|due) )?(?P<v>" + DATE + r")\b", _date),
+    "time": (r"(?i)\bat (?P<v>" + TIME + r")\b", lambda v: f"at {v}"),
+    "money": (r"(?i)(?P<v>[$€£] ?\d[\d,]*(?:\.\d{2})?|\d[\d,]*(?:\.\d{2})? ?(?:usd|eur|gbp|dollars|euros))", _money),
+    "invoice": (r"(?i)\binvoice (?:#|no\.? ?|number )?(?P<v>[a-z]*-?\d[\w-]*)", lambda v: f"invoice #{v.upper()}"),
+    # Ends before a recipient, date or time: "about the contract to Bob on
+    # Friday" is the contract
+    "topic": (
+        r"(?i)\b(?:about|regarding|after|re:) (?P<v>[^.,;!?\n]+?)"
+        r"(?= saying| and ask| to ask| " + _recipient() + r"| (?:on|by|due) (?:" + DATE + r")\b| (?:tomorrow|today|next week|this week)\b"
+        r"| at (?:" + TIME + r")\b|[.,;!?\n]|$)",
+        _phrase,
+    ),
+    "reason": (r"(?i)\bfor (?P<v>(?:the|their|your|his|her|all|helping|being|a|an) [^.,;!?\n]+)", _phrase),
+    "text": (r"(?i)\b(?:saying|mentioning|mention that|say that|tell (?:them|him|her) (?:that )?)(?P<v>[^\n]+)", _sentence),
+}
+
+# Built-in templates, tried in order. Triggers name the intent, not just a
+# keyword. Variables without a default are required; a required one with
+# ``generate`` is written by the model when the request doesn't give it.
+TEMPLATES = [
+    {
+        "name": "follow_up",
+        "triggers": [
+            r"\bfollow(?:ing)?[- ]?up (?:email|e-mail|note|message|on|about|regarding|after)\b",
+            r"\bcheck(?:ing)?[- ]in (?:email|e-mail|note|message|on|about|regarding)\b",
+        ],
+        "variables": {
+            "name": {"type": "name", "default": "there"},
+            "topic": {"type": "topic", "default": "our last conversation"},
+            "details": {"type": "text", "default": ""},
+        },
+        "subject": "Following up on {topic}",
+        "body": (
+            "Hi {name},\n\nI hope you're doing well. I wanted to follow up on {topic}.\n\n{details}\n\n"
+            "Please let me know if you have any questions or if there is anything else you need from me.\n\n"
+            "Best regards"
+        ),
+    },
+    {
+        "name": "meeting_request",
+        "triggers": [
+            r"\b(?:schedul\w*|set(?:ting)? up|arrang\w*|book\w*|request\w*|ask\w* for|propos\w*|invit\w* \w+ to)"
+            r" (?:a |an )?(?:short |quick )?(?:meeting|call|catch[- ]?up|sync)\b",
+            r"\bmeeting request\b",
+        ],
+        "variables": {
+            "name": {"type": "name", "default": "there"},
+            "date": {"type": "date", "default": "this week"},
+            "time": {"type": "time", "default": ""},
+            "topic": {"type": "topic", "default": "how things are going"},
+            "details": {"type": "text", "default": ""},
+        },
+        "subject": "Meeting request: {topic}",
+        "body": (
+            "Hi {name},\n\nWould you have time for a short meeting {date} {time} to discuss {topic}?\n\n"
+            "{details}\n\nIf that doesn't suit you, please suggest a time that works better.\n\nBest regards"
+        ),
+    },
+    {
+        "name": "invoice_reminder",
+        "triggers": [
+            r"\b(?:payment|invoice) reminder\b",
+            r"\bremind\w*(?: \w+)? (?:to pay|about|of|that)(?: the| their| an| our)? (?:overdue |unpaid |outstanding )?(?:invoice|payment)\b",
+        ],
+        "variables": {
+            "name": {"type": "name", "default": "there"},
+            "invoice": {"type": "invoice", "default": "the outstanding invoice"},
+            "amount": {"type": "money", "default": "the outstanding amount"},
+            "date": {"type": "date", "default": "soon"},
+            "details": {"type": "text", "default": ""},
+        },
+        "subject": "Payment reminder for {invoice}",
+        "body": (
+            "Hi {name},\n\nThis is a friendly reminder that payment of {amount} for {invoice} is due {date}.\n\n"
+            "{details}\n\nIf you have already sent the payment, please disregard this message. "
+            "Let me know if you have any questions.\n\nBest regards"
+        ),
+    },
+    {
+        "name": "thank_you",
+        "triggers": [r"\bthank(?:s|[- ]you) (?:email|e-mail|note|message|letter|card)\b", r"\bthank(?:ing)? \w+ for\b"],
+        "variables": {
+            "name": {"type": "name", "default": "there"},
+            "reason": {
+                "type": "reason",
+                "generate": "The specific thing the sender is thanking them for, as a short noun phrase",
+            },
+            "details": {"type": "text", "default": ""},
+        },
+        "subject": "Thank you",
+        "body": (
+            "Hi {name},\n\nThank you for {reason}. I really appreciate it.\n\n{details}\n\n"
+            "Best regards"
+        ),
+    },
+]
+
+
+class Variable:
+    def __init__(self, name, type, default=None, generate=None, pattern=None):
+        regex, self.convert = VARIABLE_TYPES[type]
+        self.name = name
+        self.pattern = re.compile(pattern or regex)
+        self.default = default
+        self.generate = generate  # prompt for the model when the request doesn't say
+
+    def extract(self, text):
+        """(value, span) from the request, or (None, None)"""
+        match = self.pattern.search(text)
+        return (self.convert(match.group("v")), match.span()) if match else (None, None)
+
+
+def _leftover(text, spans):
+    """Content words of the request outside the matched spans"""
+    covered = [False] * len(text)
+    for start, end in spans:
+        covered[start:end] = [True] * (end - start)
+    uncovered = "".join(" " if covered[i] else c for i, c in enumerate(text))
+    return [w for w in re.findall(r"[a-z0-9'-]+", uncovered.lower()) if w not in FILLER_WORDS]
+
+
+def _compile(text):
+    """Template string as [(literal, field or None)], parsed once"""
+    return [(literal, field) for literal, field, _, _ in string.Formatter().parse(text)]
+
+
+def _render(parts, values):
+    return "".join(literal + (values[field] if field else "") for literal, field in parts)
+
+
+class TemplateMatch:
+    """A template plus the values found in the request and the slots still to write"""
+
+    def __init__(self, template, values, gaps):
+        self.template = template
+        self.values = values
+        self.gaps = gaps  # Variables the model has to fill
+
+
+class DraftTemplate:
+    def __init__(self, spec):
+        self.name = spec["name"]
+        self.triggers = [re.compile(t, re.I) for t in spec["triggers"]]
+        self.variables = [Variable(name, **options) for name, options in spec["variables"].items()]
+        self.subject = _compile(spec["subject"])
+        self.body = _compile(spec["body"])
+
+    def match(self, text):
+        """TemplateMatch if the request is exactly this template's kind of email, else None"""
+        triggered = [m for m in (trigger.search(text) for trigger in self.triggers) if m]
+        if not triggered or NEGATIONS.search(text):
+            return None
+        values, missing, spans = {}, [], [m.span() for m in triggered]
+        for variable in self.variables:
+            value, span = variable.extract(text)
+            if span is not None:
+                # Recognised even if it has no value of its own ("to my manager")
+                spans.append(span)
+            if value is None:
+                missing.append(variable)
+            else:
+                values[variable.name] = value
+        # Anything the template would drop means the model should write it
+        if _leftover(text, spans):
+            return None
+        gaps = []
+        for variable in missing:
+            if variable.default is not None:
+                values[variable.name] = variable.default
+            elif variable.generate:
+                gaps.append(variable)
+            else:
+                return None
+        return TemplateMatch(self, values, gaps)
+
+    def render(self, values):
+        """The draft as the drafting agent writes it: "Subject: ..." then the body"""
+        body = _render(self.body, values)
+        body = re.sub(r"[ \t]+([?.,!])", r"\1", re.sub(r"[ \t]{2,}", " ", body))
+        body = re.sub(r"\n{3,}", "\n\n", body).strip()
+        return f"Subject: {_render(self.subject, values).strip()}\n\n{body}"
+
+
+class TemplateStats:
+    """How many drafts came from templates, and how fast, versus model drafts"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.by_template = Counter()
+        self.template_seconds = 0.0
+        self.gap_fills = 0
+        self.model_drafts = 0
+        self.model_seconds = 0.0
+
+    def record_template(self, name, seconds, gaps=0):
+        with self._lock:
+            self.by_template[name] += 1
+            self.template_seconds += seconds
+            self.gap_fills += gaps
+
+    def record_model(self, seconds):
+        with self._lock:
+            self.model_drafts += 1
+            self.model_seconds += seconds
+
+    @property
+    def template_drafts(self):
+        return sum(self.by_template.values())
+
+    @property
+    def hit_rate(self):
+        total = self.template_drafts + self.model_drafts
+        return self.template_drafts / total if total else 0.0
+
+    def summary(self):
+        hits = self.template_drafts
+        avg_template_ms = self.template_seconds / hits * 1000 if hits else 0.0
+        avg_model = self.model_seconds / self.model_drafts if self.model_drafts else 0.0
+        by_template = ", ".join(f"{k}={v}" for k, v in sorted(self.by_template.items())) or "none"
+        return (
+            f"🧩 Draft templates: {hits}/{hits + self.model_drafts} drafts ({self.hit_rate:.0%}) [{by_template}], "
+            f"avg {avg_template_ms:.2f}ms ({self.gap_fills} model gap fills) vs {avg_model:.2f}s per model draft"
+        )
+
+
+class TemplateRegistry:
+    """Compiled templates, tried in order against fresh drafting requests"""
+
+    def __init__(self, specs=TEMPLATES):
+        self.templates = [DraftTemplate(spec) for spec in specs]
+        self.stats = TemplateStats()
+
+    def match(self, text):
+        for template in self.templates:
+            match = template.match(text)
+            if match is not None:
+                return match
+        return None
+
+
+def gap_prompt(user_input, variable):
+    """Input for the model call that writes one free-form slot"""
+    return (
+        f"Email request: {user_input}\n\n"
+        f"Write only this part of the email, with no greeting, quotes or sign-off: {variable.generate}"
+    )
+
+
+def templates_from_env():
+    """TemplateRegistry (built-ins plus DRAFT_TEMPLATES_FILE), or None when DRAFT_TEMPLATES=0"""
+    if os.getenv("DRAFT_TEMPLATES", "1").lower() in {"0", "false", "no", "off"}:
+        return None
+    specs = list(TEMPLATES)
+    path = os.getenv("DRAFT_TEMPLATES_FILE")
+    if path:
+        with open(path, encoding="utf-8") as f:
+            specs = json.load(f) + specs
+    return TemplateRegistry(specs)
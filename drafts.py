@@ -0,0 +1,120 @@
+import difflib
+import re
+import time
+
+_DRAFT_ID = re.compile(r"^\s*\[(d\d+)\]\s*")
+_SUBJECT = re.compile(r"^\s*\**subject:?\**:?\s*(.+?)\s*$", re.I | re.M)
+
+
+class DraftStore:
+    """Versioned email drafts for one session.
+
+    Each draft has a short id ("d1", "d2", ...) and keeps every version of
+    its subject and body, so a send can refer to a draft by id instead of
+    the model regenerating the body, and revisions can be diffed. The store
+    serialises to a plain dict that travels in the memory snapshot.
+    """
+
+    def __init__(self):
+        self.drafts = {}  # draft id -> list of {"version", "subject", "body", "created_at"}
+        self.next_id = 1
+
+    def __len__(self):
+        return len(self.drafts)
+
+    def __contains__(self, draft_id):
+        return draft_id in self.drafts
+
+    def save(self, subject, body, draft_id=None):
+        """Store a new draft, or a new version of ``draft_id``; returns (id, version)"""
+        if not draft_id or draft_id not in self.drafts:
+            draft_id = f"d{self.next_id}"
+            self.next_id += 1
+            self.drafts[draft_id] = []
+        versions = self.drafts[draft_id]
+        versions.append({
+            "version": len(versions) + 1,
+            "subject": subject,
+            "body": body,
+            "created_at": time.time(),
+        })
+        return draft_id, len(versions)
+
+    def get(self, draft_id, version=None):
+        """A version of a draft (latest by default), or None"""
+        versions = self.drafts.get(draft_id)
+        if not versions:
+            return None
+        if not version:
+            return versions[-1]
+        return versions[version - 1] if 0 < version <= len(versions) else None
+
+    @property
+    def latest_id(self):
+        """Id of the most recently saved draft, or None"""
+        if not self.drafts:
+            return None
+        return max(self.drafts, key=lambda d: self.drafts[d][-1]["created_at"])
+
+    def diff(self, draft_id, from_version=None, to_version=None):
+        """Unified diff between two versions (default: the last two)"""
+        versions = self.drafts.get(draft_id)
+        if not versions:
+            return None
+        to_version = to_version or len(versions)
+        from_version = from_version or max(1, to_version - 1)
+        old, new = self.get(draft_id, from_version), self.get(draft_id, to_version)
+        if old is None or new is None:
+            return None
+        lines = difflib.unified_diff(
+            [f"Subject: {old['subject']}", ""] + old["body"].splitlines(),
+            [f"Subject: {new['subject']}", ""] + new["body"].splitlines(),
+            fromfile=f"{draft_id} v{from_version}",
+            tofile=f"{draft_id} v{to_version}",
+            lineterm="",
+        )
+        return "\n".join(lines)
+
+    def listing(self):
+        """One line per draft: id, version count and latest subject"""
+        return [
+            f"{draft_id} (v{len(versions)}): {versions[-1]['subject'] or '(no subject)'}"
+            for draft_id, versions in self.drafts.items()
+        ]
+
+    def to_dict(self):
+        return {"next_id": self.next_id, "drafts": self.drafts}
+
+    @classmethod
+    def from_dict(cls, data):
+        store = cls()
+        if data:
+            store.next_id = data["next_id"]
+            store.drafts = {k: list(v) for k, v in data["drafts"].items()}
+        return store
+
+
+def format_draft(draft_id, draft):
+    """Draft as shown to the user, tagged with its id and version"""
+    return (
+        f"📝 Draft {draft_id} (version {draft['version']})\n\n"
+        f"Subject: {draft['subject']}\n\n{draft['body']}"
+    )
+
+
+def parse_draft(text):
+    """(draft id or None, subject, body) from a drafting reply, or None if it has no Subject line
+
+    Drafts are written as "Subject: ..." followed by the body; a revision
+    of a saved draft starts with its id in brackets, e.g. "[d1]".
+    """
+    draft_id = None
+    match = _DRAFT_ID.match(text)
+    if match:
+        draft_id = match.group(1)
+        text = text[match.end():]
+    subject = _SUBJECT.search(text)
+    if subject is None:
+        return None
+    body = text[subject.end():].strip()
+    return (draft_id, subject.group(1).strip("* "), body) if body else None
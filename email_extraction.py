@@ -0,0 +1,129 @@
+import os
+import re
+from email.utils import parseaddr
+
+# RFC 5322 dot-atom local part and a DNS domain with an alphabetic TLD
+_LOCAL_PART = re.compile(r"^[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+(\.[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+)*$")
+_DOMAIN_LABEL = re.compile(r"^[A-Za-z0-9]([A-Za-z0-9-]{0,61}[A-Za-z0-9])?$")
+
+
+def is_valid_address(address):
+    """Syntax check for a bare addr-spec such as jane.doe@example.co.uk"""
+    if not address or len(address) > 254 or address.count("@") != 1:
+        return False
+    local, domain = address.rsplit("@", 1)
+    labels = domain.split(".")
+    return (
+        len(local) <= 64
+        and bool(_LOCAL_PART.match(local))
+        and len(labels) >= 2
+        and all(_DOMAIN_LABEL.match(label) for label in labels)
+        and labels[-1].isalpha()
+        and len(labels[-1]) >= 2
+    )
+
+
+def parse_addresses(value):
+    """Split a header-style string (or list of them) into (valid, invalid) addresses
+
+    Accepts "Jane <jane@example.com>, bob@example.com" as well as plain
+    comma/semicolon separated lists; duplicates are dropped.
+    """
+    values = [value] if isinstance(value, str) else list(value or [])
+    valid, invalid, seen = [], [], set()
+    for piece in (p.strip() for v in values for p in re.split(r"[,;]", v)):
+        if not piece:
+            continue
+        address = parseaddr(piece)[1].strip() or piece
+        if address.lower() in seen:
+            continue
+        seen.add(address.lower())
+        (valid if is_valid_address(address) else invalid).append(address)
+    return valid, invalid
+
+
+def resolve_attachments(names):
+    """(paths, problems) for attachment file names, comma-separated or a list
+
+    Files must sit inside ATTACHMENTS_DIR (default ./attachments), so a
+    model-chosen path can never attach .env or anything else on the host,
+    and be at most ATTACHMENT_MAX_MB (default 25) each.
+    """
+    values = [names] if isinstance(names, str) else list(names or [])
+    root = os.path.realpath(os.getenv("ATTACHMENTS_DIR", "attachments"))
+    max_bytes = float(os.getenv("ATTACHMENT_MAX_MB", "25")) * 1024 * 1024
+    paths, problems = [], []
+    for name in (n.strip() for v in values for n in v.split(",")):
+        if not name:
+            continue
+        path = os.path.realpath(os.path.join(root, name))
+        if os.path.commonpath([root, path]) != root:
+            problems.append(f"{name} is outside the attachments folder")
+        elif not os.path.isfile(path):
+            problems.append(f"{name} was not found")
+        elif os.path.getsize(path) > max_bytes:
+            problems.append(f"{name} is larger than {max_bytes / 1024 / 1024:.0f} MB")
+        elif path not in paths:
+            paths.append(path)
+    return paths, problems
+
+
+class ValidatedEmail:
+    """An extracted send request (bot_agents.EmailRequest) after local address validation
+
+    A ``draft_id`` is resolved against the session's DraftStore, so the
+    subject and body come from the saved draft rather than the model.
+    """
+
+    def __init__(self, request, drafts=None):
+        self.to, bad_to = parse_addresses(request.recipients)
+        self.cc, bad_cc = parse_addresses(request.cc)
+        self.bcc, bad_bcc = parse_addresses(request.bcc)
+        self.invalid = bad_to + bad_cc + bad_bcc
+        self.subject = request.subject.strip()
+        self.body = request.body.strip()
+        self.attachments, self.attachment_problems = resolve_attachments(request.attachments)
+        self.unknown_draft = None
+        if request.draft_id:
+            draft = drafts.get(request.draft_id.strip()) if drafts is not None else None
+            if draft is None:
+                self.unknown_draft = request.draft_id
+            else:
+                self.subject = self.subject or draft["subject"]
+                self.body = draft["body"]
+
+    @property
+    def missing(self):
+        """Names of the fields the user still has to provide"""
+        fields = []
+        if not self.to:
+            fields.append("recipient")
+        if not self.subject:
+            fields.append("subject")
+        if not self.body:
+            fields.append("body")
+        return fields
+
+    @property
+    def complete(self):
+        return not self.missing and not self.invalid and not self.unknown_draft and not self.attachment_problems
+
+    def clarification(self):
+        """One question covering every missing or invalid field"""
+        lines = []
+        if self.unknown_draft:
+            lines.append(f"❌ I can't find draft {self.unknown_draft}")
+        if self.invalid:
+            lines.append(f"❌ These don't look like valid email addresses: {', '.join(self.invalid)}")
+        if self.attachment_problems:
+            lines.append(f"❌ I can't attach: {'; '.join(self.attachment_problems)}")
+        if self.missing:
+            lines.append(f"✉️ Almost ready to send. Please tell me the {' and '.join(self.missing)}.")
+        known = []
+        if self.to:
+            known.append(f"To: {', '.join(self.to)}")
+        if self.subject:
+            known.append(f"Subject: {self.subject}")
+        if known:
+            lines.append("So far I have:\n" + "\n".join(known))
+        return "\n\n".join(lines)
@@ -0,0 +1,203 @@
+import asyncio
+import concurrent.futures
+import itertools
+import random
+import threading
+import time
+import uuid
+
+from instrumentation import get_tracer
+
+
+def is_transient(exc):
+    """True if a delivery error is likely to succeed on retry
+
+    Retried: dropped connections, timeouts and 4xx replies.
+    """
+    import smtplib  # deferred: only needed once a delivery has failed
+
+    if isinstance(exc, smtplib.SMTPAuthenticationError):
+        return False
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500
+    return isinstance(exc, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError))
+
+
+class DeliveryTicket:
+    """Delivery status handed back to the caller when an email is queued"""
+
+    def __init__(self, recipient, subject):
+        self.id = uuid.uuid4().hex[:8]
+        self.recipient = recipient
+        self.subject = subject
+        self.status = "queued"  # queued → sending → (retrying →) sent | failed
+        self.attempts = 0
+        self.error = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+
+    def _update(self, status, error=None):
+        self.status = status
+        self.error = error
+        self.updated_at = time.time()
+
+    @property
+    def done(self):
+        return self.status in {"sent", "failed"}
+
+
+class BatchTicket:
+    """Delivery status of a bulk send: one DeliveryTicket per recipient"""
+
+    def __init__(self, tickets, skipped=0):
+        self.id = "b" + uuid.uuid4().hex[:8]
+        self.tickets = list(tickets)
+        self.skipped = skipped  # already delivered by an earlier run (see outbox.SendScope)
+        self.created_at = time.time()
+
+    def count(self, *statuses):
+        return sum(1 for t in self.tickets if t.status in statuses)
+
+    @property
+    def done(self):
+        return all(t.done for t in self.tickets)
+
+
+class EmailQueue:
+    """Outbound email queue drained by asyncio worker tasks.
+
+    The queue runs its own event loop on a daemon thread, so ``submit`` can be
+    called from sync code, from ``asyncio.run`` loops that come and go (e.g.
+    Streamlit reruns) or from the agent runtime without blocking any of them.
+    The blocking ``deliver(recipient, subject, body, **options)`` callable runs in a
+    thread per attempt; transient failures are retried with exponential
+    backoff and jitter. Emails go out in ``priority`` order (lowest
+    first, FIFO within a priority), so a bulk send queued behind a lower
+    priority never holds up a one-off email.
+    """
+
+    def __init__(self, deliver, workers=2, max_retries=3, base_delay=1.0, max_delay=30.0, history=500):
+        self.deliver = deliver
+        self.workers = max(1, int(workers))
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.history = history
+
+        self.tickets = {}
+        self.batches = {}
+        self._order = itertools.count()  # FIFO tie-break within a priority
+        self._loop = None
+        self._queue = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+
+    # Lifecycle
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return self
+            self._thread = threading.Thread(target=self._run, name="email-queue", daemon=True)
+            self._thread.start()
+        self._ready.wait()
+        return self
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.PriorityQueue()
+        for i in range(self.workers):
+            self._loop.create_task(self._worker(), name=f"email-worker-{i}")
+        self._ready.set()
+        self._loop.run_forever()
+
+        workers = asyncio.all_tasks(self._loop)
+        for task in workers:
+            task.cancel()
+        self._loop.run_until_complete(asyncio.gather(*workers, return_exceptions=True))
+        self._loop.close()
+
+    def shutdown(self, timeout=30.0):
+        """Wait up to ``timeout`` seconds for pending sends, then stop workers"""
+        if self._thread is None:
+            return
+        future = asyncio.run_coroutine_threadsafe(self._queue.join(), self._loop)
+        try:
+            future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        with self._lock:
+            self._thread = None
+            self._ready.clear()
+
+    # Public API
+    def submit(self, recipient, subject, body, priority=0, **options):
+        """Queue an email and return its DeliveryTicket immediately
+
+        Extra keyword ``options`` (e.g. cc/bcc) are passed on to ``deliver``.
+        """
+        self.start()
+        ticket = DeliveryTicket(recipient, subject)
+        with self._lock:
+            self.tickets[ticket.id] = ticket
+            self._trim_history()
+        entry = (priority, next(self._order), ticket, body, options)
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, entry)
+        return ticket
+
+    def track_batch(self, tickets, skipped=0):
+        """Group already submitted tickets under one BatchTicket and return it"""
+        batch = BatchTicket(tickets, skipped)
+        with self._lock:
+            self.batches[batch.id] = batch
+            finished = [bid for bid, b in self.batches.items() if b.done]
+            for bid in finished[: max(0, len(self.batches) - self.history)]:
+                del self.batches[bid]
+        return batch
+
+    def status(self, ticket_id):
+        """DeliveryTicket or BatchTicket with this id, None if unknown"""
+        return self.tickets.get(ticket_id) or self.batches.get(ticket_id)
+
+    def recent(self, limit=10):
+        with self._lock:
+            return list(self.tickets.values())[-limit:]
+
+    @property
+    def pending(self):
+        return sum(1 for t in list(self.tickets.values()) if not t.done)
+
+    def _trim_history(self):
+        finished = [tid for tid, t in self.tickets.items() if t.done]
+        for tid in finished[: max(0, len(self.tickets) - self.history)]:
+            del self.tickets[tid]
+
+    # Workers
+    async def _worker(self):
+        while True:
+            _, _, ticket, body, options = await self._queue.get()
+            try:
+                await self._deliver(ticket, body, options)
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, ticket, body, options):
+        while True:
+            ticket.attempts += 1
+            ticket._update("sending")
+            try:
+                with get_tracer().span("email.deliver", ticket=ticket.id, attempt=ticket.attempts):
+                    await asyncio.to_thread(self.deliver, ticket.recipient, ticket.subject, body, **options)
+            except Exception as e:
+                if not is_transient(e) or ticket.attempts > self.max_retries:
+                    ticket._update("failed", e)
+                    return
+                ticket._update("retrying", e)
+                delay = min(self.max_delay, self.base_delay * 2 ** (ticket.attempts - 1))
+                await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            else:
+                ticket._update("sent")
+                return
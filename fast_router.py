@@ -0,0 +1,268 @@
+import math
+import os
+import re
+import time
+from collections import Counter
+
+
+# Deterministic rules, checked first. Mirrors the triage_agent instructions.
+# Each rule needs an email address, a draft reference or an email noun right
+# next to the verb ("send money to India" and "create a note in Evernote"
+# match nothing) and carries the confidence that evidence deserves.
+EMAIL_ADDRESS = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+_DETERMINER = r"(?:(?:an?|the|this|that|my|our|your|his|her|their|some) )?"
+_MODIFIERS = r"(?:[\w-]+ ){0,3}?"
+SEND_RULES = [
+    (re.compile(r"\b(send|forward|e-?mail|mail)\b.*[\w.+-]+@[\w-]+\.[\w.-]+"), 0.97),
+    (re.compile(r"\b(send|forward)( it| this| that| them)? (off |over |out )?(to|now)\b"), 0.9),
+    (re.compile(r"\b(send|forward) (it|this|that|them|the draft|draft d\d+|d\d+)\s*[.!]?\s*$"), 0.9),
+    (re.compile(r"\b(send|forward|shoot) " + _DETERMINER + _MODIFIERS + r"(e-?mail|mail|draft)s?\b"), 0.9),
+    (re.compile(r"\b(send|forward|shoot) " + _DETERMINER + _MODIFIERS + r"(message|reply)\b"), 0.75),
+    (re.compile(r"^\s*(e-?mail|mail) (it|this|that|them) to\b"), 0.9),
+    (re.compile(r"\bactually send\b"), 0.9),
+]
+REVISION_RULE = re.compile(r"^\s*(please )?(rewrite|reword|polish|shorten|make it (shorter|longer|more|less))\b")
+DRAFT_RULES = [
+    (re.compile(r"\b(write|draft|compose|prepare|create) (me |us )?" + _DETERMINER + _MODIFIERS + r"(e-?mail|letter)s?\b"), 0.92),
+    (re.compile(r"\b(write|draft|compose|prepare) (me |us )?" + _DETERMINER + _MODIFIERS + r"(message|note|reply)\b (to|for)\b"), 0.85),
+    (re.compile(r"\b(write|draft|compose|prepare|create) (me |us )?" + _DETERMINER + _MODIFIERS + r"(message|note|reply)\b"), 0.6),
+    (REVISION_RULE, 0.9),
+]
+# Questions about sending or writing ("how do I send an email in Gmail?") are chat
+QUESTION = re.compile(r"^\s*(how|what|why|where|when|which|who|is|are|does|do|did|should)\b")
+QUESTION_PENALTY = 0.7
+# Phrases that end a sticky draft/send flow and hand the turn back to triage
+ESCAPE_RULE = re.compile(
+    r"^\s*(never ?mind|nvm|cancel|stop|forget (it|that|about it)|start over|new (topic|question)|"
+    r"something else|different (topic|question)|change of plans?)\b"
+)
+# Any of these words means the turn is not plain chat
+EMAIL_WORDS = {
+    "email", "e-mail", "mail", "send", "draft", "write", "compose", "subject",
+    "recipient", "reply", "forward", "cc", "bcc", "inbox", "body", "letter",
+}
+
+# Seed corpus for the local classifier
+TRAINING_EXAMPLES = {
+    "chat": [
+        "what is the capital of france",
+        "how are you today",
+        "explain how photosynthesis works",
+        "tell me a joke",
+        "what time zone is london in",
+        "can you help me understand python decorators",
+        "what's the difference between tcp and udp",
+        "give me three tips for better sleep",
+        "who won the world cup in 2018",
+        "thanks that was helpful",
+        "hello there",
+        "what can you do",
+    ],
+    "draft": [
+        "write an email to my manager asking for leave",
+        "draft a follow up email after the interview",
+        "compose a thank you note to the team",
+        "help me write a meeting request",
+        "can you write a message to the client about the delay",
+        "prepare an invoice reminder email",
+        "make it more formal",
+        "rewrite the draft to be shorter",
+    ],
+    "send": [
+        "send this to john@example.com",
+        "send an email to the team",
+        "send it",
+        "email this to sarah@company.com",
+        "actually send the email",
+        "forward this message to my boss",
+        "send the draft to hr@corp.com with subject update",
+        "mail this to everyone",
+    ],
+}
+
+TOKEN = re.compile(r"[a-z0-9@.'-]+")
+
+
+def tokenize(text):
+    return TOKEN.findall(text.lower())
+
+
+def is_revision(text):
+    """True for follow-ups that rework the previous draft ("make it shorter")"""
+    return bool(REVISION_RULE.search(text.lower()))
+
+
+def rule_confidence(rules, lowered):
+    """Confidence of the strongest matching (rule, confidence) pair, 0.0 if none match"""
+    return max((confidence for rule, confidence in rules if rule.search(lowered)), default=0.0)
+
+
+def mentions_email(text):
+    """True if the text uses email vocabulary or contains an address"""
+    return bool(EMAIL_WORDS.intersection(tokenize(text))) or bool(EMAIL_ADDRESS.search(text))
+
+
+class NaiveBayesClassifier:
+    """Tiny multinomial naive Bayes over word unigrams"""
+
+    def __init__(self, examples):
+        self.word_counts = {label: Counter() for label in examples}
+        self.totals = {}
+        for label, texts in examples.items():
+            for text in texts:
+                self.word_counts[label].update(tokenize(text))
+            self.totals[label] = sum(self.word_counts[label].values())
+        self.vocab = set().union(*self.word_counts.values())
+        self.priors = {label: math.log(len(texts)) for label, texts in examples.items()}
+
+    def predict(self, text):
+        """Return (label, probability) for the most likely label"""
+        tokens = tokenize(text)
+        scores = {}
+        for label, counts in self.word_counts.items():
+            denom = self.totals[label] + len(self.vocab) + 1
+            scores[label] = self.priors[label] + sum(
+                math.log((counts[t] + 1) / denom) for t in tokens
+            )
+        best = max(scores, key=scores.get)
+        norm = sum(math.exp(s - scores[best]) for s in scores.values())
+        return best, 1.0 / norm
+
+
+class RouteDecision:
+    """Where the fast path wants to send a turn"""
+
+    def __init__(self, target, confidence, reason, sticky=False):
+        self.target = target  # "chat", "draft", "send" or None (ask triage)
+        self.confidence = confidence
+        self.reason = reason
+        self.sticky = sticky  # follow-up kept with the session's active agent
+
+    def __repr__(self):
+        return f"RouteDecision({self.target!r}, {self.confidence:.2f}, {self.reason!r})"
+
+
+class RouterStats:
+    """Counters for fast-path hit rate and turn latency"""
+
+    def __init__(self):
+        self.turns = 0
+        self.fast_path = Counter()
+        self.sticky = Counter()  # follow-ups sent straight to the active agent
+        self.escapes = 0  # sticky flows handed back to routing
+        self.fallbacks = 0
+        self.routing_seconds = 0.0
+        self.fast_seconds = 0.0
+        self.triage_seconds = 0.0
+
+    def record(self, decision, routing_seconds, turn_seconds, fast):
+        self.turns += 1
+        self.routing_seconds += routing_seconds
+        if fast:
+            (self.sticky if decision.sticky else self.fast_path)[decision.target] += 1
+            self.fast_seconds += turn_seconds
+        else:
+            self.fallbacks += 1
+            self.triage_seconds += turn_seconds
+
+    @property
+    def hit_rate(self):
+        return sum(self.fast_path.values()) / self.turns if self.turns else 0.0
+
+    @property
+    def triage_avoided(self):
+        """Turns that skipped the triage model call (fast path or sticky)"""
+        return self.turns - self.fallbacks
+
+    def summary(self):
+        hits = sum(self.fast_path.values())
+        sticky = sum(self.sticky.values())
+        avg_fast = self.fast_seconds / self.triage_avoided if self.triage_avoided else 0.0
+        avg_triage = self.triage_seconds / self.fallbacks if self.fallbacks else 0.0
+        avg_route_us = self.routing_seconds / self.turns * 1e6 if self.turns else 0.0
+        by_target = ", ".join(f"{k}={v}" for k, v in sorted(self.fast_path.items())) or "none"
+        return (
+            f"⚡ Fast path: {hits}/{self.turns} turns ({self.hit_rate:.0%}) [{by_target}]\n"
+            f"📌 Sticky follow-ups: {sticky} ({self.escapes} escapes back to routing)\n"
+            f"🧭 Triage fallbacks: {self.fallbacks}, triage calls avoided: {self.triage_avoided}\n"
+            f"⏱️ Avg turn: fast {avg_fast:.2f}s vs triage {avg_triage:.2f}s, routing {avg_route_us:.0f}µs"
+        )
+
+
+class FastRouter:
+    """Local pre-router in front of the triage agent.
+
+    Regex rules catch the obvious send/draft requests; a naive Bayes model
+    trained on a small seed corpus recognises plain chat. Anything below
+    ``threshold`` confidence returns ``target=None`` so the LLM triage
+    still decides.
+
+    With ``sticky`` on, a turn arriving while the drafting or sending agent
+    waits for an answer goes straight back to that agent (see follow_up).
+    """
+
+    def __init__(self, threshold=0.8, enabled=True, sticky=True, sticky_max_turns=5):
+        self.threshold = threshold
+        self.enabled = enabled
+        self.sticky = sticky
+        self.sticky_max_turns = sticky_max_turns
+        self.classifier = NaiveBayesClassifier(TRAINING_EXAMPLES)
+        self.stats = RouterStats()
+
+    def route(self, text):
+        if not self.enabled:
+            return RouteDecision(None, 0.0, "disabled")
+
+        lowered = text.lower()
+        send = rule_confidence(SEND_RULES, lowered)
+        draft = rule_confidence(DRAFT_RULES, lowered)
+        if send and draft:
+            return RouteDecision(None, 0.5, "send and draft rules both matched")
+        if send or draft:
+            confidence = (send or draft) * (QUESTION_PENALTY if QUESTION.search(lowered) else 1.0)
+            return RouteDecision("send" if send else "draft", confidence, "send rule" if send else "draft rule")
+
+        label, probability = self.classifier.predict(text)
+        if label == "chat" and not mentions_email(text):
+            return RouteDecision("chat", probability, "classifier")
+        return RouteDecision(None, probability * 0.5, f"classifier leaned {label}")
+
+    def is_confident(self, decision):
+        return decision.target is not None and decision.confidence >= self.threshold
+
+    def follow_up(self, text, decision, active_target, sticky_turns=0):
+        """Keep a mid-flow turn with the session's active agent, unless the topic changed
+
+        The flow ends when the user escapes ("never mind", "new topic"),
+        the fast path confidently picks another agent, or it has stuck for
+        ``sticky_max_turns`` turns in a row; ``decision`` then stands.
+        """
+        if not self.sticky or active_target is None:
+            return decision
+        if self.is_confident(decision):
+            if decision.target != active_target:
+                self.stats.escapes += 1
+            return decision
+        if ESCAPE_RULE.search(text.lower()) or sticky_turns >= self.sticky_max_turns:
+            self.stats.escapes += 1
+            return decision
+        return RouteDecision(active_target, 1.0, "sticky follow-up", sticky=True)
+
+    def record(self, decision, routing_seconds, turn_seconds):
+        self.stats.record(decision, routing_seconds, turn_seconds, self.is_confident(decision))
+
+
+def timed_route(router, text):
+    """Route ``text`` and return (decision, seconds spent routing)"""
+    start = time.perf_counter()
+    decision = router.route(text)
+    return decision, time.perf_counter() - start
+
+
+def router_from_env():
+    return FastRouter(
+        threshold=float(os.getenv("FAST_ROUTER_THRESHOLD", "0.8")),
+        enabled=os.getenv("FAST_ROUTER", "1").lower() not in {"0", "false", "no", "off"},
+        sticky=os.getenv("STICKY_ROUTING", "1").lower() not in {"0", "false", "no", "off"},
+        sticky_max_turns=int(os.getenv("STICKY_MAX_TURNS", "5")),
+    )
@@ -0,0 +1,182 @@
+"""Lightweight span tracing for every turn, exported as JSONL.
+
+Each span is written as one JSON object per line using OpenTelemetry field
+names (traceId, spanId, parentSpanId, startTimeUnixNano, ...), so the file
+can be converted to OTLP or loaded into a notebook as-is. The file is
+opt-in: set TRACE_FILE to a path (spans are kept in memory otherwise).
+Once it passes TRACE_FILE_MAX_MB (default 50) it is rotated to
+<path>.1, so at most two files are kept.
+
+Latency summary from the command line:
+
+    python instrumentation.py summary [traces.jsonl]
+"""
+import contextvars
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    def __init__(self, name, trace_id, parent_id, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.status = "OK"
+
+    @property
+    def duration(self):
+        """Seconds from start to end (or to now while still open)"""
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self):
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": self.attributes,
+            "status": {"code": self.status},
+        }
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summarize_spans(spans):
+    """{name: {"count", "p50", "p95", "p99"}} in seconds, slowest p95 first"""
+    durations = defaultdict(list)
+    for span in spans:
+        durations[span["name"]].append((span["endTimeUnixNano"] - span["startTimeUnixNano"]) / 1e9)
+    summary = {
+        name: {
+            "count": len(values),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+        }
+        for name, values in durations.items()
+    }
+    return dict(sorted(summary.items(), key=lambda item: -item[1]["p95"]))
+
+
+def format_summary(summary):
+    lines = [f"{'span':<36} {'count':>6} {'p50':>9} {'p95':>9} {'p99':>9}"]
+    for name, s in summary.items():
+        lines.append(
+            f"{name[:36]:<36} {s['count']:>6} {s['p50'] * 1000:>7.1f}ms "
+            f"{s['p95'] * 1000:>7.1f}ms {s['p99'] * 1000:>7.1f}ms"
+        )
+    return "\n".join(lines)
+
+
+class Tracer:
+    """Records spans in memory (for live summaries) and appends them to a JSONL file.
+
+    ``span()`` is a context manager usable from sync and async code; the
+    current span is tracked in a contextvar, so nested spans (including ones
+    opened in ``asyncio.to_thread`` workers) get the right parent. Spans that
+    start and end in different callbacks use ``start_span``/``end_span``.
+    """
+
+    def __init__(self, path=None, max_recent=5000, max_bytes=50 * 2**20):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.recent = deque(maxlen=max_recent)
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8", buffering=1) if path else None
+
+    def start_span(self, name, parent=None, **attributes):
+        parent = parent or _current_span.get()
+        if parent is None:
+            return Span(name, secrets.token_hex(16), None, attributes)
+        return Span(name, parent.trace_id, parent.span_id, attributes)
+
+    def end_span(self, span, error=None):
+        span.end_ns = time.time_ns()
+        if error is not None:
+            span.status = "ERROR"
+            span.attributes["error"] = f"{type(error).__name__}: {error}"
+        record = span.to_dict()
+        with self._lock:
+            self.recent.append(record)
+            if self._file is not None:
+                self._file.write(json.dumps(record, default=str) + "\n")
+                if self.max_bytes and self._file.tell() >= self.max_bytes:
+                    self._rotate()
+
+    def _rotate(self):
+        """Move the full file to <path>.1 (replacing the previous one) and start afresh"""
+        self._file.close()
+        os.replace(self.path, self.path + ".1")
+        self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+
+    @contextmanager
+    def span(self, name, **attributes):
+        span = self.start_span(name, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            _current_span.reset(token)
+            self.end_span(span, error=e)
+            raise
+        _current_span.reset(token)
+        self.end_span(span)
+
+    def summary(self):
+        with self._lock:
+            spans = list(self.recent)
+        return summarize_spans(spans)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def load_spans(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer():
+    """Process-wide tracer; TRACE_FILE sets the JSONL path (unset or "" keeps spans in memory only)"""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            max_bytes = int(float(os.getenv("TRACE_FILE_MAX_MB", "50")) * 2**20)
+            _tracer = Tracer(os.getenv("TRACE_FILE") or None, max_bytes=max_bytes)
+        return _tracer
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args or args[0] != "summary":
+        print(__doc__)
+        sys.exit(1)
+    path = args[1] if len(args) > 1 else os.getenv("TRACE_FILE") or "traces.jsonl"
+    print(format_summary(summarize_spans(load_spans(path))))
@@ -1,181 +1,523 @@
-import os
-import asyncio
-import smtplib
-from email.mime.text import MIMEText
-from dotenv import load_dotenv
-from rich.console import Console
-from agents import Agent, handoff, Runner, ModelSettings, function_tool
-
-# Load environment variables
-load_dotenv()
-console = Console()
-
-# Email sending tool with proper decorator
-@function_tool
-def send_email_tool(recipient: str, subject: str, body: str) -> str:
-    """Send an email using SMTP to the specified recipient.
-    
-    Args:
-        recipient: Email address of the recipient  
-        subject: Subject line of the email
-        body: Main content/message of the email
-        
-    Returns:
-        Success or error message
-    """
-    sender = os.getenv("EMAIL_ADDRESS")
-    password = os.getenv("EMAIL_PASSWORD")
-    
-    if not sender:
-        return "❌ EMAIL_ADDRESS not set in .env file"
-    
-    if not password:
-        return "❌ EMAIL_PASSWORD not set in .env file. Please set your Gmail App Password!"
-    
-    # Validate email format
-    if "@" not in recipient or "." not in recipient:
-        return f"❌ Invalid email format: {recipient}"
-    
-    try:
-        msg = MIMEText(body)
-        msg["Subject"] = subject
-        msg["From"] = sender
-        msg["To"] = recipient
-        
-        # Try to send email
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-            server.login(sender, password)
-            server.sendmail(sender, [recipient], msg.as_string())
-        
-        return f"✅ Email sent successfully!\nTo: {recipient}\nSubject: {subject}"
-        
-    except smtplib.SMTPAuthenticationError:
-        return "❌ Authentication failed! Please check your Gmail App Password in .env file"
-    except smtplib.SMTPRecipientsRefused:
-        return f"❌ Invalid recipient email: {recipient}"
-    except Exception as e:
-        return f"❌ Failed to send email: {str(e)}"
-
-# Core Chat Agent
-chat_agent = Agent(
-    name="Core Chat Agent",
-    instructions=(
-        "You are a friendly assistant. Keep answers short, clear, and helpful. "
-        "Answer general questions and provide helpful information."
-    ),
-    model="gpt-4",
-    model_settings=ModelSettings(temperature=0.2),
-)
-
-# Email Drafting Agent
-email_draft_agent = Agent(
-    name="Email Drafting Agent",
-    instructions=(
-        "You are an assistant that writes email drafts. "
-        "When asked, generate a clear subject line and professional email body. "
-        "Ask for recipient, purpose, and any specific details needed. "
-        "Keep emails polite, professional, and concise."
-    ),
-    model="gpt-4",
-    model_settings=ModelSettings(temperature=0.3),
-)
-
-# Email Sending Agent (without Tool wrapper)
-email_send_agent = Agent(
-    name="Email Sending Agent",
-    instructions=(
-        "You are responsible for sending emails. "
-        "Ask user for recipient, subject, and body if not provided. "
-        "Once you have all details, use the send_email_tool to send the email. "
-        "Confirm with user before sending."
-    ),
-    tools=[send_email_tool],  # Direct function reference
-    model="gpt-4",
-    model_settings=ModelSettings(temperature=0.2),
-)
-
-# Main Triage Agent
-triage_agent = Agent(
-    name="Email Bot Triage",
-    instructions=(
-        "You are the main email bot assistant. Direct conversations appropriately:\n\n"
-        "- For general chat and questions → respond normally\n"
-        "- If user wants to write/draft an email → handoff to Email Draft Agent\n"
-        "- If user says 'send' or wants to actually send an email → IMMEDIATELY handoff to Email Send Agent\n"
-        "- Keywords for sending: 'send', 'email to', 'send this', 'send it', 'actually send'\n\n"
-        "When user says 'send this to [email]' or similar - handoff to Email Send Agent right away!\n"
-        "Be friendly and helpful!"
-    ),
-    handoffs=[
-        handoff(agent=email_draft_agent),
-        handoff(agent=email_send_agent),
-    ],
-    model="gpt-4",
-    model_settings=ModelSettings(temperature=0.1),
-)
-
-# CLI Interface
-async def run_cli():
-    """Run the command line interface"""
-    console.print("[bold green]🤖 Email Bot - CLI Mode[/bold green]")
-    console.print("[dim]Type 'exit' or 'quit' to stop[/dim]\n")
-    
-    # Simple in-memory conversation history for CLI
-    conversation_history = []
-    
-    while True:
-        try:
-            user_input = input("You: ").strip()
-            
-            if user_input.lower() in {"exit", "quit", "bye"}:
-                console.print("[yellow]👋 Goodbye![/yellow]")
-                break
-                
-            if not user_input:
-                continue
-            
-            # Build context from conversation history
-            if conversation_history:
-                context_lines = ["Previous conversation:"]
-                for msg in conversation_history[-6:]:  # Last 6 messages
-                    context_lines.append(f"{msg['role'].title()}: {msg['content']}")
-                context_lines.append("---")
-                context = "\n".join(context_lines)
-                contextual_input = f"{context}\n\nCurrent message: {user_input}"
-            else:
-                contextual_input = user_input
-            
-            # Add user message to history
-            conversation_history.append({"role": "user", "content": user_input})
-                
-            # Run the triage agent
-            result = await Runner.run(triage_agent, contextual_input)
-            bot_reply = result.final_output
-            
-            # Add bot response to history
-            conversation_history.append({"role": "assistant", "content": bot_reply})
-            
-            console.print(f"[bold cyan]🤖 Bot:[/bold cyan] {bot_reply}")
-            
-        except KeyboardInterrupt:
-            console.print("\n[yellow]👋 Goodbye![/yellow]")
-            break
-        except Exception as e:
-            console.print(f"[red]❌ Error: {e}[/red]")
-
-# Main function
-async def main():
-    """Main entry point"""
-    # Check environment variables
-    if not os.getenv("OPENAI_API_KEY"):
-        console.print("[red]❌ OPENAI_API_KEY not found in .env file[/red]")
-        return
-    
-    if not os.getenv("EMAIL_ADDRESS"):
-        console.print("[yellow]⚠️  EMAIL_ADDRESS not set - email sending will not work[/yellow]")
-    
-    # Run CLI
-    await run_cli()
-
-if __name__ == "__main__":
+import os
+import re
+import time
+import asyncio
+import threading
+import dataclasses
+from dotenv import load_dotenv
+from outbox import EMAIL_QUEUED, email_queue, describe_ticket, email_config_error, queue_email, smtp_limiter
+from fast_router import router_from_env, timed_route, is_revision
+from session_store import get_session_store
+from response_cache import ResponseCache, CachedResult, cache_from_env, is_standalone
+from email_extraction import ValidatedEmail
+from speculation import drafter_from_env
+from draft_templates import templates_from_env, gap_prompt
+from drafts import parse_draft
+from instrumentation import get_tracer, format_summary
+from model_config import load_model_config, AgentUsageReport
+from rate_limit import fairness_key, limiter_from_env
+from conversation_memory import count_tokens, item_text
+
+# Heavy imports (agents, openai, pydantic, rich) are deferred: the agents
+# are built on first use by get_agents(), so importing this module stays
+# cheap for the CLI, every Streamlit rerun and the server.
+
+# Load environment variables
+load_dotenv()
+
+# Shared limit toward OpenAI (see rate_limit.py for the env vars); SMTP's lives in outbox.py
+model_limiter = limiter_from_env("OPENAI", requests_per_minute=500, max_concurrent=16)
+
+# Latency and token cost per agent and model
+agent_usage = AgentUsageReport()
+
+# Local pre-router: skips the triage model call when the intent is obvious
+fast_router = router_from_env()
+
+# Shared cache for standalone general-chat replies
+response_cache = cache_from_env()
+
+# Optional: start drafting while triage is still deciding (SPECULATIVE_DRAFTING=1)
+speculative_drafter = drafter_from_env()
+
+# Common drafts filled locally from templates (DRAFT_TEMPLATES=0 disables)
+draft_templates = templates_from_env()
+
+def estimate_prompt_tokens(system_instructions, input):
+    """Rough token count of a model request, for the tokens/min budget"""
+    items = [{"role": "user", "content": input}] if isinstance(input, str) else input
+    return count_tokens(system_instructions or "") + sum(count_tokens(item_text(item)) for item in items)
+
+# Agents, built once per process on first use
+_agents = None
+_agents_lock = threading.Lock()
+
+def get_agents():
+    """Return the process-wide BotAgents, importing the Agents SDK on first use"""
+    global _agents
+    with _agents_lock:
+        if _agents is None:
+            from bot_agents import BotAgents
+            # Per-agent model, max tokens and timeout (MODEL_CONFIG file / MODEL_* env vars)
+            _agents = BotAgents(load_model_config(), model_limiter, estimate_prompt_tokens)
+        return _agents
+
+def warm_up():
+    """Build the agents on a background thread so the first turn doesn't pay for the imports"""
+    if _agents is None and not _agents_lock.locked():
+        threading.Thread(target=get_agents, name="agent-warm-up", daemon=True).start()
+
+# Old module-level names, resolved lazily (e.g. `from main2 import triage_agent`)
+_AGENT_ATTRIBUTES = {
+    "chat_agent": "chat",
+    "email_draft_agent": "draft",
+    "email_send_agent": "send",
+    "email_extract_agent": "extract",
+    "triage_agent": "triage",
+}
+
+def __getattr__(name):
+    if name in _AGENT_ATTRIBUTES:
+        return getattr(get_agents(), _AGENT_ATTRIBUTES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+_console = None
+
+def get_console():
+    """The CLI's rich Console (rich is only imported when the CLI runs)"""
+    global _console
+    if _console is None:
+        from rich.console import Console
+        _console = Console()
+    return _console
+
+def select_agent(user_input, agents, memory=None):
+    """Pick the starting agent: the session's active agent for follow-ups,
+    the fast-path target when confident, else triage"""
+    decision, routing_seconds = timed_route(fast_router, user_input)
+    if memory is not None:
+        decision = fast_router.follow_up(
+            user_input, decision, getattr(memory, "active_agent", None), getattr(memory, "sticky_turns", 0)
+        )
+    agent = agents.route_targets[decision.target] if fast_router.is_confident(decision) else agents.triage
+    return decision, routing_seconds, agent
+
+def cache_namespace(user_input, decision, agent, agents, memory=None):
+    """Response-cache namespace for this turn, or None to bypass the cache
+    
+    The cache is shared by every session, so only a conversation's first
+    turn is eligible: later answers may draw on that user's history.
+    """
+    if response_cache is None:
+        return None
+    has_history = memory is not None and len(memory) > 0
+    # Never serve anything that may end up sending email from the cache
+    if (decision.target == "send" or agent not in (agents.chat, agents.triage)
+            or has_history or not is_standalone(user_input)):
+        response_cache.bypass()
+        return None
+    return ResponseCache.namespace(agent)
+
+def is_cacheable(result, agent):
+    """Only plain replies from the starting agent: no handoffs, no tool calls"""
+    return result.last_agent is agent and not any(
+        item.type in {"tool_call_item", "handoff_call_item"} for item in result.new_items
+    )
+
+def limited_run_config(run_config=None):
+    """RunConfig whose model provider is wrapped by the OpenAI limiter"""
+    from agents import RunConfig
+    from bot_agents import RateLimitedModelProvider
+
+    agents = get_agents()
+    if run_config is None:
+        return RunConfig(model_provider=agents.model_provider)
+    if isinstance(run_config.model_provider, RateLimitedModelProvider):
+        return run_config
+    return dataclasses.replace(run_config, model_provider=agents.limit_provider(run_config.model_provider))
+
+def describe_run_error(error):
+    """User-facing text for a failed turn"""
+    from openai import APITimeoutError, RateLimitError
+
+    if isinstance(error, RateLimitError):
+        return "⏳ The model API is busy (rate limited). Please try again in a minute."
+    if isinstance(error, APITimeoutError):
+        return "⏳ The model took too long to answer. Please try again."
+    return f"❌ Sorry, I encountered an error: {error}"
+
+async def run_agent(agent, agent_input, on_delta=None, run_config=None, stop_when=None, hooks=None, context=None):
+    """Run an agent, passing streamed text to on_delta(text) when given
+    
+    stop_when(event) is checked against every stream event; returning True
+    cancels the run and returns the partial streamed result. context (the
+    session's ConversationMemory) is what tools see as ctx.context.
+    """
+    from agents import Runner
+    from openai.types.responses import ResponseTextDeltaEvent
+    from bot_agents import TracingHooks
+    
+    if hooks is None:
+        hooks = TracingHooks(get_tracer(), agent_usage, run_config.model if run_config else None)
+    try:
+        if on_delta is None and stop_when is None:
+            result = await Runner.run(agent, agent_input, context=context, hooks=hooks, run_config=run_config)
+        else:
+            result = Runner.run_streamed(agent, agent_input, context=context, hooks=hooks, run_config=run_config)
+            async for event in result.stream_events():
+                if stop_when is not None and stop_when(event):
+                    result.cancel()
+                    break
+                if on_delta and event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+                    on_delta(event.data.delta)
+    except BaseException as e:
+        hooks.finish(error=e)
+        raise
+    hooks.finish()
+    return result
+
+# Tool replies that mean the model passed bad arguments
+VALIDATION_ERRORS = ("❌ Invalid", "❌ No recipients")
+
+# Replies where the small model says it couldn't do the job
+UNCERTAIN_REPLY = re.compile(
+    r"(?i)\b(i'?m not sure|i am not sure|i don'?t know|i do not know|i can'?t help|i cannot help|"
+    r"i'?m unable to|i am unable to|i'?m not able to|i am not able to)\b"
+)
+# Router confidence above which a send/draft lean is trusted over triage answering itself
+ROUTER_LEAN = 0.6
+
+def escalation_reason(result, triage_agent, decision=None):
+    """Why a small-model result should be redone by the larger model, or None
+    
+    Only signals from the run itself count (no output, rejected tool
+    arguments, a reply admitting it couldn't answer) plus the fast
+    router's confidence, never keywords in the user's message. A run in
+    which any tool call succeeded is never redone: the replay would
+    queue its email a second time.
+    """
+    outputs = [str(item.output) for item in result.new_items if item.type == "tool_call_output_item"]
+    if any(not o.startswith("❌") for o in outputs):
+        return None
+    reply = str(result.final_output or "").strip()
+    if not reply:
+        return "empty reply"
+    # Every tool call was rejected, so nothing was queued
+    if outputs and any(o.startswith(VALIDATION_ERRORS) for o in outputs):
+        return "validation failed"
+    if UNCERTAIN_REPLY.search(reply):
+        return "uncertain reply"
+    # Triage answered itself although the router leaned towards drafting or sending
+    if (result.last_agent is triage_agent and decision is not None
+            and decision.target in ("draft", "send") and decision.confidence >= ROUTER_LEAN):
+        return "low confidence"
+    return None
+
+async def run_escalating(agent, agent_input, on_delta=None, run_config=None, context=None, decision=None):
+    """Run on the agent's configured (small) model, escalating when needed
+    
+    The retry replays the whole turn with the escalation model for every
+    agent. Timeouts and malformed model output escalate too, but only when
+    no tool ran yet, and a finished run only when none of its tool calls
+    succeeded, so an email is never queued twice.
+    """
+    from agents import RunConfig, ModelBehaviorError
+    from openai import APITimeoutError
+    from bot_agents import TracingHooks
+    
+    agents = get_agents()
+    pinned_model = run_config.model if run_config else None
+    hooks = TracingHooks(get_tracer(), agent_usage, pinned_model)
+    config = agents.config_by_name[agent.name]
+    try:
+        result = await run_agent(agent, agent_input, on_delta, run_config, hooks=hooks, context=context)
+        reason = escalation_reason(result, agents.triage, decision)
+        if reason is not None:
+            config = agents.config_by_name.get(result.last_agent.name, config)
+    except (APITimeoutError, asyncio.TimeoutError, ModelBehaviorError) as e:
+        if hooks.tool_calls or not config.escalate_to or pinned_model:
+            raise
+        reason = type(e).__name__
+    
+    if reason is None or not config.escalate_to or pinned_model:
+        return result
+    
+    agent_usage.record_escalation(agent.name, reason)
+    if run_config is not None:
+        escalated_config = dataclasses.replace(run_config, model=config.escalate_to)
+    else:
+        escalated_config = RunConfig(model=config.escalate_to)
+    with get_tracer().span("escalate", reason=reason, model=config.escalate_to):
+        if on_delta is not None:
+            on_delta(f"\n\n🔁 Asking a larger model ({reason})...\n\n")
+        return await run_agent(agent, agent_input, on_delta, escalated_config, context=context)
+
+async def run_send_turn(user_input, agent_input, on_delta=None, run_config=None, context=None):
+    """Send in one structured model call, asking only about missing fields
+    
+    Falls back to the tool-using email sending agent for bulk sends or
+    when the extraction output can't be parsed.
+    """
+    from agents import ModelBehaviorError
+    
+    agents = get_agents()
+    reply = email_config_error()
+    if reply is None:
+        try:
+            with get_tracer().span("send.extract"):
+                extraction = await run_agent(agents.extract, agent_input, None, run_config, context=context)
+            request = extraction.final_output
+        except ModelBehaviorError:
+            request = None
+        if request is None or request.bulk:
+            return await run_escalating(agents.send, agent_input, on_delta, run_config, context)
+        
+        email = ValidatedEmail(request, getattr(context, "drafts", None))
+        if email.complete:
+            reply = queue_email(email.to, email.subject, email.body, email.cc, email.bcc, email.attachments)
+        else:
+            reply = email.clarification()
+    
+    if on_delta is not None:
+        on_delta(reply)
+    return CachedResult(agent_input, reply, agents.send)
+
+async def run_template_draft(user_input, agent_input, match, on_delta=None, run_config=None, context=None):
+    """Fill a matched draft template locally, asking the model only for its free-form gaps"""
+    agents = get_agents()
+    start = time.perf_counter()
+    values = dict(match.values)
+    for variable in match.gaps:
+        with get_tracer().span("template.gap", variable=variable.name):
+            filled = await run_agent(agents.gap_filler, gap_prompt(user_input, variable), None, run_config, context=context)
+        values[variable.name] = str(filled.final_output).strip()
+    draft = match.template.render(values)
+    draft_templates.stats.record_template(match.template.name, time.perf_counter() - start, len(match.gaps))
+    if on_delta is not None:
+        on_delta(draft)
+    return CachedResult(agent_input, draft, agents.draft)
+
+def match_template(user_input, agent, agents, decision):
+    """The template a fresh drafting request fits, or None"""
+    if draft_templates is None or agent is not agents.draft or decision.sticky or is_revision(user_input):
+        return None
+    return draft_templates.match(user_input)
+
+class NotedResult:
+    """A run result with a short assistant note appended (shown and remembered)"""
+    
+    def __init__(self, result, note):
+        self.result = result
+        self.note = note
+        self.final_output = f"{result.final_output}\n\n{note}"
+        self.last_agent = result.last_agent
+        self.new_items = result.new_items
+    
+    def to_input_list(self):
+        return self.result.to_input_list() + [{"role": "assistant", "content": self.note}]
+
+# A send reply containing this (single or bulk) completed the flow; the next turn is routed afresh
+SEND_DONE = EMAIL_QUEUED
+
+def remember_active_agent(memory, decision, result, agents):
+    """Let follow-ups stick to the drafting or sending agent the turn ended with"""
+    if not hasattr(memory, "active_agent"):
+        return
+    if result.last_agent is agents.draft:
+        target = "draft"
+    elif result.last_agent is agents.send:
+        outputs = [str(item.output) for item in result.new_items if item.type == "tool_call_output_item"]
+        done = SEND_DONE in str(result.final_output) or any(o.startswith(SEND_DONE) for o in outputs)
+        target = None if done else "send"
+    else:
+        target = None
+    memory.sticky_turns = memory.sticky_turns + 1 if decision.sticky and target == decision.target else 0
+    memory.active_agent = target
+
+def save_draft(user_input, result, drafts, on_delta=None):
+    """Store a drafting reply in the session's DraftStore and note its id"""
+    if drafts is None or result.last_agent is not get_agents().draft:
+        return result
+    parsed = parse_draft(str(result.final_output))
+    if parsed is None:
+        return result
+    draft_id, subject, body = parsed
+    if draft_id is None and is_revision(user_input):
+        draft_id = drafts.latest_id
+    draft_id, version = drafts.save(subject, body, draft_id)
+    note = f"📝 Saved as draft {draft_id} (version {version})"
+    if on_delta is not None:
+        on_delta(f"\n\n{note}")
+    return NotedResult(result, note)
+
+async def run_turn(user_input, agent_input, on_delta=None, run_config=None, context=None):
+    """Run one user turn, going straight to the target agent when confident
+    
+    Args:
+        user_input: The raw user message (used for routing and caching)
+        agent_input: Input item list for the agent (history plus the new message)
+        on_delta: Optional callback receiving streamed text as it arrives
+        run_config: Optional RunConfig (e.g. a different model provider)
+        context: The session's ConversationMemory (gives tools its drafts)
+        
+    Returns:
+        The Runner result (or a CachedResult for cached replies)
+    """
+    tracer = get_tracer()
+    agents = get_agents()
+    run_config = limited_run_config(run_config)
+    # Queued model calls are interleaved fairly between sessions
+    fairness_key.set(id(context) if context is not None else None)
+    with tracer.span("turn") as turn_span:
+        with tracer.span("route"):
+            decision, routing_seconds, agent = select_agent(user_input, agents, context)
+            namespace = cache_namespace(user_input, decision, agent, agents, context)
+            template = match_template(user_input, agent, agents, decision)
+        turn_span.set(route=decision.target or "triage", agent=agent.name, sticky=decision.sticky)
+        
+        start = time.perf_counter()
+        cached = None
+        if namespace:
+            with tracer.span("cache.lookup") as lookup_span:
+                cached = response_cache.lookup(user_input, namespace)
+                lookup_span.set(hit=cached is not None)
+        if cached is not None:
+            result = CachedResult(agent_input, cached, agent)
+            if on_delta is not None:
+                on_delta(cached)
+        elif template is not None:
+            with tracer.span("template_draft", template=template.template.name, gaps=len(template.gaps)):
+                result = await run_template_draft(user_input, agent_input, template, on_delta, run_config, context)
+        elif agent is agents.send:
+            result = await run_send_turn(user_input, agent_input, on_delta, run_config, context)
+        elif agent is agents.triage and speculative_drafter.should_speculate(user_input):
+            with tracer.span("speculative_draft") as speculation_span:
+                result = await speculative_drafter.run(
+                    agent, agents.draft, agent_input, run_agent, on_delta, run_config, context
+                )
+                speculation_span.set(hit=result.last_agent is agents.draft)
+        else:
+            result = await run_escalating(agent, agent_input, on_delta, run_config, context, decision)
+            if namespace and is_cacheable(result, agent):
+                response_cache.store(user_input, namespace, str(result.final_output), time.perf_counter() - start)
+        
+        if draft_templates is not None and cached is None and template is None and result.last_agent is agents.draft:
+            draft_templates.stats.record_model(time.perf_counter() - start)
+        result = save_draft(user_input, result, getattr(context, "drafts", None), on_delta)
+        remember_active_agent(context, decision, result, agents)
+        turn_span.set(last_agent=result.last_agent.name)
+        fast_router.record(decision, routing_seconds, time.perf_counter() - start)
+        return result
+
+async def stream_turn(user_input, agent_input, on_delta, context=None):
+    """Like run_turn, but calls on_delta(text) with model output as it streams in"""
+    return await run_turn(user_input, agent_input, on_delta, context=context)
+
+# CLI Interface
+async def run_cli():
+    """Run the command line interface"""
+    console = get_console()
+    console.print("[bold green]🤖 Email Bot - CLI Mode[/bold green]")
+    console.print("[dim]Type 'exit' or 'quit' to stop, '/outbox' to check queued emails, '/stats' for routing and cache stats, '/latency' for p50/p95/p99 timings, '/drafts' and '/diff <id> [from] [to]' for saved drafts[/dim]\n")
+    
+    # Token-budgeted conversation memory, persisted when SESSION_STORE=sqlite
+    session_store = get_session_store()
+    session_id = os.getenv("CLI_SESSION_ID", "cli")
+    memory = session_store.load(session_id)
+    
+    while True:
+        try:
+            user_input = input("You: ").strip()
+            
+            if user_input.lower() in {"exit", "quit", "bye"}:
+                console.print("[yellow]👋 Goodbye![/yellow]")
+                break
+                
+            if not user_input:
+                continue
+            
+            # Show delivery status of queued emails without a model call
+            if user_input.lower() == "/outbox":
+                tickets = email_queue.recent()
+                if not tickets:
+                    console.print("[dim]📭 No emails queued yet[/dim]")
+                for ticket in tickets:
+                    console.print(f"[dim]{ticket.id}[/dim] {describe_ticket(ticket)}")
+                continue
+            
+            if user_input.lower() == "/stats":
+                console.print(f"[dim]{fast_router.stats.summary()}[/dim]")
+                if response_cache is not None:
+                    console.print(f"[dim]{response_cache.stats.summary()}[/dim]")
+                if speculative_drafter.enabled:
+                    console.print(f"[dim]{speculative_drafter.stats.summary()}[/dim]")
+                if draft_templates is not None:
+                    console.print(f"[dim]{draft_templates.stats.summary()}[/dim]")
+                console.print(f"[dim]{agent_usage.summary()}[/dim]")
+                console.print(f"[dim]{model_limiter.summary()}\n{smtp_limiter.summary()}[/dim]")
+                continue
+            
+            if user_input.lower() == "/latency":
+                console.print(f"[dim]{format_summary(get_tracer().summary())}[/dim]")
+                continue
+            
+            # Saved drafts and the changes between their versions
+            if user_input.lower() == "/drafts":
+                console.print("\n".join(memory.drafts.listing()) or "[dim]📭 No drafts saved yet[/dim]")
+                continue
+            
+            if user_input.lower().startswith("/diff"):
+                args = user_input.split()[1:]
+                draft_id = args[0] if args else memory.drafts.latest_id
+                versions = [int(v.lstrip("v")) for v in args[1:3] if v.lstrip("v").isdigit()]
+                diff = memory.drafts.diff(draft_id, *versions) if draft_id else None
+                if diff:
+                    console.print(diff, markup=False, highlight=False)
+                else:
+                    console.print("[dim]Nothing to compare (needs a draft with two versions)[/dim]")
+                continue
+            
+            # Structured input: summary, prior transcript, new message
+            agent_input = memory.build_input(user_input)
+                
+            # Route the turn (fast path or triage agent)
+            result = await run_turn(user_input, agent_input, context=memory)
+            bot_reply = result.final_output
+            
+            # Keep the full transcript (tool calls, handoffs) for the next turn
+            memory.record(agent_input, result)
+            session_store.save(session_id, memory)
+            
+            console.print(f"[bold cyan]🤖 Bot:[/bold cyan] {bot_reply}")
+            
+        except KeyboardInterrupt:
+            console.print("\n[yellow]👋 Goodbye![/yellow]")
+            break
+        except Exception as e:
+            console.print(f"[red]{describe_run_error(e)}[/red]")
+
+# Main function
+async def main():
+    """Main entry point"""
+    console = get_console()
+    # Check environment variables
+    if not os.getenv("OPENAI_API_KEY"):
+        console.print("[red]❌ OPENAI_API_KEY not found in .env file[/red]")
+        return
+    
+    if not os.getenv("EMAIL_ADDRESS"):
+        console.print("[yellow]⚠️  EMAIL_ADDRESS not set - email sending will not work[/yellow]")
+    
+    # Build the agents while the user types their first message
+    warm_up()
+    
+    # Run CLI
+    await run_cli()
+    
+    # Let queued emails finish before exiting
+    if email_queue.pending:
+        console.print(f"[dim]📨 Waiting for {email_queue.pending} queued email(s)...[/dim]")
+        await asyncio.to_thread(email_queue.shutdown)
+
+if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,195 @@
+"""Multipart email built and sent as a stream, for large attachments.
+
+``email.message`` keeps the whole encoded message in memory (and
+``as_string`` makes another copy). StreamingMessage instead yields the
+message in CRLF-terminated chunks: headers and the text/HTML parts are
+small and encoded up front, attachments are read from disk and base64
+encoded ~64 KB at a time. send_streaming writes those chunks straight to
+an SMTP session, so memory stays flat however large the attachments are.
+"""
+import base64
+import mimetypes
+import os
+import quopri
+import re
+import smtplib
+import uuid
+from email.policy import SMTP as SMTP_POLICY
+from email.utils import encode_rfc2231, formatdate, make_msgid
+
+# Base64 turns every 57 input bytes into one 76-character line
+LINE_BYTES = 57
+READ_SIZE = LINE_BYTES * 1152  # ~64 KB of file per chunk, ~87 KB encoded
+WRITE_SIZE = 64 * 1024  # smaller chunks are joined up to this before a socket write
+_LEADING_DOT = re.compile(rb"^\.", re.M)
+
+
+def _header(name, value):
+    """Folded (and RFC 2047 encoded, if needed) header line as bytes
+
+    Values with CR or LF are rejected, as email.policy does, so a subject
+    can never smuggle in extra headers such as Bcc.
+    """
+    if "\r" in value or "\n" in value:
+        raise ValueError(f"{name} header value may not contain linefeed or carriage return characters")
+    return SMTP_POLICY.header_factory(name, value).fold(policy=SMTP_POLICY).encode("ascii")
+
+
+def _param(name, value):
+    """MIME parameter, RFC 2231 encoded when the value isn't plain ASCII"""
+    if value.isascii():
+        return f'{name}="{value}"'
+    return f"{name}*={encode_rfc2231(value, 'utf-8')}"
+
+
+class Attachment:
+    """A file on disk to attach; read lazily while the message is sent"""
+
+    def __init__(self, path, filename=None, content_type=None):
+        self.path = path
+        self.filename = filename or os.path.basename(path)
+        self.content_type = content_type or mimetypes.guess_type(self.filename)[0] or "application/octet-stream"
+
+    @property
+    def size(self):
+        return os.path.getsize(self.path)
+
+    def headers(self):
+        return (
+            _header("Content-Type", f"{self.content_type}; {_param('name', self.filename)}")
+            + _header("Content-Disposition", f"attachment; {_param('filename', self.filename)}")
+            + b"Content-Transfer-Encoding: base64\r\n\r\n"
+        )
+
+    def iter_base64(self):
+        """The file as base64 lines, one chunk per READ_SIZE bytes read"""
+        with open(self.path, "rb") as f:
+            while True:
+                data = f.read(READ_SIZE)
+                if not data:
+                    return
+                encoded = base64.b64encode(data)
+                yield b"\r\n".join(encoded[i:i + 76] for i in range(0, len(encoded), 76)) + b"\r\n"
+
+
+def _text_part(text, subtype):
+    body = quopri.encodestring(text.replace("\r\n", "\n").encode("utf-8")).replace(b"\n", b"\r\n")
+    if not body.endswith(b"\r\n"):
+        body += b"\r\n"
+    return (
+        f'Content-Type: text/{subtype}; charset="utf-8"\r\n'
+        "Content-Transfer-Encoding: quoted-printable\r\n\r\n"
+    ).encode("ascii") + body
+
+
+class StreamingMessage:
+    """A text (+ optional HTML alternative) email with attachments, generated lazily
+
+    Iterating yields the message as CRLF-terminated chunks. It can be
+    iterated again (files are reopened), so a failed send can be retried.
+    """
+
+    def __init__(self, sender, to, subject, text, html=None, cc=(), attachments=()):
+        self.sender = sender
+        self.to = to
+        self.subject = subject
+        self.text = text
+        self.html = html
+        self.cc = list(cc)
+        self.attachments = [a if isinstance(a, Attachment) else Attachment(a) for a in attachments]
+        self.message_id = make_msgid()
+
+    def _headers(self):
+        headers = _header("From", self.sender) + _header("To", self.to)
+        if self.cc:
+            headers += _header("Cc", ", ".join(self.cc))
+        return headers + (
+            _header("Subject", self.subject)
+            + _header("Date", formatdate(localtime=True))
+            + _header("Message-ID", self.message_id)
+            + b"MIME-Version: 1.0\r\n"
+        )
+
+    def _body(self):
+        """Yield the text part, or a multipart/alternative of text and HTML"""
+        if self.html is None:
+            yield _text_part(self.text, "plain")
+            return
+        boundary = f"alt-{uuid.uuid4().hex}".encode()
+        yield b'Content-Type: multipart/alternative; boundary="' + boundary + b'"\r\n\r\n'
+        yield b"--" + boundary + b"\r\n" + _text_part(self.text, "plain")
+        yield b"--" + boundary + b"\r\n" + _text_part(self.html, "html")
+        yield b"--" + boundary + b"--\r\n"
+
+    def __iter__(self):
+        yield self._headers()
+        if not self.attachments:
+            yield from self._body()
+            return
+        boundary = f"mixed-{uuid.uuid4().hex}".encode()
+        yield b'Content-Type: multipart/mixed; boundary="' + boundary + b'"\r\n\r\n'
+        yield b"--" + boundary + b"\r\n"
+        yield from self._body()
+        for attachment in self.attachments:
+            yield b"--" + boundary + b"\r\n" + attachment.headers()
+            yield from attachment.iter_base64()
+        yield b"--" + boundary + b"--\r\n"
+
+    def as_bytes(self):
+        """The whole message in memory (for small messages and tests)"""
+        return b"".join(self)
+
+    @property
+    def attachment_bytes(self):
+        return sum(a.size for a in self.attachments)
+
+
+def send_streaming(server, sender, recipients, message):
+    """Like ``smtplib.SMTP.sendmail``, but writes ``message`` chunk by chunk
+
+    Returns the refused recipients as sendmail does; raises the same
+    smtplib exceptions (the session is RSET first, so it stays usable).
+    """
+    server.ehlo_or_helo_if_needed()
+    code, response = server.mail(sender)
+    if code != 250:
+        _reset(server)
+        raise smtplib.SMTPSenderRefused(code, response, sender)
+    refused = {}
+    for recipient in recipients:
+        code, response = server.rcpt(recipient)
+        if code not in (250, 251):
+            refused[recipient] = (code, response)
+    if len(refused) == len(recipients):
+        _reset(server)
+        raise smtplib.SMTPRecipientsRefused(refused)
+    code, response = server.docmd("DATA")
+    if code != 354:
+        _reset(server)
+        raise smtplib.SMTPDataError(code, response)
+    # Coalesce chunks into ~WRITE_SIZE writes, the terminator riding on the
+    # last one: many small writes followed by a read stall on Nagle's
+    # algorithm and the server's delayed ACK (~40 ms per message)
+    pending, size = [], 0
+    for chunk in message:
+        # Chunks end on line boundaries, so every line start is visible here
+        chunk = _LEADING_DOT.sub(b"..", chunk)
+        pending.append(chunk)
+        size += len(chunk)
+        if size >= WRITE_SIZE:
+            server.send(b"".join(pending))
+            pending, size = [], 0
+    pending.append(b".\r\n")
+    server.send(b"".join(pending))
+    code, response = server.getreply()
+    if code != 250:
+        _reset(server)
+        raise smtplib.SMTPDataError(code, response)
+    return refused
+
+
+def _reset(server):
+    try:
+        server.rset()
+    except smtplib.SMTPServerDisconnected:
+        pass
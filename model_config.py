@@ -0,0 +1,145 @@
+import json
+import os
+import threading
+from collections import defaultdict
+
+
+# Small fast model by default; the large one is only used on escalation.
+# "small"/"large" resolve to MODEL_SMALL/MODEL_LARGE when the config loads.
+AGENT_DEFAULTS = {
+    "triage": {"model": "small", "max_tokens": 500, "timeout": 20.0, "escalate_to": "large"},
+    "chat": {"model": "small", "max_tokens": 600, "timeout": 30.0, "escalate_to": "large"},
+    "draft": {"model": "large", "max_tokens": 800, "timeout": 60.0, "escalate_to": None},
+    "send": {"model": "small", "max_tokens": 400, "timeout": 30.0, "escalate_to": "large"},
+}
+
+# USD per 1M (input, output) tokens, for the cost column of the report
+PRICES = {
+    "gpt-4": (30.0, 60.0),
+    "gpt-4-turbo": (10.0, 30.0),
+    "gpt-4o": (2.5, 10.0),
+    "gpt-4o-mini": (0.15, 0.6),
+    "gpt-4.1": (2.0, 8.0),
+    "gpt-4.1-mini": (0.4, 1.6),
+    "gpt-4.1-nano": (0.1, 0.4),
+    "gpt-3.5-turbo": (0.5, 1.5),
+}
+
+
+class AgentModelConfig:
+    """Model, output cap, per-call timeout and escalation target for one agent"""
+
+    def __init__(self, model, max_tokens=None, timeout=None, escalate_to=None):
+        self.model = model
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+        self.escalate_to = escalate_to if escalate_to and escalate_to != model else None
+
+    def settings(self):
+        """Keyword arguments for ModelSettings"""
+        kwargs = {}
+        if self.max_tokens:
+            kwargs["max_tokens"] = self.max_tokens
+        if self.timeout:
+            kwargs["extra_args"] = {"timeout": self.timeout}
+        return kwargs
+
+    def __repr__(self):
+        return f"AgentModelConfig({self.model!r}, max_tokens={self.max_tokens}, escalate_to={self.escalate_to!r})"
+
+
+def load_model_config(path=None):
+    """{agent key: AgentModelConfig} from defaults, an optional JSON file, then env.
+
+    The JSON file (MODEL_CONFIG) maps agent keys (triage, chat, draft, send)
+    to partial settings, e.g. {"send": {"model": "gpt-4.1-mini"}}. Env vars
+    override both: MODEL_<AGENT>, MODEL_<AGENT>_MAX_TOKENS,
+    MODEL_<AGENT>_TIMEOUT and MODEL_<AGENT>_ESCALATE ("none" disables).
+    MODEL_ESCALATION=0 turns escalation off for every agent.
+    """
+    overrides = {}
+    path = path or os.getenv("MODEL_CONFIG")
+    if path:
+        with open(path, encoding="utf-8") as f:
+            overrides = json.load(f)
+
+    tiers = {"small": os.getenv("MODEL_SMALL", "gpt-4o-mini"), "large": os.getenv("MODEL_LARGE", "gpt-4")}
+    configs = {}
+    for key, defaults in AGENT_DEFAULTS.items():
+        values = {**defaults, **overrides.get(key, {})}
+        prefix = f"MODEL_{key.upper()}"
+        values["model"] = os.getenv(prefix, values["model"])
+        if os.getenv(f"{prefix}_MAX_TOKENS"):
+            values["max_tokens"] = int(os.getenv(f"{prefix}_MAX_TOKENS"))
+        if os.getenv(f"{prefix}_TIMEOUT"):
+            values["timeout"] = float(os.getenv(f"{prefix}_TIMEOUT"))
+        escalate = os.getenv(f"{prefix}_ESCALATE", values["escalate_to"] or "")
+        if os.getenv("MODEL_ESCALATION", "1").lower() in {"0", "false", "no", "off"}:
+            escalate = ""
+        values["model"] = tiers.get(values["model"], values["model"])
+        values["escalate_to"] = None if escalate.lower() in {"", "none"} else tiers.get(escalate, escalate)
+        configs[key] = AgentModelConfig(**values)
+    return configs
+
+
+def estimate_cost(model, input_tokens, output_tokens):
+    """USD cost of the tokens, or None for models without a known price"""
+    prices = PRICES.get(model)
+    if prices is None:
+        return None
+    return (input_tokens * prices[0] + output_tokens * prices[1]) / 1e6
+
+
+class AgentUsageReport:
+    """Per-agent, per-model latency and token totals, plus escalation counts"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rows = defaultdict(lambda: {"runs": 0, "seconds": 0.0, "input_tokens": 0, "output_tokens": 0})
+        self.escalations = defaultdict(int)
+
+    def record(self, agent_name, model, seconds, input_tokens, output_tokens):
+        with self._lock:
+            row = self.rows[(agent_name, model)]
+            row["runs"] += 1
+            row["seconds"] += seconds
+            row["input_tokens"] += input_tokens
+            row["output_tokens"] += output_tokens
+
+    def record_escalation(self, agent_name, reason):
+        with self._lock:
+            self.escalations[(agent_name, reason)] += 1
+
+    def table(self):
+        """One dict per (agent, model), most expensive first"""
+        with self._lock:
+            rows = [(key, dict(row)) for key, row in self.rows.items()]
+        table = []
+        for (agent_name, model), row in rows:
+            cost = estimate_cost(model, row["input_tokens"], row["output_tokens"])
+            table.append({
+                "agent": agent_name,
+                "model": model,
+                "runs": row["runs"],
+                "avg s": round(row["seconds"] / row["runs"], 2),
+                "in tokens": row["input_tokens"],
+                "out tokens": row["output_tokens"],
+                "cost $": round(cost, 4) if cost is not None else None,
+            })
+        return sorted(table, key=lambda r: -(r["cost $"] or 0))
+
+    def summary(self):
+        lines = [f"{'agent':<24} {'model':<14} {'runs':>5} {'avg':>7} {'in':>8} {'out':>7} {'cost':>9}"]
+        for r in self.table():
+            cost = f"${r['cost $']:.4f}" if r["cost $"] is not None else "?"
+            lines.append(
+                f"{r['agent'][:24]:<24} {r['model'][:14]:<14} {r['runs']:>5} {r['avg s']:>6.2f}s "
+                f"{r['in tokens']:>8} {r['out tokens']:>7} {cost:>9}"
+            )
+        with self._lock:
+            escalations = dict(self.escalations)
+        if escalations:
+            lines.append("⬆️ Escalations: " + ", ".join(
+                f"{agent} ({reason}) ×{count}" for (agent, reason), count in sorted(escalations.items())
+            ))
+        return "\n".join(lines)
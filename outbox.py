@@ -0,0 +1,185 @@
+"""Outbound email: SMTP delivery, the background queue and its messages.
+
+Kept free of the Agents SDK (and of smtplib until the first send), so
+importing it is cheap for the CLI, the Streamlit app and the server.
+"""
+import contextvars
+import os
+
+from dotenv import load_dotenv
+from email_queue import BatchTicket, EmailQueue
+from email_extraction import parse_addresses
+from rate_limit import limiter_from_env
+
+# Load environment variables (the limits and queue below read them at import)
+load_dotenv()
+
+# Sends/min budget toward the SMTP provider (see rate_limit.py for the env vars)
+smtp_limiter = limiter_from_env("SMTP", requests_per_minute=20)
+# SMTP replies that mean "slow down" rather than "never"
+SMTP_THROTTLE_CODES = {421, 450, 451, 452}
+# Queue priority of bulk sends: one-off emails (priority 0) go out first
+BULK_PRIORITY = 1
+
+
+# Blocking SMTP delivery, run by the email queue workers
+def deliver_email(recipient, subject, body, cc=(), bcc=(), html=None, attachments=()):
+    """Build an email and stream it over the shared SMTP pool
+
+    recipient may hold several comma-separated addresses; bcc addresses
+    get the message but never appear in its headers. html adds an HTML
+    alternative to the text body; attachments are file paths, read from
+    disk while the message is written to the socket.
+    """
+    import smtplib
+    from mime_stream import StreamingMessage
+    from smtp_pool import get_smtp_pool
+
+    sender = os.getenv("EMAIL_ADDRESS")
+    msg = StreamingMessage(sender, recipient, subject, body, html=html, cc=cc, attachments=attachments)
+
+    # Send over a pooled, already-authenticated SMTP session, within the sends/min budget
+    to, _ = parse_addresses(recipient)
+    try:
+        with smtp_limiter.limit_sync():
+            get_smtp_pool().sendmail(sender, to + list(cc) + list(bcc), msg)
+    except smtplib.SMTPResponseException as e:
+        if e.smtp_code in SMTP_THROTTLE_CODES:
+            smtp_limiter.backoff(float(os.getenv("SMTP_THROTTLE_BACKOFF", "30")))
+        raise
+
+
+# Background outbound queue (workers start on first send)
+email_queue = EmailQueue(
+    deliver_email,
+    workers=int(os.getenv("EMAIL_QUEUE_WORKERS", "2")),
+    max_retries=int(os.getenv("EMAIL_MAX_RETRIES", "3")),
+)
+
+
+def describe_delivery_error(error, recipient):
+    """Turn an SMTP exception into a user-facing message"""
+    import smtplib
+
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return "❌ Authentication failed! Please check your Gmail App Password in .env file"
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return f"❌ Invalid recipient email: {recipient}"
+    return f"❌ Failed to send email: {str(error)}"
+
+
+def describe_batch(batch, limit=10):
+    """Human-readable progress of a bulk send, listing the first failures"""
+    total = len(batch.tickets)
+    sent, failed = batch.count("sent"), batch.count("failed")
+    pending = total - sent - failed
+    state = "finished" if batch.done else "in progress"
+    lines = [f"📬 Bulk send {batch.id} {state}: {sent}/{total} delivered, {failed} failed, {pending} pending"]
+    if batch.skipped:
+        lines.append(f"({batch.skipped} already delivered in an earlier run)")
+    failures = [t for t in batch.tickets if t.status == "failed"]
+    for ticket in failures[:limit]:
+        lines.append(f"❌ {ticket.recipient}: {ticket.error}")
+    if len(failures) > limit:
+        lines.append(f"... and {len(failures) - limit} more failures")
+    return "\n".join(lines)
+
+
+def describe_ticket(ticket):
+    """Human-readable delivery status for a queued email (or a bulk send)"""
+    if isinstance(ticket, BatchTicket):
+        return describe_batch(ticket)
+    if ticket.status == "sent":
+        return f"✅ Email sent successfully!\nTo: {ticket.recipient}\nSubject: {ticket.subject}"
+    if ticket.status == "failed":
+        return describe_delivery_error(ticket.error, ticket.recipient)
+    if ticket.status == "retrying":
+        return f"🔁 Retrying delivery to {ticket.recipient} (attempt {ticket.attempts}): {ticket.error}"
+    return f"📨 Email to {ticket.recipient} is {ticket.status} (ticket {ticket.id})"
+
+
+def email_config_error():
+    """User-facing message if sending is not configured, else None"""
+    if not os.getenv("EMAIL_ADDRESS"):
+        return "❌ EMAIL_ADDRESS not set in .env file"
+    if not os.getenv("EMAIL_PASSWORD"):
+        return "❌ EMAIL_PASSWORD not set in .env file. Please set your Gmail App Password!"
+    return None
+
+
+class SendScope:
+    """Tracks the emails one unit of work (a batch conversation) queues
+
+    Every send gets a key from its position ("<key>:<turn>:<n>"), so a
+    rerun of the same conversation produces the same keys and sends whose
+    key is in ``delivered`` are skipped instead of going out twice.
+    """
+
+    def __init__(self, key, delivered=None):
+        self.key = key
+        self.delivered = delivered if delivered is not None else set()
+        self.turn = 0
+        self.sends = 0  # in the current turn
+        self.tickets = []  # (send key, DeliveryTicket)
+
+    def start_turn(self, turn):
+        self.turn = turn
+        self.sends = 0
+
+    def next_key(self):
+        self.sends += 1
+        return f"{self.key}:{self.turn}:{self.sends}"
+
+
+# The SendScope of the running task, if its caller wants one (see batch_runner.py)
+send_scope = contextvars.ContextVar("send_scope", default=None)
+
+
+def submit_email(recipient, subject, body, **options):
+    """Queue one email, recorded in the current SendScope
+
+    Returns its DeliveryTicket, or None if the scope says an earlier run
+    already delivered it.
+    """
+    scope = send_scope.get()
+    if scope is None:
+        return email_queue.submit(recipient, subject, body, **options)
+    key = scope.next_key()
+    if key in scope.delivered:
+        return None
+    ticket = email_queue.submit(recipient, subject, body, **options)
+    scope.tickets.append((key, ticket))
+    return ticket
+
+
+# Every reply confirming a send (single or bulk) starts with this
+EMAIL_QUEUED = "📨 Email queued"
+
+
+def queue_email(to, subject, body, cc=(), bcc=(), attachments=()):
+    """Submit a validated email (attachments as resolved paths) and describe the ticket"""
+    ticket = submit_email(
+        ", ".join(to), subject, body, cc=list(cc), bcc=list(bcc), attachments=list(attachments)
+    )
+    if ticket is None:
+        return f"{EMAIL_QUEUED} for delivery!\nTo: {', '.join(to)}\nSubject: {subject}\n(already delivered in an earlier run)"
+    copies = f"\nCc: {', '.join(cc)}" if cc else ""
+    copies += f"\nBcc: {', '.join(bcc)}" if bcc else ""
+    files = f"\nAttachments: {', '.join(os.path.basename(p) for p in attachments)}" if attachments else ""
+    return f"{EMAIL_QUEUED} for delivery!\nTo: {ticket.recipient}{copies}\nSubject: {subject}{files}\nTicket: {ticket.id}"
+
+
+def queue_bulk(messages):
+    """Submit rendered (recipient, subject, body) messages behind one-off emails
+
+    Returns the BatchTicket tracking them; messages the current SendScope
+    already delivered are counted as skipped.
+    """
+    tickets, skipped = [], 0
+    for recipient, subject, body in messages:
+        ticket = submit_email(recipient, subject, body, priority=BULK_PRIORITY)
+        if ticket is None:
+            skipped += 1
+        else:
+            tickets.append(ticket)
+    return email_queue.track_batch(tickets, skipped)
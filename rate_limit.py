@@ -0,0 +1,283 @@
+"""Shared rate limits toward the model API and the SMTP provider.
+
+Each provider gets a RateLimiter combining:
+    - a fair concurrency gate (free slots go round-robin across sessions,
+      so one busy session cannot starve the others),
+    - token buckets for requests/min and tokens/min (sends/min for SMTP),
+    - a shared pause when the provider answers 429 / "try again later".
+
+Limiters are process-wide and thread-safe: the same one is used from the
+agent runtime loop, ``asyncio.run`` loops and the email queue's worker
+threads. Configure with <PROVIDER>_REQUESTS_PER_MINUTE,
+<PROVIDER>_TOKENS_PER_MINUTE and <PROVIDER>_MAX_CONCURRENT (0 = unlimited).
+When several processes share one account, RATE_LIMIT_SHARES (set by
+supervisor.WorkerPool to its worker count) gives each an equal slice of
+every budget, so together they stay within the configured limits.
+"""
+import math
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+
+# Who is asking: set per turn so queued work is interleaved fairly
+fairness_key = contextvars.ContextVar("fairness_key", default=None)
+
+
+class TokenBucket:
+    """Refills ``per_minute`` units per minute, holding at most ``capacity``"""
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount=1):
+        """Take ``amount`` now, going into debt if needed; returns seconds to wait
+
+        Later callers queue behind the debt, so reservations are served in
+        order. A single request larger than the bucket still goes through.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= min(amount, self.capacity)
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def adjust(self, amount):
+        """Charge (or refund, if negative) the difference to an earlier estimate"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class _Waiter:
+    """A queued acquire: an asyncio future on its own loop, or a threading event"""
+
+    def __init__(self, loop=None):
+        self.loop = loop
+        self.future = loop.create_future() if loop else None
+        self.event = None if loop else threading.Event()
+        self.granted = False
+
+    def wake(self):
+        self.granted = True
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class FairSemaphore:
+    """Concurrency limit whose free slots go round-robin across keys"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.active = 0
+        self._queues = OrderedDict()  # key -> deque of waiters
+        self._lock = threading.Lock()
+
+    @property
+    def queued(self):
+        return sum(len(q) for q in self._queues.values())
+
+    def _try_acquire(self, key, waiter):
+        with self._lock:
+            if self.active < self.limit and not self._queues:
+                self.active += 1
+                return True
+            self._queues.setdefault(key, deque()).append(waiter)
+            return False
+
+    def _forget(self, key, waiter):
+        """Drop a cancelled waiter; True if it had already been granted a slot"""
+        with self._lock:
+            if waiter.granted:
+                return True
+            waiters = self._queues.get(key)
+            if waiters is not None and waiter in waiters:
+                waiters.remove(waiter)
+                if not waiters:
+                    del self._queues[key]
+            return False
+
+    async def acquire(self, key=None):
+        waiter = _Waiter(asyncio.get_running_loop())
+        if self._try_acquire(key, waiter):
+            return
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if self._forget(key, waiter):
+                self.release()
+            raise
+
+    def acquire_sync(self, key=None):
+        waiter = _Waiter()
+        if not self._try_acquire(key, waiter):
+            waiter.event.wait()
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+            while self.active < self.limit and self._queues:
+                key, waiters = next(iter(self._queues.items()))
+                waiter = waiters.popleft()
+                if waiters:
+                    self._queues.move_to_end(key)  # this key goes to the back of the rotation
+                else:
+                    del self._queues[key]
+                self.active += 1
+                waiter.wake()
+
+
+class LimiterStats:
+    def __init__(self):
+        self.requests = 0
+        self.throttled = 0  # had to wait for a slot or the buckets
+        self.wait_seconds = 0.0
+        self.max_wait = 0.0
+        self.rate_limited = 0  # 429 / "try again later" answers from the provider
+
+    def record_wait(self, seconds):
+        self.requests += 1
+        if seconds > 0.001:
+            self.throttled += 1
+            self.wait_seconds += seconds
+            self.max_wait = max(self.max_wait, seconds)
+
+
+class Permit:
+    """Handed out by RateLimiter.limit; reports actual token usage back"""
+
+    def __init__(self, limiter, estimate):
+        self.limiter = limiter
+        self.estimate = estimate
+
+    def used(self, tokens):
+        if self.limiter.tokens is not None and tokens:
+            self.limiter.tokens.adjust(tokens - self.estimate)
+            self.estimate = tokens
+
+
+class RateLimiter:
+    """Concurrency gate plus request and token buckets for one provider"""
+
+    def __init__(self, name, requests_per_minute=None, tokens_per_minute=None, max_concurrent=None):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.slots = FairSemaphore(max_concurrent) if max_concurrent else None
+        self.paused_until = 0.0
+        self.stats = LimiterStats()
+
+    def _bucket_wait(self, tokens):
+        wait = self.paused_until - time.monotonic()
+        if self.requests is not None:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens is not None and tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        return wait
+
+    @asynccontextmanager
+    async def limit(self, tokens=0, key=None):
+        """Wait for a slot and budget, then run the block; ``tokens`` is an estimate"""
+        key = key if key is not None else fairness_key.get()
+        start = time.monotonic()
+        if self.slots is not None:
+            await self.slots.acquire(key)
+        try:
+            wait = self._bucket_wait(tokens)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self.stats.record_wait(time.monotonic() - start)
+            yield Permit(self, tokens)
+        finally:
+            if self.slots is not None:
+                self.slots.release()
+
+    @contextmanager
+    def limit_sync(self, tokens=0, key=None):
+        """Blocking variant of ``limit`` for worker threads"""
+        key = key if key is not None else fairness_key.get()
+        start = time.monotonic()
+        if self.slots is not None:
+            self.slots.acquire_sync(key)
+        try:
+            wait = self._bucket_wait(tokens)
+            if wait > 0:
+                time.sleep(wait)
+            self.stats.record_wait(time.monotonic() - start)
+            yield Permit(self, tokens)
+        finally:
+            if self.slots is not None:
+                self.slots.release()
+
+    def backoff(self, seconds):
+        """Provider said slow down: hold every caller for ``seconds``"""
+        self.stats.rate_limited += 1
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def snapshot(self):
+        """Counters for dashboards and /health"""
+        s = self.stats
+        return {
+            "requests": s.requests,
+            "throttled": s.throttled,
+            "avg_wait_s": round(s.wait_seconds / s.requests, 3) if s.requests else 0.0,
+            "max_wait_s": round(s.max_wait, 3),
+            "rate_limited": s.rate_limited,
+            "in_flight": self.slots.active if self.slots else None,
+            "queued": self.slots.queued if self.slots else 0,
+        }
+
+    def summary(self):
+        m = self.snapshot()
+        return (
+            f"🚦 {self.name}: {m['requests']} requests, {m['throttled']} throttled "
+            f"(avg wait {m['avg_wait_s']:.2f}s, max {m['max_wait_s']:.2f}s), "
+            f"{m['rate_limited']} rate-limit responses, {m['queued']} queued"
+        )
+
+
+def retry_after(error, attempt):
+    """Seconds to back off after a 429: the server's hint, else exponential"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return min(60.0, 2.0 ** attempt)
+
+
+def limiter_from_env(name, requests_per_minute=0, tokens_per_minute=0, max_concurrent=0):
+    """RateLimiter for provider ``name`` (e.g. OPENAI) with env overrides
+
+    Each budget is divided by RATE_LIMIT_SHARES (default 1); a concurrency
+    cap never drops below one slot.
+    """
+    prefix = name.upper()
+    shares = max(1, int(os.getenv("RATE_LIMIT_SHARES", "1")))
+    max_concurrent = int(os.getenv(f"{prefix}_MAX_CONCURRENT", max_concurrent))
+    return RateLimiter(
+        name,
+        requests_per_minute=float(os.getenv(f"{prefix}_REQUESTS_PER_MINUTE", requests_per_minute)) / shares,
+        tokens_per_minute=float(os.getenv(f"{prefix}_TOKENS_PER_MINUTE", tokens_per_minute)) / shares,
+        max_concurrent=math.ceil(max_concurrent / shares) if max_concurrent > 0 else max_concurrent,
+    )
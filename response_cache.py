@@ -0,0 +1,200 @@
+import hashlib
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+
+_PUNCTUATION = re.compile(r"[^\w\s@.]")
+# Words that point back into the conversation: answers depend on history
+_CONTEXT_WORDS = {
+    "it", "this", "that", "these", "those", "they", "them", "he", "she", "him", "her",
+    "above", "previous", "earlier", "again", "more", "same", "also", "too", "yes", "no",
+    "last", "latest",
+}
+# First-person and possessive words: the answer is about this user, so it
+# must never be served to anyone else ("what's my email address?")
+_PERSONAL_WORDS = {
+    "i", "im", "ive", "id", "ill", "me", "my", "mine", "myself",
+    "we", "us", "our", "ours", "ourselves", "your", "yours",
+}
+
+
+def normalize(text):
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return " ".join(_PUNCTUATION.sub(" ", text.lower()).split())
+
+
+def is_standalone(text):
+    """True if a message can be answered without the conversation so far or who is asking"""
+    words = normalize(text.replace("'", "").replace("\u2019", "")).split()
+    return len(words) >= 3 and not _CONTEXT_WORDS.intersection(words) and not _PERSONAL_WORDS.intersection(words)
+
+
+def hash_embed(text, dims=512):
+    """Local bag-of-words embedding (hashing trick over unigrams and bigrams)"""
+    words = normalize(text).split()
+    vector = [0.0] * dims
+    for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+        digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], "little") % dims
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class CacheEntry:
+    def __init__(self, reply, vector, namespace, latency):
+        self.reply = reply
+        self.vector = vector
+        self.namespace = namespace
+        self.latency = latency
+        self.created_at = time.monotonic()
+
+
+class CacheStats:
+    def __init__(self):
+        self.lookups = 0
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.bypassed = 0
+        self.stored = 0
+        self.saved_seconds = 0.0
+
+    @property
+    def hits(self):
+        return self.exact_hits + self.semantic_hits
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def summary(self):
+        return (
+            f"💾 Response cache: {self.hits}/{self.lookups} hits ({self.hit_rate:.0%}, "
+            f"{self.exact_hits} exact, {self.semantic_hits} semantic), "
+            f"{self.bypassed} bypassed, ~{self.saved_seconds:.1f}s saved"
+        )
+
+
+class ResponseCache:
+    """Cache of general-chat replies keyed on normalised input + agent config.
+
+    Exact lookups hash the normalised text. When an ``embed`` function is
+    given, misses fall back to a cosine-similarity search over the cached
+    entries of the same namespace (a flat in-process index, so no network
+    is needed for the lookup itself beyond what ``embed`` does). That is
+    off by default: hash_embed is a bag of words, so two long questions
+    differing in one key word (TCP vs UDP) score above 0.95. Entries
+    expire after ``ttl`` seconds and the least recently used are evicted
+    beyond ``max_entries``.
+    """
+
+    def __init__(self, max_entries=1000, ttl=3600.0, embed=None, similarity_threshold=0.95):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.embed = embed
+        self.similarity_threshold = similarity_threshold
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = CacheStats()
+
+    @staticmethod
+    def namespace(agent):
+        """Agent name plus the model settings that shape its answers"""
+        settings = agent.model_settings
+        return f"{agent.name}|{agent.model}|t={settings.temperature}|top_p={settings.top_p}"
+
+    @staticmethod
+    def _key(text, namespace):
+        return hashlib.sha256(f"{namespace}\n{normalize(text)}".encode()).hexdigest()
+
+    def lookup(self, text, namespace):
+        """Return the cached reply for ``text`` or None"""
+        start = time.perf_counter()
+        with self._lock:
+            self.stats.lookups += 1
+            self._expire()
+            key = self._key(text, namespace)
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry):
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats.exact_hits += 1
+            elif self.embed is not None:
+                entry = self._nearest(self.embed(text), namespace)
+                if entry is not None:
+                    self.stats.semantic_hits += 1
+            if entry is not None:
+                self.stats.saved_seconds += max(0.0, entry.latency - (time.perf_counter() - start))
+                return entry.reply
+        return None
+
+    def _nearest(self, vector, namespace):
+        best, best_score = None, self.similarity_threshold
+        for entry in self._entries.values():
+            if entry.namespace != namespace or entry.vector is None or self._expired(entry):
+                continue
+            score = sum(a * b for a, b in zip(vector, entry.vector))
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    def store(self, text, namespace, reply, latency):
+        vector = self.embed(text) if self.embed is not None else None
+        with self._lock:
+            key = self._key(text, namespace)
+            self._entries[key] = CacheEntry(reply, vector, namespace, latency)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self.stats.stored += 1
+
+    def bypass(self):
+        self.stats.bypassed += 1
+
+    def _expired(self, entry):
+        return time.monotonic() - entry.created_at > self.ttl
+
+    def _expire(self):
+        """Drop expired entries from the cold end of the LRU order"""
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if not self._expired(entry):
+                break
+            del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class CachedResult:
+    """Stand-in for a Runner result when the reply was produced locally (cache hit, send extraction)"""
+
+    def __init__(self, agent_input, reply, agent):
+        self.final_output = reply
+        self.last_agent = agent
+        self.new_items = []
+        self._input = list(agent_input)
+
+    def to_input_list(self):
+        return self._input + [{"role": "assistant", "content": self.final_output}]
+
+
+def cache_from_env():
+    """None when RESPONSE_CACHE=0, else a cache configured from .env"""
+    if os.getenv("RESPONSE_CACHE", "1").lower() in {"0", "false", "no", "off"}:
+        return None
+    # Opt-in: see the ResponseCache docstring for why
+    semantic = os.getenv("RESPONSE_CACHE_SEMANTIC", "0").lower() in {"1", "true", "yes", "on"}
+    return ResponseCache(
+        max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "1000")),
+        ttl=float(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+        embed=hash_embed if semantic else None,
+        similarity_threshold=float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.98")),
+    )
@@ -0,0 +1,261 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from conversation_memory import ConversationMemory
+
+
+class SessionStore(ABC):
+    """Where conversation memory lives between turns.
+
+    ``load`` returns the session's ConversationMemory (empty if unknown);
+    after a turn changes it, ``save`` persists whatever was appended.
+    """
+
+    @abstractmethod
+    def load(self, session_id):
+        ...
+
+    @abstractmethod
+    def save(self, session_id, memory):
+        ...
+
+    @abstractmethod
+    def delete(self, session_id):
+        ...
+
+
+class MemorySessionStore(SessionStore):
+    """In-process LRU of live ConversationMemory objects.
+
+    Unbounded by default: this is the only copy of the memory, so limits
+    are opt-in. With ``max_sessions`` it keeps only the most recently used
+    sessions, with ``ttl`` it forgets any not touched for that many
+    seconds. Nothing survives a restart.
+    """
+
+    def __init__(self, max_sessions=None, ttl=None):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = OrderedDict()  # session_id -> (memory, last access)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, session_id):
+        return session_id in self._sessions
+
+    def get(self, session_id):
+        """Cached memory or None, without creating a session"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or self._expired(entry[1], time.monotonic()):
+                if entry is not None:
+                    del self._sessions[session_id]
+                    self.evictions += 1
+                self.misses += 1
+                return None
+            self._sessions[session_id] = (entry[0], time.monotonic())
+            self._sessions.move_to_end(session_id)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, session_id, memory):
+        with self._lock:
+            self._sessions[session_id] = (memory, time.monotonic())
+            self._sessions.move_to_end(session_id)
+            self._evict()
+
+    def _expired(self, last_access, now):
+        return self.ttl is not None and now - last_access > self.ttl
+
+    def _evict(self):
+        now = time.monotonic()
+        while self._sessions:
+            session_id, (_, last_access) = next(iter(self._sessions.items()))
+            full = self.max_sessions is not None and len(self._sessions) > self.max_sessions
+            if not full and not self._expired(last_access, now):
+                break
+            del self._sessions[session_id]
+            self.evictions += 1
+
+    def load(self, session_id):
+        memory = self.get(session_id)
+        if memory is None:
+            memory = ConversationMemory.from_env()
+            self.put(session_id, memory)
+        return memory
+
+    def save(self, session_id, memory):
+        memory.unsaved.clear()
+        self.put(session_id, memory)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Durable sessions in SQLite (WAL mode), shareable between processes.
+
+    Every message is an appended row in ``messages``; the ``sessions`` row
+    holds the running summary and which turns are still in the window, so a
+    load reads only the live window. Recently used sessions are kept in an
+    LRU cache. A cached session is served without a query while SQLite's
+    data_version shows no other connection has committed since it was
+    last checked; after that it is revalidated against the stored counts
+    once, so another worker's writes are never missed.
+    """
+
+    def __init__(self, path="sessions.db", cache_size=1000):
+        self.path = path
+        self.cache = MemorySessionStore(max_sessions=cache_size)
+        self._checked = {}  # session_id -> data_version its cached memory was last known current at
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                snapshot TEXT NOT NULL,
+                turn_count INTEGER NOT NULL,
+                message_count INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS messages (
+                session_id TEXT NOT NULL,
+                turn INTEGER NOT NULL,
+                item TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS messages_by_turn ON messages (session_id, turn);
+        """)
+
+    def _counts(self, session_id):
+        row = self._conn.execute(
+            "SELECT turn_count, message_count FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row or (0, 0)
+
+    def _data_version(self):
+        # Changes only when another connection commits; our own writes leave it as is
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def load(self, session_id):
+        with self._lock:
+            cached = self.cache.get(session_id)
+            if cached is not None:
+                version = self._data_version()
+                if self._checked.get(session_id) == version:
+                    return cached
+                if (cached.turn_count, len(cached)) == self._counts(session_id):
+                    self._checked[session_id] = version
+                    return cached
+
+            memory = ConversationMemory.from_env()
+            row = self._conn.execute(
+                "SELECT snapshot FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is not None:
+                snapshot = json.loads(row[0])
+                turns = {}
+                for turn, item in self._conn.execute(
+                    "SELECT turn, item FROM messages WHERE session_id = ? AND turn >= ? ORDER BY rowid",
+                    (session_id, snapshot["first_turn"]),
+                ):
+                    turns.setdefault(turn, []).append(json.loads(item))
+                memory.restore(snapshot, sorted(turns.items()))
+            self._cache(session_id, memory)
+            return memory
+
+    def _cache(self, session_id, memory):
+        if self.cache.max_sessions == 0:
+            return
+        self.cache.put(session_id, memory)
+        self._checked[session_id] = self._data_version()
+        if len(self._checked) > 2 * len(self.cache):
+            self._checked = {s: v for s, v in self._checked.items() if s in self.cache}
+
+    def save(self, session_id, memory):
+        now = time.time()
+        rows = [(session_id, turn, json.dumps(item, default=str), now) for turn, item in memory.unsaved]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO messages (session_id, turn, item, created_at) VALUES (?, ?, ?, ?)", rows
+                )
+                self._conn.execute(
+                    "INSERT INTO sessions (session_id, snapshot, turn_count, message_count, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?) ON CONFLICT(session_id) DO UPDATE SET "
+                    "snapshot = excluded.snapshot, turn_count = excluded.turn_count, "
+                    "message_count = excluded.message_count, updated_at = excluded.updated_at",
+                    (session_id, json.dumps(memory.snapshot()), memory.turn_count, len(memory), now),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            memory.unsaved.clear()
+            self._cache(session_id, memory)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self.cache.delete(session_id)
+            self._checked.pop(session_id, None)
+
+    def purge(self, older_than):
+        """Delete sessions not updated in ``older_than`` seconds; returns how many"""
+        cutoff = time.time() - older_than
+        with self._lock:
+            stale = [r[0] for r in self._conn.execute(
+                "SELECT session_id FROM sessions WHERE updated_at < ?", (cutoff,)
+            )]
+            for session_id in stale:
+                self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+                self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                self.cache.delete(session_id)
+                self._checked.pop(session_id, None)
+        return len(stale)
+
+    def close(self):
+        self._conn.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_session_store():
+    """Process-wide store chosen by SESSION_STORE (memory | sqlite)
+
+    The in-memory store never drops a session unless SESSION_MAX_SESSIONS
+    or SESSION_TTL (seconds) is set. SESSION_CACHE_SIZE sizes the SQLite
+    store's cache, which can evict freely since the database has it all.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            if os.getenv("SESSION_STORE", "memory").lower() == "sqlite":
+                cache_size = int(os.getenv("SESSION_CACHE_SIZE", "1000"))
+                _store = SQLiteSessionStore(os.getenv("SESSION_DB_PATH", "sessions.db"), cache_size)
+            else:
+                max_sessions = os.getenv("SESSION_MAX_SESSIONS")
+                ttl = os.getenv("SESSION_TTL")
+                _store = MemorySessionStore(
+                    int(max_sessions) if max_sessions else None,
+                    float(ttl) if ttl else None,
+                )
+        return _store
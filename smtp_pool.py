@@ -0,0 +1,257 @@
+import os
+import smtplib
+import threading
+import time
+import atexit
+from contextlib import contextmanager
+
+from instrumentation import get_tracer
+
+
+def _env_flag(name, default):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+class PooledConnection:
+    """An authenticated SMTP session plus the bookkeeping the pool needs"""
+
+    def __init__(self, server):
+        self.server = server
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.last_checked = self.created_at
+
+
+class SMTPConnectionPool:
+    """Thread-safe pool of persistent SMTP sessions.
+
+    Connections are opened (TLS handshake + login) once and reused for many
+    sends. Idle sessions are checked with NOOP before reuse, evicted after
+    ``idle_timeout`` seconds and transparently replaced when the server has
+    dropped them.
+    """
+
+    def __init__(
+        self,
+        host="smtp.gmail.com",
+        port=465,
+        username=None,
+        password=None,
+        use_ssl=True,
+        starttls=False,
+        max_connections=4,
+        idle_timeout=60.0,
+        health_check_interval=15.0,
+        timeout=30.0,
+        acquire_timeout=30.0,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_ssl = use_ssl
+        self.starttls = starttls
+        self.max_connections = max(1, int(max_connections))
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.timeout = timeout
+        self.acquire_timeout = acquire_timeout
+
+        self._idle = []  # LIFO stack of PooledConnection
+        self._open = 0  # idle + checked out + being opened
+        self._cond = threading.Condition()
+        self._closed = False
+        self.stats = {"connects": 0, "reuses": 0, "reconnects": 0, "evictions": 0, "failed_checks": 0}
+
+    # Connection lifecycle
+    def _connect(self):
+        tracer = get_tracer()
+        with tracer.span("smtp.connect", host=self.host, port=self.port, ssl=self.use_ssl):
+            if self.use_ssl:
+                server = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+            else:
+                server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            server.ehlo()
+            if self.starttls and not self.use_ssl:
+                with tracer.span("smtp.starttls"):
+                    server.starttls()
+                    server.ehlo()
+            if self.username and self.password:
+                with tracer.span("smtp.login"):
+                    server.login(self.username, self.password)
+        except BaseException:
+            self._quit(server)
+            raise
+        self.stats["connects"] += 1
+        return PooledConnection(server)
+
+    @staticmethod
+    def _quit(server):
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def _is_alive(self, conn):
+        now = time.monotonic()
+        if now - conn.last_checked < self.health_check_interval:
+            return True
+        try:
+            code, _ = conn.server.noop()
+        except (smtplib.SMTPException, OSError):
+            code = None
+        conn.last_checked = now
+        if code != 250:
+            self.stats["failed_checks"] += 1
+            return False
+        return True
+
+    def _evict_expired(self):
+        """Drop idle sessions past idle_timeout. Caller must hold the lock."""
+        now = time.monotonic()
+        expired = [c for c in self._idle if now - c.last_used > self.idle_timeout]
+        if expired:
+            self._idle = [c for c in self._idle if c not in expired]
+            self._open -= len(expired)
+            self.stats["evictions"] += len(expired)
+            self._cond.notify_all()
+        return expired
+
+    def _acquire(self):
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("SMTP connection pool is closed")
+            expired = self._evict_expired()
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._open < self.max_connections:
+                    self._open += 1
+                    conn = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    raise TimeoutError(
+                        f"No SMTP connection available after {self.acquire_timeout}s "
+                        f"(max_connections={self.max_connections})"
+                    )
+
+        for stale in expired:
+            self._quit(stale.server)
+
+        if conn is not None:
+            if self._is_alive(conn):
+                self.stats["reuses"] += 1
+                return conn
+            # Server dropped us; keep the slot and open a replacement
+            self._quit(conn.server)
+            self.stats["reconnects"] += 1
+
+        try:
+            return self._connect()
+        except BaseException:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+    def _release(self, conn, healthy):
+        with self._cond:
+            if healthy and not self._closed:
+                conn.last_used = time.monotonic()
+                self._idle.append(conn)
+                self._cond.notify()
+                return
+            self._open -= 1
+            self._cond.notify()
+        self._quit(conn.server)
+
+    @contextmanager
+    def connection(self):
+        """Check out an authenticated ``smtplib.SMTP`` session"""
+        conn = self._acquire()
+        healthy = True
+        try:
+            yield conn.server
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException) as e:
+            # The server answered, so the session is still usable unless it
+            # told us it is shutting the channel down.
+            healthy = getattr(e, "smtp_code", None) != 421
+            raise
+        except BaseException:
+            healthy = False
+            raise
+        finally:
+            self._release(conn, healthy)
+
+    def sendmail(self, sender, recipients, message):
+        """Send a message, reconnecting once if a pooled session went stale
+
+        ``message`` is a string, or a mime_stream.StreamingMessage that is
+        written to the socket chunk by chunk.
+        """
+        streamed = not isinstance(message, (str, bytes))
+        for attempt in range(2):
+            try:
+                with self.connection() as server:
+                    if streamed:
+                        from mime_stream import send_streaming
+
+                        with get_tracer().span(
+                            "smtp.send", recipients=len(recipients), attachment_bytes=message.attachment_bytes
+                        ):
+                            return send_streaming(server, sender, recipients, message)
+                    with get_tracer().span("smtp.send", recipients=len(recipients), bytes=len(message)):
+                        return server.sendmail(sender, recipients, message)
+            except (smtplib.SMTPServerDisconnected, ConnectionResetError, BrokenPipeError):
+                if attempt:
+                    raise
+                self.stats["reconnects"] += 1
+
+    def evict_idle(self):
+        """Close idle sessions past idle_timeout; returns how many were closed"""
+        with self._cond:
+            expired = self._evict_expired()
+        for conn in expired:
+            self._quit(conn.server)
+        return len(expired)
+
+    def close(self):
+        """Close every idle session and refuse further checkouts"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._quit(conn.server)
+
+
+# Process-wide pool configured from the environment
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_smtp_pool():
+    """Return the shared SMTP pool, creating it from .env settings on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SMTPConnectionPool(
+                host=os.getenv("SMTP_HOST", "smtp.gmail.com"),
+                port=int(os.getenv("SMTP_PORT", "465")),
+                username=os.getenv("EMAIL_ADDRESS"),
+                password=os.getenv("EMAIL_PASSWORD"),
+                use_ssl=_env_flag("SMTP_USE_SSL", True),
+                starttls=_env_flag("SMTP_STARTTLS", False),
+                max_connections=int(os.getenv("SMTP_MAX_CONNECTIONS", "4")),
+                idle_timeout=float(os.getenv("SMTP_IDLE_TIMEOUT", "60")),
+            )
+            atexit.register(_pool.close)
+        return _pool
@@ -0,0 +1,130 @@
+import asyncio
+import os
+
+from conversation_memory import count_tokens, item_text
+from fast_router import DRAFT_RULES, mentions_email
+
+
+def looks_like_draft(text):
+    """Cheap check for turns where triage will probably hand off to drafting"""
+    lowered = text.lower()
+    return any(rule.search(lowered) for rule, _ in DRAFT_RULES) or mentions_email(text)
+
+
+class SpeculationStats:
+    """Counters for speculative drafting: hits, misses and tokens thrown away"""
+
+    def __init__(self):
+        self.attempts = 0
+        self.hits = 0
+        self.misses = 0
+        self.wasted_tokens = 0
+        self.saved_seconds = 0.0
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.attempts if self.attempts else 0.0
+
+    def summary(self):
+        return (
+            f"🔮 Speculative drafts: {self.hits}/{self.attempts} used ({self.hit_rate:.0%}), "
+            f"{self.misses} cancelled, ~{self.wasted_tokens} tokens wasted, ~{self.saved_seconds:.1f}s saved"
+        )
+
+
+class DeltaGate:
+    """Holds back streamed text until the speculative run is committed"""
+
+    def __init__(self):
+        self.buffer = []
+        self.on_delta = None
+
+    def __call__(self, text):
+        if self.on_delta is None:
+            self.buffer.append(text)
+        else:
+            self.on_delta(text)
+
+    def open(self, on_delta):
+        for text in self.buffer:
+            on_delta(text)
+        self.buffer.clear()
+        self.on_delta = on_delta
+
+
+def _tokens_spent(task, agent_input):
+    """Actual usage of a finished run, else the prompt we already sent"""
+    if task.done() and not task.cancelled() and task.exception() is None:
+        return task.result().context_wrapper.usage.total_tokens
+    return sum(count_tokens(item_text(item)) for item in agent_input)
+
+
+class SpeculativeDrafter:
+    """Runs the drafting agent alongside triage for email-looking turns.
+
+    The draft starts at the same time as the triage model call. If triage
+    hands off to the drafting agent, triage is cancelled and the draft
+    (already under way, or done) becomes the turn's result; otherwise the
+    draft is cancelled and its tokens are counted as wasted.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.stats = SpeculationStats()
+
+    def should_speculate(self, user_input):
+        return self.enabled and looks_like_draft(user_input)
+
+    async def run(self, triage, draft_agent, agent_input, run_agent, on_delta=None, run_config=None, context=None):
+        """Race triage against a speculative draft and return the winning result
+
+        Args:
+            triage: The triage agent
+            draft_agent: The drafting agent triage may hand off to
+            agent_input: Input item list shared by both runs
+            run_agent: main2.run_agent (must support the stop_when callback)
+            on_delta: Optional callback receiving the committed run's streamed text
+            run_config: Optional RunConfig passed to both runs
+            context: Run context passed to both runs
+        """
+        self.stats.attempts += 1
+        gate = DeltaGate()
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        handoff_at = []
+
+        def handed_off(event):
+            if event.type == "agent_updated_stream_event" and event.new_agent is draft_agent:
+                handoff_at.append(loop.time())
+                return True
+            return False
+
+        draft = asyncio.create_task(run_agent(draft_agent, agent_input, gate, run_config, context=context))
+        draft_done_at = []
+        draft.add_done_callback(lambda _: draft_done_at.append(loop.time()))
+        try:
+            result = await run_agent(triage, agent_input, on_delta, run_config, stop_when=handed_off, context=context)
+        except BaseException:
+            draft.cancel()
+            raise
+
+        if not handoff_at:
+            self.stats.misses += 1
+            self.stats.wasted_tokens += _tokens_spent(draft, agent_input)
+            draft.cancel()
+            await asyncio.gather(draft, return_exceptions=True)
+            return result
+
+        self.stats.hits += 1
+        if on_delta is not None:
+            gate.open(on_delta)
+        result = await draft
+        # Run serially, the draft would only have started at the handoff
+        self.stats.saved_seconds += min(handoff_at[0], draft_done_at[0]) - started
+        return result
+
+
+def drafter_from_env():
+    return SpeculativeDrafter(
+        enabled=os.getenv("SPECULATIVE_DRAFTING", "0").lower() in {"1", "true", "yes", "on"},
+    )
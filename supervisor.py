@@ -0,0 +1,427 @@
+"""Multi-process deployment: a supervisor in front of N agent worker processes.
+
+Run with:
+
+    python supervisor.py --workers 4 --port 8000
+
+The supervisor serves the same HTTP/WebSocket API as chat_server.py, but
+runs no turns itself. Each turn goes to a worker process (chat_server's
+turn loop, talking JSON lines over its stdin/stdout), picked by hashing
+the session id: every turn of a session, and so its memory, drafts and
+sticky routing, stays in one process, and a slow model call or SMTP send
+only holds up that worker.
+
+A worker that exits is restarted, with backoff if it keeps crashing.
+Turns it was running fail with an error rather than hang; new turns for
+its sessions wait for the replacement. Sessions in the default in-memory
+SESSION_STORE die with their worker, so use SESSION_STORE=sqlite to keep
+them. Every worker has its own OpenAI and SMTP rate limiters, so the
+pool sets RATE_LIMIT_SHARES to the worker count and each worker gets
+1/N of every configured budget (see rate_limit.py); the pool as a whole
+stays within the limits. On SIGTERM / Ctrl+C the supervisor stops taking turns and closes
+each worker's stdin; workers finish the turns they have and send their
+queued emails, and are killed if still running after the drain timeout.
+
+The Streamlit app runs its turns on the same kind of pool when
+AGENT_WORKERS is set.
+
+Env vars:
+    AGENT_WORKERS             worker processes (default here: CPU count; app2: 0 = in-process)
+    SUPERVISOR_DRAIN_TIMEOUT  seconds to wait for workers on shutdown (default 30)
+    WORKER_SETUP              optional "module:function" each worker runs at startup;
+                              a RunConfig it returns is used for every turn
+"""
+import argparse
+import asyncio
+import hashlib
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+
+from chat_server import ServerBusy, asgi_app
+from main2 import describe_run_error
+
+# Longest protocol line (a reply carrying a session's memory can be large)
+MAX_LINE = 16 * 1024 * 1024
+# A worker that exits sooner than this after starting counts as crash-looping
+STABLE_AFTER = 30.0
+# How long a turn waits for its (re)starting worker
+READY_TIMEOUT = 60.0
+WORKER_STOPPED = "❌ Sorry, the worker handling this conversation stopped. Please try again."
+
+
+class WorkerError(Exception):
+    """A turn that failed in a worker process; the message is already user-facing"""
+
+
+def worker_for(session_id, workers):
+    """Index of the worker that owns ``session_id``
+
+    Python's hash() is salted per process, so a fixed digest keeps the
+    mapping stable across the supervisor, the Streamlit app and restarts.
+    """
+    digest = hashlib.blake2b(session_id.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % workers
+
+
+# Supervisor side
+class WorkerProcess:
+    """One worker process and the requests in flight on it"""
+
+    def __init__(self, index, command, env):
+        self.index = index
+        self.command = command
+        self.env = env
+        self.process = None
+        self.exited = None  # task reading the worker's replies; its result is the exit code
+        self.ready = asyncio.Event()
+        self.pending = {}  # request id -> (future, on_delta)
+        self.next_id = 0
+        self.started_at = 0.0
+        self.crashes = 0  # consecutive early exits, for the restart backoff
+        self.restarts = 0
+        self.completed = 0
+
+    @property
+    def pid(self):
+        return self.process.pid if self.process else None
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            *self.command,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            env=self.env,
+            limit=MAX_LINE,
+            # Keep terminal Ctrl+C away from workers: the supervisor drains them
+            start_new_session=True,
+        )
+        self.started_at = time.monotonic()
+        self.exited = asyncio.create_task(self._read(self.process))
+
+    async def _read(self, process):
+        """Dispatch the worker's replies until it exits; returns its exit code
+
+        A reply that breaks the protocol (a line over MAX_LINE, invalid
+        JSON, anything but an object with a type) is treated as a crash:
+        the worker is killed, its turns fail and the pool restarts it.
+        """
+        while True:
+            try:
+                line = await process.stdout.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                if not isinstance(message, dict) or not isinstance(message.get("type"), str):
+                    raise ValueError("reply is not an object with a type")
+            except ValueError as e:  # includes over-long lines and bad JSON
+                print(f"❌ Worker {self.index} (pid {process.pid}) broke the protocol ({e}), killing it", file=sys.stderr)
+                if process.returncode is None:
+                    process.kill()
+                break
+            self._dispatch(message)
+
+        self.ready.clear()
+        code = await process.wait()
+        self.fail_pending()
+        return code
+
+    def fail_pending(self):
+        """Fail every request in flight: the worker that had them is gone"""
+        for future, _ in self.pending.values():
+            if not future.done():
+                future.set_exception(WorkerError(WORKER_STOPPED))
+        self.pending.clear()
+
+    def _dispatch(self, message):
+        if message["type"] == "ready":
+            self.ready.set()
+            return
+        entry = self.pending.get(message.get("id"))
+        if entry is None:
+            return
+        future, on_delta = entry
+        if message["type"] == "delta":
+            if on_delta is not None:
+                try:
+                    on_delta(message.get("text", ""))
+                except Exception as e:
+                    # The caller's stream broke: fail its turn, not the whole worker
+                    del self.pending[message["id"]]
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        del self.pending[message["id"]]
+        if not future.done():
+            future.set_result(message)
+
+    async def request(self, payload, on_delta=None):
+        """Send one request and wait for the worker's final reply to it"""
+        self.next_id += 1
+        request_id = self.next_id
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = (future, on_delta)
+        try:
+            self.process.stdin.write((json.dumps({"id": request_id, **payload}) + "\n").encode())
+            await self.process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        if self.exited.done():
+            # Exited before it could see the request
+            self.pending.pop(request_id, None)
+            raise WorkerError(WORKER_STOPPED)
+        return await future
+
+    async def drain(self, timeout):
+        """Close the worker's stdin so it finishes up and exits; kill it after ``timeout``"""
+        if self.process is None or self.exited.done():
+            return
+        self.process.stdin.close()
+        try:
+            await asyncio.wait_for(asyncio.shield(self.exited), timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️ Worker {self.index} (pid {self.pid}) still busy after {timeout:.0f}s, killing it", file=sys.stderr)
+            self.process.kill()
+            await self.exited
+
+
+class WorkerPool:
+    """N worker processes; each session's turns always go to the same one
+
+    Implements the chat_server backend interface (chat, health,
+    describe_error, startup, shutdown), so asgi_app() can serve it.
+    """
+
+    def __init__(self, workers, drain_timeout=30.0, max_restart_delay=30.0, env=None):
+        command = [sys.executable, os.path.abspath(__file__), "--worker"]
+        # Workers split the rate limit budgets between them
+        env = {**os.environ, **(env or {}), "RATE_LIMIT_SHARES": str(workers)}
+        self.workers = [WorkerProcess(i, command, {**env, "WORKER_INDEX": str(i)}) for i in range(workers)]
+        self.drain_timeout = drain_timeout
+        self.max_restart_delay = max_restart_delay
+        self.draining = False
+        self._watchers = []
+
+    async def start(self, timeout=READY_TIMEOUT):
+        """Launch every worker and wait until all of them are ready"""
+        for worker in self.workers:
+            await worker.start()
+            self._watchers.append(asyncio.create_task(self._watch(worker)))
+        await asyncio.wait_for(asyncio.gather(*(w.ready.wait() for w in self.workers)), timeout)
+
+    async def _watch(self, worker):
+        """Restart the worker whenever it exits, until the pool drains"""
+        while True:
+            try:
+                code = await worker.exited
+            except Exception as e:
+                # Never let the watcher die: a worker without one is never restarted
+                code = f"unknown ({type(e).__name__}: {e})"
+                worker.ready.clear()
+                if worker.process.returncode is None:
+                    worker.process.kill()
+                worker.fail_pending()
+            if self.draining:
+                return
+            lived = time.monotonic() - worker.started_at
+            worker.crashes = worker.crashes + 1 if lived < STABLE_AFTER else 1
+            delay = min(self.max_restart_delay, 0.5 * 2 ** (worker.crashes - 1))
+            print(
+                f"⚠️ Worker {worker.index} (pid {worker.pid}) exited with code {code}, restarting in {delay:.1f}s",
+                file=sys.stderr,
+            )
+            await asyncio.sleep(delay)
+            if self.draining:
+                return
+            worker.restarts += 1
+            try:
+                await worker.start()
+            except OSError as e:
+                print(f"❌ Worker {worker.index} failed to start: {e}", file=sys.stderr)
+
+    async def _request(self, session_id, payload, on_delta=None):
+        if self.draining:
+            raise ServerBusy("Server is shutting down, please retry shortly")
+        worker = self.workers[worker_for(session_id, len(self.workers))]
+        # A restarting worker's sessions wait for its replacement
+        try:
+            await asyncio.wait_for(worker.ready.wait(), READY_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise ServerBusy("The worker for this conversation is restarting, please retry shortly") from None
+        reply = await worker.request({"session_id": session_id, **payload}, on_delta)
+        if reply["type"] == "busy":
+            raise ServerBusy(str(reply.get("error")))
+        if reply["type"] == "error":
+            raise WorkerError(str(reply.get("error")))
+        if reply["type"] != "done" or not isinstance(reply.get("result"), dict):
+            raise WorkerError(WORKER_STOPPED)
+        worker.completed += 1
+        return reply["result"]
+
+    async def chat(self, session_id, message, on_delta=None, include_memory=False):
+        """Run one turn on the session's worker; returns what chat_server.chat_turn does
+
+        With include_memory the result also has the session's memory
+        ("memory": {"snapshot", "turns"}), for ConversationMemory.restore.
+        """
+        payload = {"op": "turn", "message": message, "stream": on_delta is not None, "memory": include_memory}
+        return await self._request(session_id, payload, on_delta)
+
+    async def clear(self, session_id):
+        """Forget a session's memory in its worker"""
+        await self._request(session_id, {"op": "clear"})
+
+    def describe_error(self, error):
+        return str(error) if isinstance(error, WorkerError) else describe_run_error(error)
+
+    def health(self):
+        return {
+            "status": "draining" if self.draining else "ok",
+            "workers": [
+                {
+                    "index": w.index,
+                    "pid": w.pid,
+                    "ready": w.ready.is_set(),
+                    "in_flight": len(w.pending),
+                    "completed": w.completed,
+                    "restarts": w.restarts,
+                }
+                for w in self.workers
+            ],
+        }
+
+    async def startup(self):
+        await self.start()
+
+    async def shutdown(self):
+        """Stop taking turns and let every worker finish its turns and emails"""
+        self.draining = True
+        await asyncio.gather(*(w.drain(self.drain_timeout) for w in self.workers))
+        for task in self._watchers:
+            task.cancel()
+
+
+def pool_from_env(workers=None):
+    if workers is None:
+        workers = int(os.getenv("AGENT_WORKERS") or os.cpu_count() or 1)
+    return WorkerPool(max(1, workers), drain_timeout=float(os.getenv("SUPERVISOR_DRAIN_TIMEOUT", "30")))
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_pool():
+    """The Streamlit app's WorkerPool, or None unless AGENT_WORKERS > 0
+
+    It runs on the shared AgentRuntime loop, so it outlives reruns.
+    """
+    global _pool
+    if int(os.getenv("AGENT_WORKERS", "0")) <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            from agent_runtime import get_runtime
+
+            pool = pool_from_env()
+            get_runtime().run(pool.start())
+            _pool = pool
+        return _pool
+
+
+# Worker side
+def worker_setup():
+    """Run WORKER_SETUP ("module:function") if set; returns the RunConfig it gives, if any"""
+    spec = os.getenv("WORKER_SETUP")
+    if not spec:
+        return None
+    module, _, function = spec.partition(":")
+    return getattr(importlib.import_module(module), function)()
+
+
+def memory_state(memory):
+    """A ConversationMemory as JSON-able data for ConversationMemory.restore"""
+    return {"snapshot": memory.snapshot(), "turns": [[turn["index"], turn["items"]] for turn in memory.turns]}
+
+
+async def serve_worker(requests, replies):
+    """Answer the supervisor's requests (JSON lines) until it closes ``requests``"""
+    import chat_server
+
+    backend = chat_server.LocalTurns()
+    run_config = worker_setup()
+    await backend.startup()
+
+    def reply(message):
+        replies.write(json.dumps(message, default=str) + "\n")
+        replies.flush()
+
+    async def handle(request):
+        request_id, session_id = request["id"], request["session_id"]
+        try:
+            if request["op"] == "clear":
+                await asyncio.to_thread(chat_server.sessions.delete, session_id)
+                result = {}
+            else:
+                on_delta = None
+                if request.get("stream"):
+                    on_delta = lambda text: reply({"id": request_id, "type": "delta", "text": text})
+                result = await chat_server.chat_turn(session_id, request["message"], on_delta, run_config)
+                if request.get("memory"):
+                    memory = await asyncio.to_thread(chat_server.sessions.load, session_id)
+                    result["memory"] = memory_state(memory)
+        except chat_server.ServerBusy as e:
+            reply({"id": request_id, "type": "busy", "error": str(e)})
+        except Exception as e:
+            reply({"id": request_id, "type": "error", "error": backend.describe_error(e)})
+        else:
+            reply({"id": request_id, "type": "done", "result": result})
+
+    reply({"type": "ready", "pid": os.getpid()})
+    running = set()
+    while True:
+        line = await asyncio.to_thread(requests.readline)
+        if not line:
+            break
+        task = asyncio.create_task(handle(json.loads(line)))
+        running.add(task)
+        task.add_done_callback(running.discard)
+
+    # Draining: finish the turns already started, then send queued emails
+    if running:
+        await asyncio.wait(running)
+    await backend.shutdown()
+
+
+def worker_main():
+    # Replies get their own copy of stdout; anything else printed goes to stderr
+    replies = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    os.dup2(2, 1)
+    asyncio.run(serve_worker(sys.stdin, replies))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: AGENT_WORKERS or CPU count)")
+    parser.add_argument("--host", default=os.getenv("SERVER_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("SERVER_PORT", "8000")))
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker_main()
+        return
+
+    import uvicorn
+
+    pool = pool_from_env(args.workers)
+    print(f"🚀 Supervisor: {len(pool.workers)} workers on http://{args.host}:{args.port}")
+    # uvicorn finishes in-flight requests first, then the lifespan shutdown drains the workers
+    uvicorn.run(asgi_app(pool), host=args.host, port=args.port, timeout_graceful_shutdown=pool.drain_timeout)
+
+
+if __name__ == "__main__":
+    main()